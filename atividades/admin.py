@@ -1,52 +1,242 @@
-from django.contrib import admin
-from .models import Crianca, Semana, Atividade, Resultado
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db.models import Min
+from django.forms.models import BaseInlineFormSet
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
 
-class ResultadoInline(admin.TabularInline):  # ou admin.StackedInline
+from .models import (
+    Crianca, Semana, Atividade, Resultado, PlacarCrianca, ImportacaoJob, HistoricoRanking, Temporada,
+    ResumoTemporada, VersaoDados,
+)
+from .temporadas import arquivar
+
+
+class TemporadaFiltro(admin.SimpleListFilter):
+    """
+    Filtro por temporada que, sem escolha, mostra só a ativa: as listas não
+    crescem com as temporadas passadas ("Todas" mostra tudo).
+    """
+    title = 'temporada'
+    parameter_name = 'temporada'
+    campo = 'temporada'
+    TODAS = 'todas'
+
+    def lookups(self, request, model_admin):
+        temporadas = Temporada.objects.filter(arquivada_em__isnull=True, ativa=False)
+        return [(str(t.pk), t.nome) for t in temporadas] + [(self.TODAS, 'Todas')]
+
+    def choices(self, changelist):
+        # A opção sem parâmetro é a temporada ativa (no padrão do Django seria "Todos")
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Ativa',
+        }
+        for valor, nome in self.lookup_choices:
+            yield {
+                'selected': self.value() == valor,
+                'query_string': changelist.get_query_string({self.parameter_name: valor}),
+                'display': nome,
+            }
+
+    def queryset(self, request, queryset):
+        if self.value() == self.TODAS:
+            return queryset
+        if self.value() is None:
+            return queryset.filter(**{f'{self.campo}__ativa': True})
+        return queryset.filter(**{f'{self.campo}_id': self.value()})
+
+
+class TemporadaDaSemanaFiltro(TemporadaFiltro):
+    campo = 'semana__temporada'
+
+
+class ResultadosPaginados(BaseInlineFormSet):
+    """
+    Carrega só uma página dos resultados do objeto pai (o inline do admin não
+    pagina: uma criança com milhares de resultados viraria milhares de forms).
+    """
+    numero_pagina = None
+    por_pagina = 25
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            qs = super().get_queryset().select_related('crianca', 'atividade', 'semana')
+            self.pagina = Paginator(qs, self.por_pagina).get_page(self.numero_pagina)
+            self._queryset = self.pagina.object_list
+        return self._queryset
+
+
+class ResultadoInlinePaginado(admin.TabularInline):
     model = Resultado
+    formset = ResultadosPaginados
+    template = 'admin/atividades/resultado_inline_paginado.html'
+    ordering = ['-semana__numero', 'pk']
     extra = 1
-    autocomplete_fields = ['semana', 'atividade']
-    fields = ['semana', 'atividade', 'quantidade']
     show_change_link = True
-    
-class ResultadoInlinePorAtividade(admin.TabularInline):
-    model = Resultado
-    extra = 1
+    parametro_pagina = 'pagina_resultados'
+    filtro_lista = None  # filtro da lista de resultados com todos os do objeto pai
+
+    def get_formset(self, request, obj=None, **kwargs):
+        # A classe é criada a cada chamada, então a página fica só nesta request
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.numero_pagina = request.GET.get(self.parametro_pagina)
+        formset.por_pagina = getattr(settings, 'ADMIN_RESULTADOS_POR_PAGINA', ResultadosPaginados.por_pagina)
+        formset.parametro_pagina = self.parametro_pagina
+        formset.filtro_lista = f'{self.filtro_lista}={obj.pk}' if obj is not None else None
+        return formset
+
+
+class ResultadoInline(ResultadoInlinePaginado):  # ou admin.StackedInline
+    autocomplete_fields = ['semana', 'atividade']
+    # pontos só vale para atividades de pontuação livre; nas demais o save() recalcula
+    fields = ['semana', 'atividade', 'quantidade', 'pontos']
+    filtro_lista = 'crianca__id__exact'
+
+
+class ResultadoInlinePorAtividade(ResultadoInlinePaginado):
     autocomplete_fields = ['crianca', 'semana']
-    fields = ['crianca', 'semana', 'quantidade']
-    show_change_link = True
+    fields = ['crianca', 'semana', 'quantidade', 'pontos']
+    filtro_lista = 'atividade__id__exact'
 
 
 @admin.register(Crianca)
 class CriancaAdmin(admin.ModelAdmin):
-    list_display = ['nome', 'turma']
-    search_fields = ['nome', 'turma']
+    list_display = ['nome', 'turma', 'temporada']
+    list_filter = [TemporadaFiltro]
+    list_select_related = ['temporada']
+    search_fields = ['nome', 'nome_normalizado', 'turma']
     ordering = ['nome']
     inlines = [ResultadoInline]  # <-- aqui está a mágica
 
+    def delete_queryset(self, request, queryset):
+        # A exclusão em massa não chama Crianca.delete(): refaz aqui as fotos
+        # semanais (quem estava atrás das apagadas sobe), a partir da primeira
+        # semana em que elas aparecem em cada temporada, e invalida o ranking
+        desde = dict(
+            HistoricoRanking.objects.filter(crianca__in=queryset)
+            .values('semana__temporada_id').annotate(desde=Min('semana__numero')).order_by()
+            .values_list('semana__temporada_id', 'desde')
+        )
+        super().delete_queryset(request, queryset)
+        for temporada_id, numero in desde.items():
+            HistoricoRanking.objects.atualizar(temporada_id, desde=numero)
+        VersaoDados.objects.incrementar()
+
+
 @admin.register(Semana)
 class SemanaAdmin(admin.ModelAdmin):
-    list_display = ['numero', 'data_inicio', 'data_fim']
-    list_filter = ['data_inicio']
+    list_display = ['numero', 'data_inicio', 'data_fim', 'temporada']
+    list_filter = [TemporadaFiltro, 'data_inicio']
+    list_select_related = ['temporada']
     ordering = ['numero']
     search_fields = ['numero', 'data_inicio']
 
+    def delete_queryset(self, request, queryset):
+        afetadas = list(
+            Resultado.objects.filter(semana__in=queryset).values_list('crianca_id', flat=True).distinct()
+        )
+        super().delete_queryset(request, queryset)
+        PlacarCrianca.objects.recalcular(afetadas)
+
 
 @admin.register(Atividade)
 class AtividadeAdmin(admin.ModelAdmin):
-    list_display = ['nome', 'pontos']
+    list_display = ['nome', 'pontos', 'pontuacao_livre']
     search_fields = ['nome']
     ordering = ['nome']
     inlines = [ResultadoInlinePorAtividade]
 
+    def delete_queryset(self, request, queryset):
+        afetadas = list(
+            Resultado.objects.filter(atividade__in=queryset).values_list('crianca_id', flat=True).distinct()
+        )
+        super().delete_queryset(request, queryset)
+        PlacarCrianca.objects.recalcular(afetadas)
+
 
 @admin.register(Resultado)
 class ResultadoAdmin(admin.ModelAdmin):
     list_display = ['crianca', 'atividade', 'semana', 'quantidade', 'pontos_totais']
-    list_filter = ['atividade', 'semana']
+    list_filter = [TemporadaDaSemanaFiltro, 'atividade', 'semana']
+    list_select_related = ['crianca', 'atividade', 'semana']
     search_fields = ['crianca__nome', 'atividade__nome']
+    autocomplete_fields = ['crianca', 'semana', 'atividade']
     ordering = ['-semana__numero']
+    # Com filtro, não conta a tabela inteira de novo só para o "N de M"
+    show_full_result_count = False
 
+    @admin.display(description='Pontos', ordering='pontos')
     def pontos_totais(self, obj):
-        return obj.quantidade * obj.atividade.pontos
+        return obj.pontos
+
+    def delete_queryset(self, request, queryset):
+        # A exclusão em massa não chama Resultado.delete(): refaz o placar aqui
+        afetadas = list(queryset.values_list('crianca_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        PlacarCrianca.objects.recalcular(afetadas)
+
+
+@admin.register(ImportacaoJob)
+class ImportacaoJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'nome_arquivo', 'status', 'semanas', 'linhas_lidas', 'resultados_gravados', 'duracao',
+        'criado_em', 'concluido_em',
+    ]
+    list_filter = ['status']
+    search_fields = ['nome_arquivo']
+    readonly_fields = [f.name for f in ImportacaoJob._meta.fields] + ['etapas']
+
+    @admin.display(description='Duração (s)')
+    def duracao(self, obj):
+        return (obj.resumo or {}).get('duracao_s')
+
+    @admin.display(description='Tempo por etapa')
+    def etapas(self, obj):
+        etapas = (obj.resumo or {}).get('etapas') or []
+        return format_html_join(
+            mark_safe('<br>'), '{}: {} s ({}%), {} queries',
+            ((e['etapa'], e['segundos'], e['percentual'], e['queries']) for e in etapas),
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Temporada)
+class TemporadaAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'slug', 'ativa', 'criada_em', 'arquivada_em']
+    prepopulated_fields = {'slug': ['nome']}
+    readonly_fields = ['arquivada_em']
+    actions = ['arquivar_temporadas']
+
+    @admin.action(description='Arquivar as temporadas selecionadas (guarda só o resumo)')
+    def arquivar_temporadas(self, request, queryset):
+        for temporada in queryset:
+            try:
+                feito = arquivar(temporada)
+            except ValueError as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                self.message_user(
+                    request,
+                    f'{temporada} arquivada: {feito["criancas"]} crianças, {feito["resultados"]} resultados e '
+                    f'{feito["semanas"]} semanas saíram das tabelas.',
+                )
+
+
+@admin.register(ResumoTemporada)
+class ResumoTemporadaAdmin(admin.ModelAdmin):
+    list_display = ['posicao', 'nome', 'turma', 'idade', 'total', 'semanas', 'temporada']
+    list_filter = ['temporada']
+    list_select_related = ['temporada']
+    search_fields = ['nome', 'turma']
+    ordering = ['temporada', 'posicao', 'nome']
+
+    def has_add_permission(self, request):
+        return False
 
-    pontos_totais.short_description = 'Pontos'
+    def has_change_permission(self, request, obj=None):
+        return False
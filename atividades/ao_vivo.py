@@ -0,0 +1,131 @@
+"""
+Ranking ao vivo por Server-Sent Events (requer servidor ASGI, ex.: uvicorn).
+
+Cada processo tem um único Transmissor: uma task asyncio que consulta a versão
+dos dados a cada RANKING_AO_VIVO_INTERVALO segundos e, quando ela muda, monta
+os quadros do ranking uma vez só (todas as faixas juntas) e envia a diferença
+(posições, totais, medalhas) para a fila de cada tela conectada. Uma tela ociosa custa apenas uma
+corrotina esperando na sua fila.
+"""
+import asyncio
+import json
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache_ranking import quadros_em_cache, chave_versao
+from .models import VersaoDados
+
+# Comentário SSE enviado periodicamente para o proxy não derrubar a conexão
+BATIMENTO = ": ping\n\n"
+
+
+def diff_ranking(anterior, atual):
+    """
+    Compara dois rankings (listas de itens do motor) pelo id da criança.
+    Retorna os itens novos ou alterados e os ids que saíram.
+    """
+    antes = {item["id"]: item for item in anterior}
+    ids_atuais = set()
+    alterados = []
+    for item in atual:
+        ids_atuais.add(item["id"])
+        if antes.get(item["id"]) != item:
+            alterados.append(item)
+    removidos = [crianca_id for crianca_id in antes if crianca_id not in ids_atuais]
+    return {"alterados": alterados, "removidos": removidos}
+
+
+def _evento(tipo, dados):
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+def _estado_atual(faixas):
+    """(chave da versão, {faixa: ranking}) lidos no thread síncrono do Django."""
+    versao = VersaoDados.objects.atual()
+    quadros = quadros_em_cache(versao)
+    # Uma turma que deixou de existir vira um quadro vazio (as linhas saem da tela)
+    rankings = {faixa: quadros.get(faixa, {"ranking": []})["ranking"] for faixa in faixas}
+    return chave_versao(versao), rankings
+
+
+def _versao_atual():
+    return chave_versao(VersaoDados.objects.atual())
+
+
+class Transmissor:
+    def __init__(self):
+        self.assinantes = defaultdict(set)
+        self.rankings = {}
+        self.versao = None
+        self.tarefa = None
+
+    @property
+    def intervalo(self):
+        return getattr(settings, "RANKING_AO_VIVO_INTERVALO", 1.0)
+
+    def total_assinantes(self):
+        return sum(len(filas) for filas in self.assinantes.values())
+
+    async def assinar(self, faixa):
+        fila = asyncio.Queue()
+        self.assinantes[faixa].add(fila)
+        if faixa not in self.rankings:
+            # Lê a faixa nova e, de quebra, atualiza as demais se a versão mudou
+            await self._publicar()
+        if self.tarefa is None or self.tarefa.done():
+            self.tarefa = asyncio.get_running_loop().create_task(self._vigiar())
+        return fila
+
+    def cancelar(self, faixa, fila):
+        self.assinantes[faixa].discard(fila)
+
+    async def _vigiar(self):
+        while self.total_assinantes():
+            await asyncio.sleep(self.intervalo)
+            try:
+                versao = await sync_to_async(_versao_atual)()
+                if versao != self.versao:
+                    await self._publicar()
+            except Exception:  # banco indisponível etc.: tenta de novo no próximo ciclo
+                continue
+        # Sem ninguém assistindo: descarta o estado para não enviar diffs velhos depois
+        self.rankings.clear()
+        self.versao = None
+
+    async def _publicar(self):
+        faixas = [faixa for faixa, filas in self.assinantes.items() if filas]
+        versao, rankings = await sync_to_async(_estado_atual)(faixas)
+        for faixa in faixas:
+            anterior = self.rankings.get(faixa)
+            self.rankings[faixa] = rankings[faixa]
+            if anterior is None:  # faixa recém-assinada: a tela já tem a página inteira
+                continue
+            diff = diff_ranking(anterior, rankings[faixa])
+            if diff["alterados"] or diff["removidos"]:
+                mensagem = _evento("diff", {"versao": versao, **diff})
+                for fila in list(self.assinantes[faixa]):
+                    fila.put_nowait(mensagem)
+        # Faixas sem telas ficam com ranking desatualizado: serão relidas no próximo assinar()
+        for faixa in set(self.rankings) - set(faixas):
+            del self.rankings[faixa]
+        self.versao = versao
+
+    async def eventos(self, faixa):
+        """Gerador assíncrono do stream SSE de uma tela."""
+        fila = await self.assinar(faixa)
+        try:
+            yield "retry: 3000\n\n"
+            yield _evento("versao", {"versao": self.versao})
+            batimento = getattr(settings, "RANKING_AO_VIVO_BATIMENTO", 15.0)
+            while True:
+                try:
+                    yield await asyncio.wait_for(fila.get(), timeout=batimento)
+                except asyncio.TimeoutError:
+                    yield BATIMENTO
+        finally:
+            self.cancelar(faixa, fila)
+
+
+transmissor = Transmissor()
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class AtividadesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'atividades'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .banco import configurar_sqlite
+        from .models import dados_alterados
+        from .publicacao import agendar_publicacao
+
+        connection_created.connect(configurar_sqlite, dispatch_uid="atividades.configurar_sqlite")
+        dados_alterados.connect(agendar_publicacao, dispatch_uid="atividades.agendar_publicacao")
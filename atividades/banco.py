@@ -0,0 +1,86 @@
+"""
+Ajustes e atalhos específicos de cada banco.
+
+SQLite em produção:
+
+Com o journal padrão (rollback), uma importação bloqueia quem lê o ranking e
+as leituras falham com "database is locked". Em WAL leitores e o escritor
+não se bloqueiam; os demais PRAGMAs (setting SQLITE_PRAGMAS) reduzem fsync e
+I/O. A espera por lock (timeout) e o BEGIN IMMEDIATE ficam em
+DATABASES["default"]["OPTIONS"].
+
+PostgreSQL: upsert_em_massa usa COPY (psycopg 3) nas gravações grandes.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+
+def configurar_sqlite(sender, connection, **kwargs):
+    """Receptor de connection_created: aplica SQLITE_PRAGMAS a cada conexão nova."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, valor in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {valor}")
+
+
+def pragmas_atuais(connection):
+    """{pragma: valor} vigentes na conexão (para conferência e testes)."""
+    valores = {}
+    with connection.cursor() as cursor:
+        for pragma in getattr(settings, "SQLITE_PRAGMAS", {}):
+            cursor.execute(f"PRAGMA {pragma}")
+            valores[pragma] = cursor.fetchone()[0]
+    return valores
+
+
+def copy_disponivel():
+    """True se o banco atual aceita COPY ... FROM STDIN pelo driver (PostgreSQL + psycopg 3)."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        return hasattr(cursor, "copy")
+
+
+def upsert_em_massa(model, objetos, unique_fields, update_fields, batch_size=None):
+    """
+    Insere `objetos` ou, se já existir a linha com os mesmos `unique_fields`,
+    atualiza os `update_fields`. No PostgreSQL com psycopg 3 copia tudo com
+    COPY para uma tabela temporária e faz um único INSERT ... ON CONFLICT;
+    nos demais bancos usa bulk_create(update_conflicts=True).
+    """
+    if not objetos:
+        return
+    if not copy_disponivel():
+        model.objects.bulk_create(
+            objetos,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+        return
+
+    qn = connection.ops.quote_name
+    opts = model._meta
+    campos = [campo for campo in opts.local_concrete_fields if not campo.primary_key]
+    colunas = ", ".join(qn(campo.column) for campo in campos)
+    tabela = qn(opts.db_table)
+    temporaria = qn(f"copia_{opts.db_table}")
+    unicos = ", ".join(qn(opts.get_field(nome).column) for nome in unique_fields)
+    atualizar = ", ".join(
+        f"{qn(opts.get_field(nome).column)} = EXCLUDED.{qn(opts.get_field(nome).column)}"
+        for nome in update_fields
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE {temporaria} ON COMMIT DROP AS SELECT {colunas} FROM {tabela} WITH NO DATA"
+        )
+        with cursor.copy(f"COPY {temporaria} ({colunas}) FROM STDIN") as copia:
+            for objeto in objetos:
+                copia.write_row([getattr(objeto, campo.attname) for campo in campos])
+        cursor.execute(
+            f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM {temporaria} "
+            f"ON CONFLICT ({unicos}) DO UPDATE SET {atualizar}"
+        )
+        cursor.execute(f"DROP TABLE {temporaria}")
@@ -0,0 +1,579 @@
+"""
+Utilitários para medir desempenho com dados sintéticos.
+
+Os dados são gerados dentro de uma transação que é desfeita ao final, então
+os comandos de benchmark podem rodar contra o banco real sem sujá-lo. A carga
+HTTP (carga_http) é a exceção: mede um servidor de verdade, com os dados dele.
+"""
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+from urllib.parse import urlsplit
+
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, transaction
+from django.db.models import Max, Sum, Value
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.test import Client, RequestFactory, override_settings
+from django.utils import timezone
+
+from .import_planilha import _descobrir_colunas_semana, _parse_decimal_br, importar_planilha
+from .models import Crianca, Semana, Atividade, Resultado, PlacarCrianca, HistoricoRanking, Temporada
+from .ranking import chave_turma, montar_quadros, montar_ranking
+from .views import lancamentos_view, ranking_exportar
+
+NOTAS_PADRAO = (1, 1.5, 2, 3, 5, 10)
+TURMAS = ("Sementinhas", "Exploradores", "Mensageiros", "Embaixadores")
+
+
+def gerar_dados(criancas, semanas=4, notas=NOTAS_PADRAO, semente=42):
+    """
+    Cria `criancas` crianças, `semanas` semanas e um Resultado por criança/semana
+    na atividade Nota, com uma nota sorteada entre `notas`, além de uma atividade
+    comum por nota (para os lançamentos). Atualiza o placar ao final.
+    """
+    rnd = random.Random(semente)
+    hoje = date.today()
+    temporada = Temporada.objects.atual()
+
+    Crianca.objects.bulk_create(
+        [
+            Crianca(
+                temporada=temporada, nome=f"Criança {i:06d}", nome_normalizado=f"crianca {i:06d}",
+                idade=rnd.randint(2, 12), turma=rnd.choice(TURMAS),
+            )
+            for i in range(criancas)
+        ],
+        batch_size=1000,
+    )
+    # Semana.numero é único: numera depois das semanas que já existem no banco
+    base = temporada.semanas.aggregate(maior=Max("numero"))["maior"] or 0
+    Semana.objects.bulk_create([
+        Semana(temporada=temporada, numero=base + n, data_inicio=hoje, data_fim=hoje)
+        for n in range(1, semanas + 1)
+    ])
+    Atividade.objects.bulk_create([Atividade(nome=f"Atividade {n:g}", pontos=n) for n in notas])
+    nota_id = Atividade.objects.nota().pk
+
+    crianca_ids = list(temporada.criancas.values_list("id", flat=True))
+    semana_ids = list(temporada.semanas.filter(numero__gt=base).values_list("id", flat=True))
+    Resultado.objects.bulk_create(
+        (
+            Resultado(crianca_id=c, semana_id=s, atividade_id=nota_id, pontos=rnd.choice(notas))
+            for c in crianca_ids
+            for s in semana_ids
+        ),
+        batch_size=2000,
+    )
+    PlacarCrianca.objects.recalcular(crianca_ids, historico=False)
+
+
+def gerar_planilha(criancas, semanas=20, notas=NOTAS_PADRAO, vazias=0.1, semente=42, primeira_semana=1):
+    """
+    Bytes de um .xlsx no formato da importação (Nome, 1ªSemana, ..., TOTAL),
+    com notas em texto com vírgula decimal e uma fração de células vazias.
+    """
+    rnd = random.Random(semente)
+    linhas = []
+    for i in range(criancas):
+        valores = [
+            None if rnd.random() < vazias else str(rnd.choice(notas)).replace(".", ",")
+            for _ in range(semanas)
+        ]
+        linhas.append([f"Criança {i:06d}"] + valores + [None])
+    colunas = (
+        ["Nome"]
+        + [f"{n}ªSemana" for n in range(primeira_semana, primeira_semana + semanas)]
+        + ["TOTAL"]
+    )
+    bio = io.BytesIO()
+    pd.DataFrame(linhas, columns=colunas).to_excel(bio, index=False)
+    return bio.getvalue()
+
+
+@contextmanager
+def desfazer_ao_final():
+    """Bloco transacional que sempre é desfeito (rollback) ao sair."""
+    with transaction.atomic():
+        try:
+            yield
+        finally:
+            transaction.set_rollback(True)
+
+
+@contextmanager
+def dados_sinteticos(*args, **kwargs):
+    """Gera dados com `gerar_dados` e desfaz tudo ao sair do bloco."""
+    with desfazer_ao_final():
+        gerar_dados(*args, **kwargs)
+        yield
+
+
+class ContadorQueries:
+    """execute_wrapper que só conta as queries (sem o limite de log do CaptureQueriesContext)."""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+def medir(func, *args, repeticoes=3, memoria=False, **kwargs):
+    """
+    Executa `func` algumas vezes e retorna o melhor tempo e o nº de queries.
+    Com `memoria=True`, faz uma execução extra sob tracemalloc (que é lenta,
+    por isso fica fora da cronometragem) e informa o pico de memória Python.
+    """
+    melhor = None
+    for _ in range(repeticoes):
+        contador = ContadorQueries()
+        with connection.execute_wrapper(contador):
+            inicio = time.perf_counter()
+            func(*args, **kwargs)
+            duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    medicao = {"segundos": round(melhor, 4), "queries": contador.total}
+
+    if memoria:
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        medicao["pico_mb"] = round(pico / 1024 / 1024, 2)
+    return medicao
+
+
+def percentil(valores, p):
+    """Percentil `p` (0–100) pelo método do vizinho mais próximo."""
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def concorrencia(planilhas, leitores=4, leituras_minimas=20):
+    """
+    Importa cada planilha (bytes .xlsx) na sua própria thread enquanto
+    `leitores` threads montam o ranking sem cache, em loop, até as importações
+    terminarem. Precisa de um banco em arquivo (cada thread abre a sua conexão).
+    Retorna latências das leituras (p50/p95/máx, em ms), tempo das importações
+    e os erros de banco ("database is locked" etc.) observados.
+    """
+    latencias, erros = [], []
+    trava = threading.Lock()
+    importando = threading.Event()
+    importando.set()
+
+    def importar(i, conteudo):
+        try:
+            importar_planilha(SimpleUploadedFile(f"concorrencia-{i}.xlsx", conteudo))
+        except OperationalError as e:
+            with trava:
+                erros.append(f"importação {i}: {e}")
+        finally:
+            connection.close()
+
+    def ler():
+        feitas = 0
+        try:
+            while importando.is_set() or feitas < leituras_minimas:
+                inicio = time.perf_counter()
+                try:
+                    montar_ranking()
+                except OperationalError as e:
+                    with trava:
+                        erros.append(f"leitura: {e}")
+                    continue
+                finally:
+                    feitas += 1
+                with trava:
+                    latencias.append(time.perf_counter() - inicio)
+        finally:
+            connection.close()
+
+    threads_leitura = [threading.Thread(target=ler) for _ in range(leitores)]
+    threads_importacao = [
+        threading.Thread(target=importar, args=(i, conteudo)) for i, conteudo in enumerate(planilhas)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads_leitura + threads_importacao:
+        thread.start()
+    for thread in threads_importacao:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    importando.clear()
+    for thread in threads_leitura:
+        thread.join()
+
+    ms = [t * 1000 for t in latencias]
+    return {
+        "importacoes_s": round(duracao, 3),
+        "leituras": len(ms),
+        "p50_ms": round(statistics.median(ms), 1) if ms else None,
+        "p95_ms": round(percentil(ms, 95), 1) if ms else None,
+        "max_ms": round(max(ms), 1) if ms else None,
+        "erros": erros,
+    }
+
+
+def lancamentos(por_envio=200, envios=20, semente=42):
+    """
+    Envia `envios` lotes de `por_envio` entradas à API de lançamentos (sobre os
+    dados já existentes, na semana mais recente, como na pontuação ao vivo) e
+    mede entradas/s, latência por envio e queries por envio.
+    """
+    rnd = random.Random(semente)
+    crianca_ids = list(Crianca.objects.filter(temporada__ativa=True).values_list("id", flat=True))
+    semana = Semana.objects.filter(temporada__ativa=True).aggregate(maior=Max("numero"))["maior"]
+    atividade_ids = list(Atividade.objects.filter(pontuacao_livre=False).values_list("id", flat=True))
+    fabrica = RequestFactory()
+    usuario = User(username="benchmark", is_active=True, is_superuser=True)
+
+    tempos, queries = [], []
+    for _ in range(envios):
+        entradas = {}
+        while len(entradas) < por_envio:
+            chave = (rnd.choice(crianca_ids), semana, rnd.choice(atividade_ids))
+            entradas[chave] = rnd.randint(0, 3)
+        corpo = json.dumps({"entradas": [
+            {"crianca": c, "semana": s, "atividade": a, "quantidade": q} for (c, s, a), q in entradas.items()
+        ]})
+        request = fabrica.post("/api/lancamentos/", corpo, content_type="application/json")
+        request.user = usuario
+        contador = ContadorQueries()
+        with connection.execute_wrapper(contador):
+            inicio = time.perf_counter()
+            resposta = lancamentos_view(request)
+            tempos.append(time.perf_counter() - inicio)
+        if resposta.status_code != 200:
+            raise RuntimeError(resposta.content.decode())
+        queries.append(contador.total)
+    return {
+        "entradas_por_s": round(por_envio * envios / sum(tempos)),
+        "p50_ms": round(statistics.median(tempos) * 1000, 1),
+        "p95_ms": round(percentil(tempos, 95) * 1000, 1),
+        "queries_por_envio": max(queries),
+    }
+
+
+def exportacao(formato="json", comprimir=False, **params):
+    """
+    Baixa /api/ranking.<formato> chamando a view direto e consumindo o
+    streaming como um cliente faria. Retorna o nº de bytes recebidos.
+    """
+    extras = {"HTTP_ACCEPT_ENCODING": "gzip"} if comprimir else {}
+    resposta = ranking_exportar(RequestFactory().get(f"/api/ranking.{formato}", params, **extras), formato)
+    return sum(len(parte) for parte in resposta.streaming_content)
+
+
+def exportacao_em_lista():
+    """Referência: o ranking inteiro montado numa lista e serializado de uma vez."""
+    return len(json.dumps({"itens": montar_ranking()}, ensure_ascii=False).encode())
+
+
+def carga_http(base, caminhos, clientes=8, duracao=10.0, timeout=10.0):
+    """
+    `clientes` threads fazendo GET nos `caminhos` (em rodízio) do servidor em
+    `base` ("http://host:porta") durante `duracao` segundos, cada uma com a sua
+    conexão keep-alive, como as telas atrás do nginx. Retorna requests/s,
+    latência p50/p95 (ms) e os erros (status diferente de 200/304 ou falha de
+    conexão).
+    """
+    url = urlsplit(base)
+    latencias, erros = [], []
+    trava = threading.Lock()
+    fim = time.perf_counter() + duracao
+
+    def cliente(n):
+        conexao = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        minhas = []
+        i = n
+        try:
+            while time.perf_counter() < fim:
+                caminho = caminhos[i % len(caminhos)]
+                i += 1
+                inicio = time.perf_counter()
+                try:
+                    conexao.request("GET", caminho, headers={"Accept-Encoding": "gzip"})
+                    resposta = conexao.getresponse()
+                    resposta.read()
+                except (OSError, http.client.HTTPException) as e:
+                    conexao.close()
+                    with trava:
+                        erros.append(f"{caminho}: {e}")
+                    continue
+                if resposta.status not in (200, 304):
+                    with trava:
+                        erros.append(f"{caminho}: HTTP {resposta.status}")
+                    continue
+                minhas.append(time.perf_counter() - inicio)
+        finally:
+            conexao.close()
+            with trava:
+                latencias.extend(minhas)
+
+    threads = [threading.Thread(target=cliente, args=(n,)) for n in range(clientes)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    decorrido = time.perf_counter() - inicio
+
+    ms = [t * 1000 for t in latencias]
+    return {
+        "requests": len(ms),
+        "requests_por_s": round(len(ms) / decorrido, 1),
+        "p50_ms": round(statistics.median(ms), 1) if ms else None,
+        "p95_ms": round(percentil(ms, 95), 1) if ms else None,
+        "erros": erros,
+    }
+
+
+@contextmanager
+def servidor_gunicorn(workers, threads, perfil="ranking", espera=30.0):
+    """
+    Sobe um gunicorn com gincana/servidor.py (perfil e tamanho dados, numa
+    porta livre, usando o mesmo banco deste processo) e entrega a URL base.
+    O servidor é encerrado ao sair do bloco.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        porta = sock.getsockname()[1]
+    aplicacao = "gincana.asgi:application" if perfil == "ao_vivo" else "gincana.wsgi:application"
+    ambiente = {
+        **os.environ,
+        "GUNICORN_PERFIL": perfil,
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_THREADS": str(threads),
+        "GUNICORN_BIND": f"127.0.0.1:{porta}",
+        "GUNICORN_LOGLEVEL": "warning",
+    }
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "python:gincana.servidor", aplicacao],
+        cwd=settings.BASE_DIR, env=ambiente,
+    )
+    try:
+        limite = time.perf_counter() + espera
+        while True:
+            if processo.poll() is not None:
+                raise RuntimeError(f"O gunicorn saiu com código {processo.returncode} ao iniciar.")
+            try:
+                socket.create_connection(("127.0.0.1", porta), timeout=1).close()
+                break
+            except OSError:
+                if time.perf_counter() > limite:
+                    raise RuntimeError(f"O gunicorn não abriu a porta {porta} em {espera:g}s.")
+                time.sleep(0.2)
+        yield f"http://127.0.0.1:{porta}"
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=espera)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+            processo.wait()
+
+
+# Alias de cache que nunca guarda nada: as telas "sem cache" montam o ranking a cada request
+CACHE_DESLIGADO = "benchmark-sem-cache"
+
+
+def _get(cliente, url):
+    resposta = cliente.get(url)
+    if resposta.status_code != 200:
+        raise RuntimeError(f"GET {url}: HTTP {resposta.status_code}")
+    return resposta
+
+
+def _importar_e_desfazer(conteudo, **kwargs):
+    with desfazer_ao_final():
+        importar_planilha(SimpleUploadedFile("benchmark.xlsx", conteudo), **kwargs)
+
+
+def _caminhos_suite(cliente, linhas_planilha, por_envio):
+    """{nome: função sem argumentos} de cada caminho medido pela suíte, sobre os dados já gerados."""
+    ultima = Semana.objects.filter(temporada__ativa=True).aggregate(maior=Max("numero"))["maior"]
+    turma = Crianca.objects.filter(temporada__ativa=True).exclude(turma="").values_list("turma", flat=True).first()
+    crianca = Crianca.objects.filter(temporada__ativa=True).order_by("id").first()
+    planilha = gerar_planilha(linhas_planilha, semanas=4, primeira_semana=ultima + 1)
+    reimportacao = gerar_planilha(linhas_planilha, semanas=4, primeira_semana=1)
+    importar_planilha(SimpleUploadedFile("base.xlsx", reimportacao))
+
+    rnd = random.Random(42)
+    atividades = list(Atividade.objects.filter(pontuacao_livre=False).values_list("id", flat=True))
+    criancas = list(Crianca.objects.filter(temporada__ativa=True).values_list("id", flat=True))
+    lote = json.dumps({"entradas": [
+        {"crianca": c, "semana": ultima, "atividade": rnd.choice(atividades), "quantidade": 2}
+        for c in rnd.sample(criancas, min(por_envio, len(criancas)))
+    ]})
+
+    def lancar():
+        with desfazer_ao_final():
+            resposta = cliente.post("/api/lancamentos/", lote, content_type="application/json")
+            if resposta.status_code != 200:
+                raise RuntimeError(resposta.content.decode())
+
+    def sem_cache(url):
+        def func():
+            with override_settings(RANKING_CACHE_ALIAS=CACHE_DESLIGADO):
+                _get(cliente, url)
+        return func
+
+    return {
+        "ranking.montar_ranking": montar_ranking,
+        "ranking.montar_quadros": montar_quadros,
+        "tela.ranking": sem_cache("/ranking/"),
+        "tela.ranking_ate4": sem_cache("/ranking/ate-4/"),
+        "tela.ranking_5mais": sem_cache("/ranking/5-mais/"),
+        "tela.ranking_turma": sem_cache(f"/ranking/{chave_turma(turma)}/"),
+        "tela.ranking_em_cache": lambda: _get(cliente, "/ranking/"),
+        "tela.historico_semana": lambda: _get(cliente, f"/ranking/historico/{ultima}/?limite=100"),
+        "admin.resultados": lambda: _get(cliente, "/admin/atividades/resultado/"),
+        "admin.crianca": lambda: _get(cliente, f"/admin/atividades/crianca/{crianca.pk}/change/"),
+        "importacao.nova": lambda: _importar_e_desfazer(planilha),
+        "importacao.diferencial": lambda: _importar_e_desfazer(reimportacao, diferencial=True),
+        "lancamentos.lote": lancar,
+        "exportacao.json": exportacao,
+    }
+
+
+def executar_suite(criancas=1000, semanas=8, linhas_planilha=500, por_envio=200, repeticoes=3, memoria=True):
+    """
+    Gera dados sintéticos e mede tempo, nº de queries e (com `memoria`) pico de
+    memória Python de cada caminho de _caminhos_suite. Tudo é desfeito ao final.
+    Retorna um dicionário serializável em JSON (usado como linha de base).
+    """
+    parametros = {
+        "criancas": criancas, "semanas": semanas, "linhas_planilha": linhas_planilha,
+        "por_envio": por_envio, "repeticoes": repeticoes,
+    }
+    caches_teste = {**settings.CACHES, CACHE_DESLIGADO: {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    resultados = {}
+    with desfazer_ao_final(), override_settings(ALLOWED_HOSTS=["*"], CACHES=caches_teste):
+        gerar_dados(criancas, semanas=semanas)
+        HistoricoRanking.objects.atualizar()
+        cliente = Client()
+        cliente.force_login(User.objects.create(username="benchmark-suite", is_staff=True, is_superuser=True))
+        for nome, func in _caminhos_suite(cliente, linhas_planilha, por_envio).items():
+            resultados[nome] = medir(func, repeticoes=repeticoes, memoria=memoria)
+    return {
+        "parametros": parametros,
+        "ambiente": {
+            "banco": connection.vendor,
+            "python": platform.python_version(),
+            "maquina": platform.node(),
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(base, atual, tolerancia=0.2, folga_s=0.005, folga_mb=1.0):
+    """
+    Lista (texto) das regressões de `atual` em relação a `base`: tempo ou pico
+    de memória acima de `tolerancia` (fração) mais uma folga absoluta contra
+    ruído em caminhos muito rápidos, ou qualquer query a mais.
+    """
+    regressoes = []
+    for nome, medida in atual["resultados"].items():
+        anterior = base["resultados"].get(nome)
+        if anterior is None:
+            continue
+        if medida["segundos"] > anterior["segundos"] * (1 + tolerancia) + folga_s:
+            regressoes.append(
+                f"{nome}: {medida['segundos']:.4f}s (linha de base {anterior['segundos']:.4f}s, "
+                f"+{medida['segundos'] / anterior['segundos'] - 1:.0%})"
+            )
+        if medida["queries"] > anterior["queries"]:
+            regressoes.append(f"{nome}: {medida['queries']} queries (linha de base {anterior['queries']})")
+        if "pico_mb" in medida and "pico_mb" in anterior and (
+            medida["pico_mb"] > anterior["pico_mb"] * (1 + tolerancia) + folga_mb
+        ):
+            regressoes.append(
+                f"{nome}: pico de {medida['pico_mb']} MB (linha de base {anterior['pico_mb']} MB)"
+            )
+    return regressoes
+
+
+def ranking_legado(qs):
+    """
+    Implementação anterior ao motor único (agregação por JOIN + duas passadas),
+    mantida apenas como referência de comparação.
+    """
+    qs = qs.annotate(total=Coalesce(Sum("resultado__pontos"), Value(0.0))).order_by("-total", "nome")
+    tops = sorted({c.total for c in qs if c.total and c.total > 0}, reverse=True)[:3]
+    ranking, ultimo, posicao = [], None, 0
+    for i, c in enumerate(qs, start=1):
+        if c.total != ultimo:
+            posicao, ultimo = i, c.total
+        medalha = None
+        for nome_medalha, total in zip(("ouro", "prata", "bronze"), tops):
+            if c.total == total:
+                medalha = nome_medalha
+        ranking.append({"posicao": posicao, "nome": c.nome, "total": c.total, "medalha": medalha})
+    return ranking
+
+
+def importar_legado(file_obj):
+    """
+    Importação anterior à versão vetorizada (iterrows + get_or_create por
+    célula), mantida apenas como referência de comparação.
+    """
+    df = pd.read_excel(io.BytesIO(file_obj.read()), header=0)
+    df.rename(columns={df.columns[0]: "NOME"}, inplace=True)
+    semanas_cols = [(numero, df.columns[posicao]) for numero, posicao in _descobrir_colunas_semana(df.columns)]
+    nomes = df["NOME"].astype(str).map(lambda s: s.strip()).replace({"nan": ""})
+
+    nome_to_crianca = {}
+    for nome in nomes:
+        if nome:
+            nome_to_crianca[nome], _ = Crianca.objects.get_or_create(
+                nome=nome, temporada__ativa=True, defaults={"idade": 0}
+            )
+    hoje = timezone.localdate()
+    numero_to_semana = {
+        numero: Semana.objects.get_or_create(
+            numero=numero, temporada__ativa=True, defaults={"data_inicio": hoje, "data_fim": hoje}
+        )[0]
+        for numero, _col in semanas_cols
+    }
+    Resultado.objects.filter(
+        crianca_id__in=[c.id for c in nome_to_crianca.values()],
+        semana_id__in=[s.id for s in numero_to_semana.values()],
+    ).delete()
+
+    novos = []
+    for _, row in df.iterrows():
+        crianca = nome_to_crianca.get(str(row["NOME"]).strip())
+        if not crianca:
+            continue
+        for numero, col in semanas_cols:
+            valor = _parse_decimal_br(row.get(col))
+            if not valor:
+                continue
+            atividade, _ = Atividade.objects.get_or_create(
+                pontos=float(valor), defaults={"nome": f"Nota {valor.normalize()}"}
+            )
+            novos.append(Resultado(
+                crianca=crianca, semana=numero_to_semana[numero], atividade=atividade, quantidade=1,
+                pontos=atividade.pontos,
+            ))
+    Resultado.objects.bulk_create(novos)
+    PlacarCrianca.objects.recalcular([c.id for c in nome_to_crianca.values()], historico=False)
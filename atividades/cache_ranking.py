@@ -0,0 +1,82 @@
+"""
+Cache do ranking versionado pelo contador VersaoDados.
+
+A chave inclui a versão atual dos dados: qualquer importação ou edição no admin
+incrementa a versão e as entradas antigas simplesmente deixam de ser lidas
+(expiram pelo timeout). Funciona com LocMemCache e FileBasedCache; com o
+FileBasedCache os workers do gunicorn na mesma máquina compartilham o cache.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import VersaoDados
+from .ranking import montar_quadros
+from .temporadas import montar_quadros_temporada
+
+CHAVE_ESTATISTICA = "ranking:estatisticas:{}"
+
+
+def _cache():
+    return caches[getattr(settings, "RANKING_CACHE_ALIAS", "default")]
+
+
+def chave_versao(versao):
+    # O timestamp evita colisão com entradas de outro banco que tenha o mesmo nº de versão
+    return f"{versao.versao}-{versao.atualizado_em.timestamp():.6f}"
+
+
+def ranking_em_cache(nome, montar, versao=None):
+    """
+    Retorna o ranking `nome` da versão atual dos dados, chamando `montar()`
+    apenas quando ele ainda não está no cache.
+    """
+    if versao is None:
+        versao = VersaoDados.objects.atual()
+    cache = _cache()
+    chave = f"ranking:{chave_versao(versao)}:{nome}"
+
+    ranking = cache.get(chave)
+    if ranking is None:
+        _contar("misses")
+        ranking = montar()
+        cache.set(chave, ranking, getattr(settings, "RANKING_CACHE_TIMEOUT", 3600))
+    else:
+        _contar("hits")
+    return ranking
+
+def quadros_em_cache(versao=None, temporada=None):
+    """
+    Todos os quadros do ranking (geral, faixas e turmas) numa única entrada do
+    cache, da temporada ativa ou de `temporada`.
+    """
+    if temporada is None or temporada.ativa:
+        return ranking_em_cache("quadros", montar_quadros, versao)
+    return ranking_em_cache(f"quadros:{temporada.slug}", lambda: montar_quadros_temporada(temporada), versao)
+
+
+def _contar(tipo):
+    cache = _cache()
+    chave = CHAVE_ESTATISTICA.format(tipo)
+    cache.add(chave, 0, timeout=None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # Expirou/foi removida entre o add e o incr (ex.: cache.clear())
+        cache.set(chave, 1, timeout=None)
+
+
+def estatisticas():
+    cache = _cache()
+    hits = cache.get(CHAVE_ESTATISTICA.format("hits"), 0)
+    misses = cache.get(CHAVE_ESTATISTICA.format("misses"), 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "taxa_acerto": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def zerar_estatisticas():
+    cache = _cache()
+    cache.delete_many([CHAVE_ESTATISTICA.format("hits"), CHAVE_ESTATISTICA.format("misses")])
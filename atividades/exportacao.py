@@ -0,0 +1,177 @@
+"""
+Exportação do ranking em JSON e CSV (painéis, aplicativo dos pais).
+
+Usa o mesmo motor das telas (linhas_ranking + Classificador), mas lê as linhas
+com .iterator() e escreve os itens direto na resposta (StreamingHttpResponse),
+em blocos de ITENS_POR_BLOCO: exportar 100 mil crianças não monta nenhuma
+lista em memória.
+
+Filtros: faixa (geral, chave de RANKING_FAIXAS ou turma-<slug>) e semana
+(classifica só pelos pontos daquela semana), dentro da temporada ativa ou da
+temporada da URL (/temporadas/<slug>/api/...). Com pagina/por_pagina a query
+para no fim da página (LIMIT), mas ainda lê as linhas anteriores a ela: a
+posição e a medalha de cada criança dependem de todas as de cima (empates).
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.db.models import F, FilteredRelation, Q
+
+from .models import Crianca, Semana
+from .ranking import Classificador, PREFIXO_TURMA, chave_turma, faixas_configuradas, linhas_ranking
+
+CAMPOS_EXPORTACAO = ("posicao", "id", "nome", "idade", "total", "medalha")
+POR_PAGINA_PADRAO = 100
+ITENS_POR_BLOCO = 500
+LINHAS_POR_LEITURA = 2000
+
+
+class ParametroInvalido(ValueError):
+    pass
+
+
+def _limite_por_pagina():
+    return getattr(settings, "EXPORTACAO_MAX_POR_PAGINA", 1000)
+
+
+def _inteiro(params, nome, minimo, maximo=None):
+    valor = params.get(nome)
+    if valor is None:
+        return None
+    try:
+        valor = int(valor)
+    except ValueError:
+        valor = None
+    if valor is None or valor < minimo or (maximo is not None and valor > maximo):
+        faixa = f"entre {minimo} e {maximo}" if maximo is not None else f">= {minimo}"
+        raise ParametroInvalido(f"{nome} deve ser um inteiro {faixa}.")
+    return valor
+
+
+def ler_parametros(params):
+    """
+    {"faixa", "semana", "pagina", "por_pagina"} dos parâmetros da request
+    (pagina None = ranking inteiro). Levanta ParametroInvalido.
+    """
+    pagina = _inteiro(params, "pagina", 1)
+    por_pagina = _inteiro(params, "por_pagina", 1, _limite_por_pagina())
+    if por_pagina is not None and pagina is None:
+        pagina = 1
+    return {
+        "faixa": params.get("faixa", "geral"),
+        "semana": _inteiro(params, "semana", 0),
+        "pagina": pagina,
+        "por_pagina": (por_pagina or POR_PAGINA_PADRAO) if pagina else None,
+    }
+
+
+def consultar(faixa="geral", semana=None, temporada=None):
+    """
+    (nome do quadro, linhas do ranking) para a faixa/turma e, opcionalmente, a
+    semana pedidas, na `temporada` (padrão: a ativa); None se a faixa, a turma
+    ou a semana não existir, ou se a temporada já foi arquivada.
+    """
+    if temporada is None:
+        escopo = {"temporada__ativa": True}
+    elif temporada.arquivada:
+        return None
+    else:
+        escopo = {"temporada": temporada}
+    qs = Crianca.objects.filter(**escopo)
+    faixas = faixas_configuradas()
+    if faixa == "geral":
+        nome = None
+    elif faixa in faixas:
+        nome = faixas[faixa]["nome"]
+        if faixas[faixa].get("idade_min") is not None:
+            qs = qs.filter(idade__gte=faixas[faixa]["idade_min"])
+        if faixas[faixa].get("idade_max") is not None:
+            qs = qs.filter(idade__lte=faixas[faixa]["idade_max"])
+    elif faixa.startswith(PREFIXO_TURMA) and getattr(settings, "RANKING_POR_TURMA", True):
+        # "Turma A" e "turma a" são o mesmo quadro, como em montar_quadros
+        turmas = [
+            turma for turma in qs.exclude(turma="").order_by("turma").values_list("turma", flat=True).distinct()
+            if chave_turma(turma) == faixa
+        ]
+        if not turmas:
+            return None
+        nome = f"Turma {turmas[0]}"
+        qs = qs.filter(turma__in=turmas)
+    else:
+        return None
+
+    total = None
+    if semana is not None:
+        semana_id = Semana.objects.filter(numero=semana, **escopo).values_list("id", flat=True).first()
+        if semana_id is None:
+            return None
+        qs = qs.annotate(
+            da_semana=FilteredRelation("placares_semanais", condition=Q(placares_semanais__semana_id=semana_id))
+        )
+        total = F("da_semana__total")
+    return nome, linhas_ranking(qs, total=total)
+
+
+def classificar(linhas, inicio=0, fim=None):
+    """
+    Itens do ranking de índice [inicio, fim), lendo as linhas em streaming.
+    As anteriores a `inicio` passam pelo Classificador mas não viram saída.
+    """
+    if fim is not None:
+        linhas = linhas[:fim]
+    classificador = Classificador()
+    for indice, linha in enumerate(linhas.iterator(chunk_size=LINHAS_POR_LEITURA)):
+        item = classificador.classificar(linha)
+        if indice >= inicio:
+            yield item
+
+
+def _em_blocos(textos):
+    bloco = []
+    for texto in textos:
+        bloco.append(texto)
+        if len(bloco) == ITENS_POR_BLOCO:
+            yield "".join(bloco)
+            bloco = []
+    if bloco:
+        yield "".join(bloco)
+
+
+def json_em_partes(cabecalho, itens, por_pagina=None, proxima=None):
+    """
+    O documento {**cabecalho, "itens": [...], "proxima": ...} em pedaços.
+    Com `por_pagina`, `itens` traz um item a mais, que só indica se existe
+    a próxima página (`proxima` é a URL dela).
+    """
+    yield json.dumps(cabecalho, ensure_ascii=False)[:-1] + ', "itens": ['
+    tem_mais = False
+
+    def textos():
+        nonlocal tem_mais
+        for indice, item in enumerate(itens):
+            if por_pagina is not None and indice == por_pagina:
+                tem_mais = True
+                break
+            yield ("," if indice else "") + json.dumps(item, ensure_ascii=False)
+
+    yield from _em_blocos(textos())
+    yield '], "proxima": ' + json.dumps(proxima if tem_mais else None) + "}"
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha em vez de guardar."""
+
+    def write(self, texto):
+        return texto
+
+
+def csv_em_partes(itens):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(CAMPOS_EXPORTACAO)
+    yield from _em_blocos(
+        escritor.writerow([
+            item["posicao"], item["id"], item["nome"], item["idade"], item["total"], item["medalha"] or "",
+        ])
+        for item in itens
+    )
@@ -0,0 +1,244 @@
+"""
+Fila de importações em segundo plano, sem Celery/Redis.
+
+O upload só grava o arquivo e cria um ImportacaoJob; quem executa é:
+  - "thread" (padrão): uma thread daemon no próprio processo do gunicorn;
+  - "processo": o comando `manage.py processar_importacoes` rodando à parte;
+  - "nao": a própria request, de forma síncrona (como era antes).
+(setting IMPORTACAO_EM_SEGUNDO_PLANO)
+
+Duas importações com semanas em comum nunca rodam ao mesmo tempo: antes de
+começar, o job reserva suas semanas em TravaSemanaImportacao (temporada e
+número únicos). Se alguma já estiver reservada, o job espera na fila, na ordem
+de chegada. Importações para temporadas diferentes não disputam semanas.
+O progresso fica no cache compartilhado (o da importação ainda não foi
+commitado, então não pode ir para o banco) e o resultado final no próprio job.
+Pelo mesmo motivo o job em execução dá sinal de vida no cache (batimento, a
+cada lote gravado e no máximo uma vez por minuto): é o que impede que uma
+importação longa, mas saudável, seja dada como abandonada.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .import_planilha import importar_planilha, ler_semanas
+from .models import ImportacaoJob, Temporada, TravaSemanaImportacao
+
+logger = logging.getLogger(__name__)
+
+_evento = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _modo():
+    return getattr(settings, "IMPORTACAO_EM_SEGUNDO_PLANO", "thread")
+
+
+def _cache():
+    return caches[getattr(settings, "RANKING_CACHE_ALIAS", "default")]
+
+
+def _chave_progresso(job_id):
+    return f"importacao:{job_id}:progresso"
+
+
+def _chave_batimento(job_id):
+    return f"importacao:{job_id}:batimento"
+
+
+def _timeout_job():
+    return getattr(settings, "IMPORTACAO_JOB_TIMEOUT", 1800)
+
+
+# Intervalo mínimo entre dois batimentos do mesmo job (segundos)
+INTERVALO_BATIMENTO = 60
+
+
+def registrar_batimento(job):
+    """Marca que o job ainda está rodando; vale por IMPORTACAO_JOB_TIMEOUT segundos."""
+    _cache().set(_chave_batimento(job.pk), time.time(), timeout=_timeout_job())
+
+
+def enfileirar(arquivo, diferencial=False):
+    """
+    Cria o job para o arquivo enviado (lendo só o cabeçalho para saber as
+    semanas), destinado à temporada ativa, e acorda o executor depois do commit. Levanta ValueError se o
+    arquivo não tiver o formato esperado.
+    """
+    semanas = ler_semanas(arquivo)
+    job = ImportacaoJob(
+        nome_arquivo=arquivo.name, semanas=semanas, diferencial=diferencial, temporada=Temporada.objects.atual()
+    )
+    job.arquivo.save(arquivo.name, arquivo, save=False)
+    job.save()
+    transaction.on_commit(despertar)
+    return job
+
+
+def despertar():
+    modo = _modo()
+    if modo == "nao":
+        processar_pendentes()
+    elif modo == "thread":
+        _garantir_thread()
+        _evento.set()
+    # "processo": o comando processar_importacoes consulta a fila sozinho
+
+
+def _garantir_thread():
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop_thread, name="importacao", daemon=True)
+            _thread.start()
+
+
+def _loop_thread():
+    intervalo = getattr(settings, "IMPORTACAO_INTERVALO_FILA", 5.0)
+    while True:
+        _evento.wait(timeout=intervalo)
+        _evento.clear()
+        try:
+            processar_pendentes()
+        except Exception:
+            logger.exception("Falha no executor de importações")
+        finally:
+            close_old_connections()
+
+
+def liberar_abandonados():
+    """
+    Jobs "executando" sem atualização nem batimento há mais de
+    IMPORTACAO_JOB_TIMEOUT segundos (processo morto no meio) viram erro e
+    liberam suas semanas.
+    """
+    cache = _cache()
+    limite = timezone.now() - timedelta(seconds=_timeout_job())
+    abandonados = ImportacaoJob.objects.filter(status=ImportacaoJob.EXECUTANDO, atualizado_em__lt=limite)
+    for job in abandonados:
+        if cache.get(_chave_batimento(job.pk)) is not None:
+            continue
+        TravaSemanaImportacao.objects.filter(job=job).delete()
+        ImportacaoJob.objects.filter(pk=job.pk).update(
+            status=ImportacaoJob.ERRO,
+            erro="Importação interrompida (processo encerrado durante a execução).",
+            concluido_em=timezone.now(),
+        )
+
+
+def reservar_proximo():
+    """
+    Reserva e marca como "executando" o job pendente mais antigo cujas semanas
+    estejam livres. Jobs que esperam por semanas ocupadas também bloqueiam os
+    posteriores com semanas em comum, para preservar a ordem de chegada.
+    """
+    ativa = None
+    ocupadas = set(TravaSemanaImportacao.objects.values_list("temporada_id", "semana_numero"))
+    for job in ImportacaoJob.objects.filter(status=ImportacaoJob.PENDENTE).order_by("criado_em", "pk"):
+        # Sem temporada (a dele foi apagada), o job importa na ativa, como em executar
+        if job.temporada_id is None and ativa is None:
+            ativa = Temporada.objects.atual().pk
+        temporada_id = job.temporada_id or ativa
+        semanas = {(temporada_id, numero) for numero in job.semanas}
+        if semanas & ocupadas:
+            ocupadas |= semanas
+            continue
+        try:
+            with transaction.atomic():
+                TravaSemanaImportacao.objects.bulk_create([
+                    TravaSemanaImportacao(temporada_id=t, semana_numero=n, job=job) for t, n in sorted(semanas)
+                ])
+                # update() não passa pelo auto_now: sem atualizado_em, um job que esperou
+                # mais que o timeout na fila já nasceria "abandonado"
+                reservado = ImportacaoJob.objects.filter(pk=job.pk, status=ImportacaoJob.PENDENTE).update(
+                    status=ImportacaoJob.EXECUTANDO, iniciado_em=timezone.now(), atualizado_em=timezone.now()
+                )
+                if not reservado:  # outro executor pegou o job primeiro
+                    raise IntegrityError
+        except IntegrityError:
+            # Outro processo reservou alguma dessas semanas agora há pouco
+            ocupadas |= semanas
+            continue
+        job.refresh_from_db()
+        return job
+    return None
+
+
+def executar(job):
+    """Roda a importação do job (já reservado) e libera as semanas ao final."""
+    cache = _cache()
+    ultimo_batimento = time.monotonic()
+    registrar_batimento(job)
+
+    def progresso(linhas, resultados, invalidas):
+        nonlocal ultimo_batimento
+        cache.set(_chave_progresso(job.pk), {
+            "linhas_lidas": linhas,
+            "resultados_gravados": resultados,
+            "celulas_invalidas": invalidas,
+        }, timeout=24 * 3600)
+        if time.monotonic() - ultimo_batimento >= INTERVALO_BATIMENTO:
+            ultimo_batimento = time.monotonic()
+            registrar_batimento(job)
+
+    try:
+        with job.arquivo.open("rb") as arquivo:
+            resumo = importar_planilha(
+                arquivo, progresso=progresso, diferencial=job.diferencial, temporada=job.temporada
+            )
+    except Exception as e:
+        logger.exception("Importação #%s falhou", job.pk)
+        job.status = ImportacaoJob.ERRO
+        job.erro = str(e)
+    else:
+        job.status = ImportacaoJob.CONCLUIDA
+        job.resumo = resumo
+        job.linhas_lidas = resumo["linhas_lidas"]
+        job.resultados_gravados = resumo["resultados_criados"]
+        job.celulas_invalidas = resumo["celulas_invalidas"]
+        job.arquivo.delete(save=False)
+    finally:
+        TravaSemanaImportacao.objects.filter(job=job).delete()
+        cache.delete(_chave_progresso(job.pk))
+        cache.delete(_chave_batimento(job.pk))
+
+    job.concluido_em = timezone.now()
+    job.save()
+    return job
+
+
+def processar_pendentes():
+    """Executa jobs pendentes enquanto houver algum com semanas livres."""
+    liberar_abandonados()
+    executados = 0
+    while (job := reservar_proximo()) is not None:
+        executar(job)
+        executados += 1
+    return executados
+
+
+def progresso_do_job(job):
+    """Dicionário de progresso para a tela/endpoint de acompanhamento."""
+    dados = {
+        "id": job.pk,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "arquivo": job.nome_arquivo,
+        "semanas": job.semanas,
+        "linhas_lidas": job.linhas_lidas,
+        "resultados_gravados": job.resultados_gravados,
+        "celulas_invalidas": job.celulas_invalidas,
+        "erro": job.erro,
+        "resumo": job.resumo,
+        "finalizado": job.finalizado,
+    }
+    if job.status == ImportacaoJob.EXECUTANDO:
+        dados.update(_cache().get(_chave_progresso(job.pk)) or {})
+    return dados
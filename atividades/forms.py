@@ -2,6 +2,15 @@ from django import forms
 
 class UploadPlanilhaForm(forms.Form):
     arquivo = forms.FileField(
-        label="Planilha (.xls ou .xlsx)",
+        label="Planilha (.xls, .xlsx ou .csv)",
         help_text="Colunas: 1ªSemana, 2ªSemana, ..., TOTAL; primeira coluna = nome da criança"
     )
+    diferencial = forms.BooleanField(
+        label="Gravar só o que mudou",
+        required=False, initial=True,
+        help_text="Compara com os resultados já lançados e só insere, altera ou apaga as células diferentes.",
+    )
+    simular = forms.BooleanField(
+        label="Só simular (mostrar prévia sem gravar)",
+        required=False,
+    )
@@ -1,18 +1,77 @@
 # services/import_planilha.py
 
+import codecs
+import csv
+from collections import Counter, defaultdict
 import io
+import itertools
 import re
 import math
+import time
+from contextlib import contextmanager
+import numpy as np
+import openpyxl
 import pandas as pd
 from decimal import Decimal, InvalidOperation
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 
-from .models import Crianca, Semana, Atividade, Resultado  # ajuste conforme sua app
+from .banco import upsert_em_massa
+from .models import (  # ajuste conforme sua app
+    Crianca, Semana, Atividade, Resultado, PlacarCrianca, HistoricoRanking, Temporada, em_lotes,
+    TAMANHO_LOTE_IDS, normalizar_nome,
+)
+from .nomes import sugerir
 
 # Aceita "1ªSemana", "1ª Semana", "2a Semana", "3A Semana", etc.
 SEMANA_COL_RE = re.compile(r"^\s*(\d+)\s*[ªaA]?\s*Semana\s*$", re.IGNORECASE)
 
+# Conteúdos de célula tratados como "sem nota"
+VALORES_VAZIOS = {"", "nan", "none", "-"}
+
+
+class PerfilImportacao:
+    """
+    Tempo, nº de queries e volumes (linhas, células) acumulados por etapa da
+    importação. Vai para resumo["etapas"] (e, pela fila, para o ImportacaoJob).
+    """
+
+    def __init__(self):
+        self.etapas = {}
+        self.inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nome, **volumes):
+        dados = self.etapas.setdefault(nome, {"etapa": nome, "segundos": 0.0, "queries": 0})
+        self.somar(dados, **volumes)
+
+        def contar(execute, sql, params, many, context):
+            dados["queries"] += 1
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(contar):
+                yield dados
+        finally:
+            dados["segundos"] += time.perf_counter() - inicio
+
+    @staticmethod
+    def somar(dados, **volumes):
+        for chave, valor in volumes.items():
+            dados[chave] = dados.get(chave, 0) + valor
+
+    def relatorio(self):
+        """(etapas na ordem em que apareceram, duração total em segundos)."""
+        total = time.perf_counter() - self.inicio
+        etapas = [
+            {**dados, "segundos": round(dados["segundos"], 4),
+             "percentual": round(100 * dados["segundos"] / total, 1) if total else 0.0}
+            for dados in self.etapas.values()
+        ]
+        return etapas, round(total, 4)
+
 
 def _parse_decimal_br(value):
     """
@@ -35,7 +94,7 @@ def _parse_decimal_br(value):
             return None
 
     s = str(value).strip()
-    if not s or s.lower() in {"nan", "none", "-"}:
+    if s.lower() in VALORES_VAZIOS:
         return None
 
     s = s.replace(',', '.')
@@ -45,78 +104,145 @@ def _parse_decimal_br(value):
         return None
 
 
-def _descobrir_colunas_semana(df: pd.DataFrame):
+def _descobrir_colunas_semana(colunas):
     """
     Encontra colunas do tipo '1ªSemana', '1ª Semana', '2ªSemana', ... e retorna
-    lista de tuplas (numero_semana:int, nome_coluna:str) na ordem em que aparecem.
+    lista de tuplas (numero_semana:int, posicao_coluna:int) na ordem em que aparecem.
     Ignora 'TOTAL'.
     """
     semanas = []
     # assumindo 1a coluna = nome
-    for col in df.columns[1:]:
-        if str(col).strip().upper() == "TOTAL":
+    for posicao, col in enumerate(colunas):
+        if posicao == 0 or str(col).strip().upper() == "TOTAL":
             continue
         m = SEMANA_COL_RE.match(str(col))
         if m:
             numero = int(m.group(1))
-            semanas.append((numero, col))
+            semanas.append((numero, posicao))
     return semanas
 
 
-def _get_or_create_semana(numero: int):
+def _parse_decimais_br(serie: pd.Series) -> pd.Series:
     """
-    Garante a Semana pelo número.
-    Caso não exista, cria com datas = hoje (ajuste se preferir).
+    Versão vetorizada de _parse_decimal_br para uma coluna inteira.
+    Retorna uma Series float com NaN onde a célula não é número.
     """
-    hoje = timezone.localdate()
-    semana, _ = Semana.objects.get_or_create(
-        numero=numero,
-        defaults={"data_inicio": hoje, "data_fim": hoje},
-    )
-    return semana
-
-
-def _get_or_create_atividade_por_nota(nota: Decimal):
-    """
-    Atividade cuja pontuação é a nota da célula, com quantidade=1 no Resultado.
-    Isso mantém o ranking: soma(quantidade * pontos) == soma das notas por linha.
-    Blindado para NUNCA criar atividade sem 'pontos'.
-    """
-    # Normaliza a nota para evitar ruídos tipo 1.500000
-    try:
-        nota_fmt = float(nota)
-    except Exception:
-        raise ValueError(f"Nota inválida: {nota!r}")
-
-    nome_fmt = f"Nota {nota.normalize()}" if isinstance(nota, Decimal) else f"Nota {nota_fmt}"
-
-    # IMPORTANTE: filtra por 'pontos' e também informa 'pontos' nos defaults.
-    atividade, created = Atividade.objects.get_or_create(
-        pontos=nota_fmt,
-        defaults={"nome": nome_fmt, "pontos": nota_fmt},
-    )
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texto = serie.astype(str).str.strip().str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce")
 
-    # Opcional: caso tenha vindo sem nome por algum motivo, completa
-    if not atividade.nome:
-        atividade.nome = nome_fmt
-        atividade.save(update_fields=["nome"])
 
-    return atividade
+def _normalizar_nomes(serie: pd.Series) -> pd.Series:
+    """Nomes sem espaços nas pontas; célula vazia/NaN vira ""."""
+    return serie.where(serie.notna(), "").astype(str).str.strip().replace({"nan": ""})
 
 
-@transaction.atomic
-def importar_planilha(file_obj):
+def _notas_em_formato_longo(df: pd.DataFrame, semanas_cols, nomes: pd.Series):
     """
-    Lê XLS/XLSX no formato:
-      - Primeira coluna: nome da criança (sem título ou qualquer título -> renomeada para 'NOME')
-      - Demais colunas: '1ªSemana', '1ª Semana', '2ªSemana', ..., 'TOTAL' (ignorada)
-      - Células podem ter decimal com vírgula. Vazias/NaN/ '-' são ignoradas.
-
-    Estratégia:
-      - Coleta as semanas presentes.
-      - Para evitar duplicidade em reimportações, APAGA os Resultados existentes
-        apenas para as (crianças x semanas) presentes na planilha e recria.
+    Converte as colunas de semana em linhas (NOME, semana, nota), já sem
+    células vazias, não numéricas ou zeradas, e sem linhas sem nome.
+    `df` tem colunas posicionais (0 = nome).
+    Retorna (DataFrame longo, nº de células preenchidas que não são número).
+    """
+    numeros = np.array([numero for numero, _posicao in semanas_cols])
+    com_nome = (nomes != "").to_numpy()
+    notas = {}
+    invalidas = 0
+    for i, (_numero, posicao) in enumerate(semanas_cols):
+        bruto = df[posicao]
+        notas[i] = _parse_decimais_br(bruto)
+        texto = bruto.where(bruto.notna(), "").astype(str).str.strip().str.lower()
+        preenchida = ~texto.isin(VALORES_VAZIOS).to_numpy()
+        invalidas += int((preenchida & notas[i].isna().to_numpy() & com_nome).sum())
+
+    notas = pd.DataFrame(notas)
+    notas["NOME"] = nomes.to_numpy()
+    longo = notas.melt(id_vars="NOME", var_name="coluna", value_name="nota")
+    longo = longo[(longo["NOME"] != "") & np.isfinite(longo["nota"]) & (longo["nota"] != 0)]
+    longo["semana"] = numeros[longo["coluna"].to_numpy(dtype=int)]
+    return longo[["NOME", "semana", "nota"]], invalidas
+
+
+def _resolver_criancas(nomes, temporada_id):
     """
+    ({nome: crianca_id}, ids criados) na temporada. O nome da planilha é comparado pelo
+    nome normalizado (sem acento, caixa ou espaços a mais), em lote; as
+    crianças que ainda não existem são criadas com a primeira grafia vista.
+    """
+    chaves = {nome: normalizar_nome(nome) for nome in nomes}
+    chave_to_id = {}
+    da_temporada = Crianca.objects.filter(temporada_id=temporada_id)
+    for lote in em_lotes(set(chaves.values())):
+        for crianca_id, chave in (
+            da_temporada.filter(nome_normalizado__in=lote).order_by("id").values_list("id", "nome_normalizado")
+        ):
+            chave_to_id.setdefault(chave, crianca_id)
+
+    faltantes = {}
+    for nome, chave in chaves.items():
+        if chave not in chave_to_id:
+            faltantes.setdefault(chave, nome)
+    criadas = set()
+    if faltantes:
+        # Idade desconhecida na planilha: fica 0 (mesmo default da migração) até ser ajustada no admin
+        Crianca.objects.bulk_create(
+            [
+                Crianca(temporada_id=temporada_id, nome=nome, nome_normalizado=chave, idade=0)
+                for chave, nome in faltantes.items()
+            ]
+        )
+        for lote in em_lotes(faltantes):
+            novas = dict(da_temporada.filter(nome_normalizado__in=lote).values_list("nome_normalizado", "id"))
+            criadas.update(novas.values())
+            chave_to_id.update(novas)
+    return {nome: chave_to_id[chave] for nome, chave in chaves.items()}, criadas
+
+
+def _resolver_semanas(numeros, temporada_id):
+    """
+    {numero: semana_id} na temporada, criando em lote as semanas que faltam
+    (com datas = hoje; ajuste no admin se preferir).
+    """
+    da_temporada = Semana.objects.filter(temporada_id=temporada_id)
+    numero_to_id = dict(da_temporada.filter(numero__in=numeros).values_list("numero", "id"))
+
+    faltantes = [n for n in numeros if n not in numero_to_id]
+    if faltantes:
+        hoje = timezone.localdate()
+        Semana.objects.bulk_create(
+            [Semana(temporada_id=temporada_id, numero=n, data_inicio=hoje, data_fim=hoje) for n in faltantes]
+        )
+        numero_to_id.update(da_temporada.filter(numero__in=faltantes).values_list("numero", "id"))
+    return numero_to_id
+
+
+def _formato(file_obj):
+    """'csv', 'xlsx' ou 'xls', pela extensão do nome ou, sem nome, pelos bytes iniciais."""
+    nome = (getattr(file_obj, "name", "") or "").lower()
+    for extensao in ("csv", "xlsx", "xls"):
+        if nome.endswith("." + extensao):
+            return extensao
+    inicio = file_obj.read(8)
+    file_obj.seek(0)
+    if inicio.startswith(b"PK"):
+        return "xlsx"
+    if inicio.startswith(b"\xd0\xcf\x11\xe0"):
+        return "xls"
+    return "csv"
+
+
+def _tamanho(file_obj):
+    tamanho = getattr(file_obj, "size", None)
+    if tamanho is None:
+        posicao = file_obj.tell()
+        tamanho = file_obj.seek(0, io.SEEK_END)
+        file_obj.seek(posicao)
+    return tamanho
+
+
+def _ler_dataframe(file_obj):
+    """Caminho pandas: a planilha inteira vira um único lote."""
     # Lê com pandas sem gravar em disco
     data = file_obj.read()
     bio = io.BytesIO(data)
@@ -127,80 +253,369 @@ def importar_planilha(file_obj):
     except Exception as e:
         raise ValueError(f"Não foi possível ler a planilha: {e}")
 
-    if df.shape[1] < 2:
-        raise ValueError("Planilha deve ter ao menos 2 colunas (Nome e semanas).")
+    cabecalho = list(df.columns)
+    df.columns = range(len(cabecalho))
+    return cabecalho, [df]
 
-    # Normaliza nome da 1ª coluna (nome da criança), mesmo se vier Unnamed: 0
-    df.rename(columns={df.columns[0]: "NOME"}, inplace=True)
 
-    semanas_cols = _descobrir_colunas_semana(df)
-    if not semanas_cols:
+def _linhas_xlsx(file_obj):
+    """Linhas (tuplas) de um .xlsx via openpyxl read_only, direto do arquivo temporário do upload."""
+    origem = file_obj.temporary_file_path() if hasattr(file_obj, "temporary_file_path") else file_obj
+    try:
+        wb = openpyxl.load_workbook(origem, read_only=True, data_only=True)
+    except Exception as e:
+        raise ValueError(f"Não foi possível ler a planilha: {e}")
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _linhas_csv(file_obj):
+    """Linhas de um CSV (UTF-8). Separador ';' (padrão do Excel pt-BR) ou ','."""
+    linhas = codecs.iterdecode(file_obj, "utf-8-sig")
+    primeira = next(linhas, "")
+    separador = ";" if ";" in primeira else ","
+    yield from csv.reader(itertools.chain([primeira], linhas), delimiter=separador)
+
+
+def _ler_em_lotes(file_obj, formato, tamanho_lote):
+    """Caminho streaming: DataFrames de até `tamanho_lote` linhas, memória constante."""
+    linhas = _linhas_csv(file_obj) if formato == "csv" else _linhas_xlsx(file_obj)
+    cabecalho = list(next(linhas, None) or [])
+
+    largura = len(cabecalho)
+
+    def lotes():
+        while True:
+            bloco = list(itertools.islice(linhas, tamanho_lote))
+            if not bloco:
+                return
+            # Linhas podem vir mais curtas (células finais vazias) ou mais longas que o cabeçalho
+            yield pd.DataFrame(
+                [list(linha[:largura]) + [None] * (largura - len(linha)) for linha in bloco],
+                columns=range(largura),
+            )
+
+    return cabecalho, lotes()
+
+
+def ler_semanas(file_obj):
+    """
+    Números das semanas presentes no cabeçalho, lendo só a 1ª linha do arquivo.
+    Deixa o arquivo posicionado no início para a importação.
+    """
+    formato = _formato(file_obj)
+    try:
+        if formato == "xls":
+            cabecalho = list(pd.read_excel(file_obj, nrows=0).columns)
+        else:
+            linhas = _linhas_csv(file_obj) if formato == "csv" else _linhas_xlsx(file_obj)
+            cabecalho = list(next(linhas, None) or [])
+            linhas.close()
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Não foi possível ler a planilha: {e}")
+    finally:
+        file_obj.seek(0)
+    semanas = sorted({numero for numero, _posicao in _descobrir_colunas_semana(cabecalho)})
+    if not semanas:
         raise ValueError("Não encontrei colunas de semana (ex.: '1ªSemana', '1ª Semana', '2ªSemana', ...).")
+    return semanas
 
-    # Lista de nomes (tratando NaN -> "")
-    nomes = (
-        df["NOME"]
-        .astype(str)
-        .map(lambda s: s.strip())
-        .replace({"nan": ""})
-    )
 
-    # Mapeia/cria crianças
-    nome_to_crianca = {}
-    for nome in nomes:
-        if not nome:
+def _gravar_resultados(
+    longo, nome_to_id, numero_to_id, nota_id, criancas_vistas, contagem, diferencial, previa, perfil
+):
+    """
+    Aplica as notas do lote aos Resultados, uma linha por (criança, semana) na
+    atividade Nota, com o nº de células em `quantidade` e a soma das notas em
+    `pontos`:
+      - grava com upsert (restrição resultado_unico; COPY no PostgreSQL),
+        sem apagar e recriar;
+      - apaga só as linhas das crianças do lote (x semanas do arquivo) que a
+        planilha não tem mais;
+      - `diferencial`: pula as linhas iguais (planilha igual ao banco = nenhuma
+        escrita) e reaproveita com UPDATE a linha de outra atividade que a
+        planilha substitui.
+    Retorna os ids das crianças cujo placar precisa ser refeito.
+    """
+    with perfil.etapa("comparacao") as etapa:
+        gravar, atualizar, remover, alteradas = _comparar_resultados(
+            longo, nome_to_id, numero_to_id, nota_id, criancas_vistas, contagem, diferencial, previa
+        )
+        perfil.somar(etapa, linhas=len(longo))
+
+    with perfil.etapa("gravacao", linhas=len(gravar) + len(atualizar)):
+        # COPY no PostgreSQL, bulk_create(update_conflicts=True) nos demais
+        upsert_em_massa(
+            Resultado, gravar,
+            unique_fields=["crianca", "semana", "atividade"],
+            update_fields=["quantidade", "pontos"],
+            batch_size=TAMANHO_LOTE_IDS,
+        )
+        if atualizar:
+            Resultado.objects.bulk_update(atualizar, ["atividade", "quantidade", "pontos"], batch_size=TAMANHO_LOTE_IDS)
+    with perfil.etapa("remocao", linhas=len(remover)):
+        for lote in em_lotes(remover):
+            Resultado.objects.filter(id__in=lote).delete()
+    return alteradas
+
+
+def _comparar_resultados(longo, nome_to_id, numero_to_id, nota_id, criancas_vistas, contagem, diferencial, previa):
+    """
+    Compara as notas do lote com os Resultados gravados: (objetos a gravar,
+    objetos a atualizar, ids a apagar, crianças alteradas).
+    """
+    desejado = defaultdict(lambda: [0, 0.0])
+    for nome, semana, nota in longo.itertuples(index=False, name=None):
+        linha = desejado[(nome_to_id[nome], numero_to_id[semana], nota_id)]
+        linha[0] += 1
+        linha[1] += nota
+
+    ids_lote = set(nome_to_id.values())
+    novas = ids_lote - criancas_vistas
+    semanas_ids = list(numero_to_id.values())
+    existentes = {}
+    for lote in em_lotes(sorted(ids_lote)):
+        for resultado_id, crianca_id, semana_id, atividade_id, quantidade, pontos in (
+            Resultado.objects.filter(crianca_id__in=lote, semana_id__in=semanas_ids).values_list(
+                "id", "crianca_id", "semana_id", "atividade_id", "quantidade", "pontos"
+            )
+        ):
+            existentes[(crianca_id, semana_id, atividade_id)] = (resultado_id, quantidade, pontos)
+    criancas_vistas.update(novas)
+
+    # Criança repetida de um lote anterior: as células deste lote somam às já gravadas
+    for chave, linha in desejado.items():
+        if chave[0] not in novas and chave in existentes:
+            linha[0] += existentes[chave][1]
+            linha[1] += existentes[chave][2]
+
+    sobrando = defaultdict(list)
+    for chave, (resultado_id, _, _) in existentes.items():
+        if chave[0] in novas and chave not in desejado:
+            sobrando[chave[:2]].append(resultado_id)
+
+    alteradas = set() if diferencial else set(ids_lote)
+    gravar, atualizar = [], []
+    for chave, (quantidade, pontos) in desejado.items():
+        atual = existentes.get(chave)
+        if diferencial and atual and atual[1] == quantidade and math.isclose(atual[2], pontos):
+            contagem["inalterados"] += 1
+            continue
+        alteradas.add(chave[0])
+        if diferencial and not atual and sobrando[chave[:2]]:
+            atualizar.append(Resultado(
+                id=sobrando[chave[:2]].pop(), atividade_id=chave[2], quantidade=quantidade, pontos=pontos
+            ))
+            contagem["atualizados"] += 1
+        else:
+            gravar.append(Resultado(
+                crianca_id=chave[0], semana_id=chave[1], atividade_id=chave[2], quantidade=quantidade, pontos=pontos
+            ))
+            contagem["atualizados" if atual else "inseridos"] += 1
+    remover = [resultado_id for ids in sobrando.values() for resultado_id in ids]
+    alteradas.update(crianca_id for (crianca_id, _), ids in sobrando.items() if ids)
+    contagem["removidos"] += len(remover)
+
+    if diferencial:
+        _anotar_previa(previa, existentes, desejado, alteradas, nome_to_id, numero_to_id)
+    return gravar, atualizar, remover, alteradas
+
+
+def _anotar_previa(previa, existentes, desejado, alteradas, nome_to_id, numero_to_id):
+    """Acrescenta à prévia os pontos antes/depois de cada (criança, semana) alterada."""
+    antes, depois = defaultdict(float), defaultdict(float)
+    for (crianca_id, semana_id, _), (_, _, pontos) in existentes.items():
+        if crianca_id in alteradas:
+            antes[(crianca_id, semana_id)] += pontos
+    for (crianca_id, semana_id, _), (_, pontos) in desejado.items():
+        if crianca_id in alteradas:
+            depois[(crianca_id, semana_id)] += pontos
+
+    id_to_nome = {i: nome for nome, i in nome_to_id.items()}
+    id_to_numero = {i: numero for numero, i in numero_to_id.items()}
+    limite = getattr(settings, "IMPORTACAO_LIMITE_PREVIA", 200)
+    for chave in sorted(antes.keys() | depois.keys()):
+        if len(previa) >= limite:
+            break
+        if chave in antes and chave in depois and math.isclose(antes[chave], depois[chave]):
             continue
-        crianca, _ = Crianca.objects.get_or_create(nome=nome)
-        nome_to_crianca[nome] = crianca
+        previa.append({
+            "crianca": id_to_nome[chave[0]], "semana": id_to_numero[chave[1]],
+            "antes": antes.get(chave), "depois": depois.get(chave),
+        })
+
+
+def _gravar_lote(
+    df, semanas_cols, temporada_id, numero_to_id, criancas_vistas, contagem, diferencial, previa, perfil
+):
+    """
+    Grava um lote de linhas: resolve crianças e atividades do lote em massa e
+    aplica os Resultados (regravando tudo ou só as diferenças), acumulando os
+    números em `contagem` e os tempos de cada etapa em `perfil`.
+    Retorna os ids das crianças criadas.
+    """
+    with perfil.etapa("normalizacao") as etapa:
+        nomes = _normalizar_nomes(df[0])
+        longo, invalidas = _notas_em_formato_longo(df, semanas_cols, nomes)
+        perfil.somar(etapa, linhas=len(df), celulas=len(longo) + invalidas)
+    contagem["celulas_invalidas"] += invalidas
+    contagem["linhas_lidas"] += len(df)
+
+    with perfil.etapa("criancas") as etapa:
+        nome_to_id, criadas = _resolver_criancas(list(dict.fromkeys(n for n in nomes if n)), temporada_id)
+        perfil.somar(etapa, linhas=len(nome_to_id))
+    with perfil.etapa("atividades") as etapa:
+        # Uma atividade só para todas as notas (pontuação livre): os pontos vão no Resultado
+        nota_id = Atividade.objects.nota().pk
+        perfil.somar(etapa, linhas=1)
+
+    alteradas = _gravar_resultados(
+        longo, nome_to_id, numero_to_id, nota_id, criancas_vistas, contagem, diferencial, previa, perfil
+    )
+
+    # bulk_create/delete não passam por Resultado.save(): atualiza o placar aqui
+    # (crianças novas entram mesmo sem nota, para aparecerem com 0 no ranking).
+    # O histórico semanal é refeito uma vez só, no fim da importação.
+    contagem["criancas_alteradas"] += len(alteradas | criadas)
+    contagem["criancas_novas"] += len(criadas)
+    with perfil.etapa("placar", linhas=len(alteradas | criadas)):
+        PlacarCrianca.objects.recalcular(alteradas | criadas, historico=False)
+    return criadas
+
+
+@transaction.atomic
+def importar_planilha(file_obj, streaming=None, progresso=None, diferencial=False, simular=False, temporada=None):
+    """
+    Lê XLS/XLSX/CSV no formato:
+      - Primeira coluna: nome da criança (sem título ou qualquer título)
+      - Demais colunas: '1ªSemana', '1ª Semana', '2ªSemana', ..., 'TOTAL' (ignorada)
+      - Células podem ter decimal com vírgula. Vazias/NaN/ '-' são ignoradas.
+
+    Dois caminhos de leitura:
+      - pandas (padrão para arquivos pequenos): a planilha inteira num DataFrame.
+      - streaming (CSV, ou .xlsx a partir de IMPORTACAO_STREAMING_BYTES):
+        openpyxl read_only / csv, gravando em lotes de IMPORTACAO_LOTE_LINHAS
+        linhas, com pico de memória estável qualquer que seja o tamanho.
+      `streaming=True/False` força um dos caminhos (.xls só tem o caminho pandas).
+
+    Crianças e semanas são as da `temporada` (padrão: a ativa); o número da
+    coluna é o da semana dentro dela.
+
+    `progresso`, se informado, é chamado após cada lote gravado com
+    (linhas_lidas, resultados_gravados, celulas_invalidas) acumulados.
+
+    Estratégia de gravação (igual nos dois caminhos):
+      - Converte as notas coluna a coluna (pandas) e passa para formato longo.
+      - Resolve crianças, semanas e a atividade "Nota" com poucas consultas
+        em lote (IN + bulk_create): o nº de queries não cresce com as linhas.
+        Crianças são encontradas pelo nome normalizado (acentos, maiúsculas e
+        espaços não criam duplicatas); as novas com nome parecido com o de
+        outra vão para `semelhantes`, como sugestão de mesclagem.
+      - Uma linha de Resultado por (criança, semana) na atividade "Nota", de
+        pontuação livre (pontos = soma das notas), gravada com upsert;
+        as (crianças x semanas) da planilha ficam exatamente como no arquivo
+        (o que sumiu da planilha é apagado), sem duplicar em reimportações.
+      - `diferencial=True`: compara com os Resultados existentes e grava só as
+        inserções/atualizações/remoções necessárias (planilha igual = zero escritas).
+      - `simular=True`: faz tudo e desfaz a transação no fim; o resumo traz a
+        prévia das mudanças (`previa`, no modo diferencial).
+
+    O resumo traz também `etapas` (tempo, queries e volumes de cada etapa:
+    leitura, cabecalho, semanas, normalizacao, criancas, atividades,
+    comparacao, gravacao, remocao, placar, historico, semelhantes) e `duracao_s`.
+    """
+    perfil = PerfilImportacao()
+    formato = _formato(file_obj)
+    if formato == "xls":
+        streaming = False
+    elif formato == "csv":
+        streaming = True
+    elif streaming is None:
+        streaming = _tamanho(file_obj) >= getattr(settings, "IMPORTACAO_STREAMING_BYTES", 5 * 1024 * 1024)
+
+    with perfil.etapa("leitura"):
+        if streaming:
+            cabecalho, lotes = _ler_em_lotes(
+                file_obj, formato, getattr(settings, "IMPORTACAO_LOTE_LINHAS", 1000)
+            )
+        else:
+            cabecalho, lotes = _ler_dataframe(file_obj)
+        lotes = iter(lotes)
+
+    if len(cabecalho) < 2:
+        raise ValueError("Planilha deve ter ao menos 2 colunas (Nome e semanas).")
+
+    with perfil.etapa("cabecalho", linhas=1):
+        semanas_cols = _descobrir_colunas_semana(cabecalho)
+    if not semanas_cols:
+        raise ValueError("Não encontrei colunas de semana (ex.: '1ªSemana', '1ª Semana', '2ªSemana', ...).")
 
     # Garante semanas
-    numero_to_semana = {}
-    for numero, _col in semanas_cols:
-        numero_to_semana[numero] = _get_or_create_semana(numero)
-
-    # Limpa resultados antigos para (crianças do arquivo) x (semanas do arquivo)
-    criancas_ids = [c.id for c in nome_to_crianca.values()]
-    semanas_ids = [s.id for s in numero_to_semana.values()]
-    if criancas_ids and semanas_ids:
-        Resultado.objects.filter(
-            crianca_id__in=criancas_ids,
-            semana_id__in=semanas_ids
-        ).delete()
-
-    # Recria resultados
-    novos_resultados = []
-    for _, row in df.iterrows():
-        nome = str(row["NOME"]).strip()
-        if not nome:
-            continue
-        crianca = nome_to_crianca.get(nome)
-        if not crianca:
-            continue
+    with perfil.etapa("semanas", linhas=len(semanas_cols)):
+        if temporada is None:
+            temporada = Temporada.objects.atual()
+        elif temporada.arquivada:
+            raise ValueError(f"A temporada {temporada} já foi arquivada; não recebe mais resultados.")
+        temporada_id = temporada.pk
+        numero_to_id = _resolver_semanas(list(dict.fromkeys(n for n, _ in semanas_cols)), temporada_id)
+
+    criancas_vistas = set()
+    criancas_novas = set()
+    contagem = Counter()
+    previa = []
+    while True:
+        # No streaming a leitura acontece aos poucos, a cada lote pedido ao gerador
+        with perfil.etapa("leitura") as etapa:
+            df = next(lotes, None)
+            perfil.somar(etapa, linhas=0 if df is None else len(df))
+        if df is None:
+            break
+        criancas_novas |= _gravar_lote(
+            df, semanas_cols, temporada_id, numero_to_id, criancas_vistas, contagem, diferencial, previa, perfil
+        )
+        if progresso:
+            progresso(
+                contagem["linhas_lidas"],
+                contagem["inseridos"] + contagem["atualizados"],
+                contagem["celulas_invalidas"],
+            )
 
-        for numero, col in semanas_cols:
-            valor = _parse_decimal_br(row.get(col))
-            if valor is None:
-                continue
-            if valor == 0:
-                continue
-
-            semana = numero_to_semana[numero]
-            atividade = _get_or_create_atividade_por_nota(valor)
-
-            novos_resultados.append(
-                Resultado(
-                    crianca=crianca,
-                    semana=semana,
-                    atividade=atividade,
-                    quantidade=1,
-                )
+    if contagem["criancas_alteradas"]:
+        # Semanas anteriores às do arquivo não mudam, a não ser pelas crianças novas
+        with perfil.etapa("historico") as etapa:
+            fotos = HistoricoRanking.objects.atualizar(
+                temporada_id, desde=None if contagem["criancas_novas"] else min(numero_to_id)
             )
+            perfil.somar(etapa, linhas=sum(fotos.values()))
+
+    # Nomes novos parecidos com os de outras crianças: possível erro de digitação
+    semelhantes = []
+    if criancas_novas and getattr(settings, "IMPORTACAO_SUGERIR_SEMELHANTES", True):
+        with perfil.etapa("semelhantes", linhas=len(criancas_novas)):
+            semelhantes = sugerir(criancas_novas, temporada=temporada_id)
 
-    if novos_resultados:
-        Resultado.objects.bulk_create(novos_resultados, ignore_conflicts=False)
+    if simular:
+        transaction.set_rollback(True)
 
+    etapas, duracao = perfil.relatorio()
     return {
-        "criancas_criadas_ou_encontradas": len(nome_to_crianca),
+        "criancas_criadas_ou_encontradas": len(criancas_vistas),
         "semanas_processadas": [n for n, _ in semanas_cols],
-        "resultados_criados": len(novos_resultados),
+        "resultados_criados": contagem["inseridos"],
+        "linhas_lidas": contagem["linhas_lidas"],
+        "celulas_invalidas": contagem["celulas_invalidas"],
+        "alteracoes": {
+            chave: contagem[chave] for chave in ("inseridos", "atualizados", "removidos", "inalterados")
+        },
+        "previa": previa,
+        "semelhantes": semelhantes,
+        "modo": "streaming" if streaming else "pandas",
+        "diferencial": diferencial,
+        "simulacao": simular,
+        "etapas": etapas,
+        "duracao_s": duracao,
     }
@@ -0,0 +1,155 @@
+"""
+Lançamento de pontos em lote (API JSON usada na pontuação ao vivo, pelo celular).
+
+Cada entrada define a quantidade de uma atividade para uma criança numa semana:
+    {"crianca": <id>, "semana": <número>, "atividade": <id>, "quantidade": <n>}
+A quantidade substitui a anterior (e os pontos do Resultado viram quantidade x
+pontos da atividade), então reenviar o mesmo lote (conexão que
+caiu no meio) não soma de novo; quantidade 0 apaga o resultado.
+Atividades de pontuação livre (a "Nota" da planilha) não são aceitas aqui.
+
+Crianças e semanas são as da temporada ativa (a semana é o número dentro dela).
+
+O lote é validado inteiro contra mapas carregados com poucas queries antes de
+gravar: se alguma entrada for inválida, nada é gravado e a resposta lista os
+erros por posição.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .banco import upsert_em_massa
+from .models import (
+    Crianca, Semana, Atividade, Resultado, PlacarCrianca, HistoricoRanking, em_lotes, TAMANHO_LOTE_IDS,
+)
+
+CAMPOS_ENTRADA = ("crianca", "semana", "atividade", "quantidade")
+
+
+class LoteInvalido(ValueError):
+    """Lote recusado; `erros` é uma lista de {"indice", "erro"} (indice None = o lote todo)."""
+
+    def __init__(self, erros):
+        self.erros = erros
+        super().__init__(f"{len(erros)} erro(s) no lote; nada foi gravado.")
+
+
+def _limite_entradas():
+    return getattr(settings, "LANCAMENTOS_MAX_ENTRADAS", 1000)
+
+
+def _ler_entradas(entradas):
+    """[(indice, crianca_id, numero_semana, atividade_id, quantidade)] só com tipos válidos."""
+    if not isinstance(entradas, list) or not entradas:
+        raise LoteInvalido([{"indice": None, "erro": "Envie uma lista não vazia de entradas."}])
+    if len(entradas) > _limite_entradas():
+        raise LoteInvalido([{
+            "indice": None,
+            "erro": f"No máximo {_limite_entradas()} entradas por envio (recebidas {len(entradas)}).",
+        }])
+
+    lidas, erros = [], []
+    for indice, entrada in enumerate(entradas):
+        if not isinstance(entrada, dict):
+            erros.append({"indice": indice, "erro": "Entrada deve ser um objeto."})
+            continue
+        invalidos = [
+            campo for campo in CAMPOS_ENTRADA
+            # bool é subclasse de int, mas true/false não é número de ninguém
+            if type(entrada.get(campo)) is not int or entrada[campo] < 0
+        ]
+        if invalidos:
+            erros.append({
+                "indice": indice,
+                "erro": f"Campos ausentes ou inválidos (inteiros >= 0): {', '.join(invalidos)}.",
+            })
+            continue
+        lidas.append((indice, *(entrada[campo] for campo in CAMPOS_ENTRADA)))
+    if erros:
+        raise LoteInvalido(erros)
+    return lidas
+
+
+def validar(entradas):
+    """
+    Confere o lote e devolve [(crianca_id, semana_id, atividade_id, quantidade, pontos)].
+    Crianças, semanas e atividades são lidas uma vez para o lote inteiro.
+    """
+    lidas = _ler_entradas(entradas)
+
+    criancas, atividades, semanas = set(), {}, {}
+    for lote in em_lotes({c for _, c, _, _, _ in lidas}):
+        criancas.update(Crianca.objects.filter(temporada__ativa=True, id__in=lote).values_list("id", flat=True))
+    for lote in em_lotes({a for _, _, _, a, _ in lidas}):
+        atividades.update(
+            (atividade_id, (pontos, livre)) for atividade_id, pontos, livre in
+            Atividade.objects.filter(id__in=lote).values_list("id", "pontos", "pontuacao_livre")
+        )
+    for lote in em_lotes({s for _, _, s, _, _ in lidas}):
+        semanas.update(Semana.objects.filter(temporada__ativa=True, numero__in=lote).values_list("numero", "id"))
+
+    validas, erros, vistas = [], [], {}
+    for indice, crianca_id, numero, atividade_id, quantidade in lidas:
+        problemas = []
+        if crianca_id not in criancas:
+            problemas.append(f"criança {crianca_id} não existe na temporada atual")
+        if numero not in semanas:
+            problemas.append(f"semana {numero} não existe na temporada atual")
+        if atividade_id not in atividades:
+            problemas.append(f"atividade {atividade_id} não existe")
+        elif atividades[atividade_id][1]:
+            problemas.append(f"atividade {atividade_id} é de pontuação livre")
+        chave = (crianca_id, numero, atividade_id)
+        if chave in vistas:
+            problemas.append(f"repete a entrada {vistas[chave]}")
+        vistas.setdefault(chave, indice)
+        if problemas:
+            erros.append({"indice": indice, "erro": "; ".join(problemas).capitalize() + "."})
+        else:
+            validas.append((
+                crianca_id, semanas[numero], atividade_id, quantidade, quantidade * atividades[atividade_id][0],
+            ))
+    if erros:
+        raise LoteInvalido(erros)
+    return validas
+
+
+def lancar(entradas):
+    """
+    Valida e grava o lote numa transação: upsert das quantidades, remoção das
+    zeradas e placar/histórico refeitos só para as crianças do lote.
+    Retorna {"gravados", "removidos", "totais": [{"id", "nome", "total"}]}.
+    """
+    validas = validar(entradas)
+    gravar = [
+        Resultado(crianca_id=c, semana_id=s, atividade_id=a, quantidade=q, pontos=p)
+        for c, s, a, q, p in validas if q > 0
+    ]
+    zerar = [(c, s, a) for c, s, a, q, _ in validas if q == 0]
+    criancas = sorted({c for c, _, _, _, _ in validas})
+
+    removidos = 0
+    with transaction.atomic():
+        upsert_em_massa(
+            Resultado, gravar,
+            unique_fields=["crianca", "semana", "atividade"],
+            update_fields=["quantidade", "pontos"],
+        )
+        # 3 parâmetros por chave: lotes menores para caber no limite do SQLite
+        for lote in em_lotes(zerar, TAMANHO_LOTE_IDS // 3):
+            filtro = Q()
+            for c, s, a in lote:
+                filtro |= Q(crianca_id=c, semana_id=s, atividade_id=a)
+            removidos += Resultado.objects.filter(filtro).delete()[0]
+        PlacarCrianca.objects.recalcular(criancas, historico=False)
+        primeira = Semana.objects.filter(id__in={s for _, s, _, _, _ in validas}).order_by("numero").first()
+        HistoricoRanking.objects.atualizar(primeira.temporada_id, desde=primeira.numero)
+
+    totais = []
+    for lote in em_lotes(criancas):
+        totais.extend(
+            {"id": crianca_id, "nome": nome, "total": total}
+            for crianca_id, nome, total in PlacarCrianca.objects.filter(crianca_id__in=lote)
+            .order_by("crianca_id").values_list("crianca_id", "crianca__nome", "total")
+        )
+    return {"gravados": len(gravar), "removidos": removidos, "totais": totais}
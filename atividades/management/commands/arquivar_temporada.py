@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from atividades.models import Temporada
+from atividades.temporadas import arquivar
+
+
+class Command(BaseCommand):
+    help = (
+        "Arquiva temporadas encerradas: guarda a classificação final em ResumoTemporada "
+        "e apaga resultados, placares, histórico, crianças e semanas delas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("slugs", nargs="*", help="Slugs das temporadas a arquivar.")
+        parser.add_argument(
+            "--encerradas", action="store_true",
+            help="Arquiva todas as temporadas que não são a ativa e ainda não foram arquivadas.",
+        )
+
+    def handle(self, *args, **options):
+        if options["encerradas"]:
+            temporadas = list(Temporada.objects.filter(ativa=False, arquivada_em__isnull=True))
+        elif options["slugs"]:
+            temporadas = list(Temporada.objects.filter(slug__in=options["slugs"]))
+            faltando = sorted(set(options["slugs"]) - {t.slug for t in temporadas})
+            if faltando:
+                raise CommandError(f"Temporada(s) inexistente(s): {', '.join(faltando)}.")
+        else:
+            raise CommandError("Informe os slugs das temporadas ou --encerradas.")
+
+        for temporada in temporadas:
+            try:
+                feito = arquivar(temporada)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"{temporada}: {feito['criancas']} crianças, {feito['semanas']} semanas e "
+                f"{feito['resultados']} resultados arquivados."
+            ))
+        if not temporadas:
+            self.stdout.write("Nenhuma temporada para arquivar.")
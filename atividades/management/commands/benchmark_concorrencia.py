@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from atividades.benchmark import concorrencia, gerar_planilha
+from atividades.import_planilha import importar_planilha
+
+# Configuração padrão do SQLite no Django, antes dos ajustes de atividades.banco
+SEM_AJUSTES = {
+    "pragmas": {"journal_mode": "delete", "synchronous": "full"},
+    "options": {"timeout": 5, "transaction_mode": "DEFERRED"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Importações simultâneas enquanto threads leem o ranking: mostra erros de lock e a "
+        "latência das leituras (p50/p95). Roda num banco temporário em arquivo, criado e "
+        "apagado como o dos testes. Falha se houver erro de banco ou se o p95 passar de --p95-maximo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--criancas", type=int, default=500)
+        parser.add_argument("--semanas", type=int, default=10)
+        parser.add_argument("--importacoes", type=int, default=3)
+        parser.add_argument("--leitores", type=int, default=4)
+        parser.add_argument(
+            "--p95-maximo", type=float, default=1000.0,
+            help="p95 máximo aceito para as leituras, em ms (padrão: 1000; 0 desliga).",
+        )
+        parser.add_argument(
+            "--sem-ajustes", action="store_true",
+            help="Usa o journal padrão (rollback), timeout de 5s e BEGIN DEFERRED, para comparação.",
+        )
+
+    def handle(self, *args, **options):
+        if options["sem_ajustes"]:
+            settings.SQLITE_PRAGMAS = SEM_AJUSTES["pragmas"]
+            connection.settings_dict["OPTIONS"] = SEM_AJUSTES["options"]
+
+        nome_original = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Base para as leituras terem o que ordenar
+            importar_planilha(SimpleUploadedFile("base.xlsx", gerar_planilha(
+                options["criancas"], semanas=options["semanas"], semente=0
+            )))
+            planilhas = [
+                gerar_planilha(
+                    options["criancas"], semanas=options["semanas"], semente=i + 1,
+                    primeira_semana=1 + (i + 1) * options["semanas"],
+                )
+                for i in range(options["importacoes"])
+            ]
+            resultado = concorrencia(planilhas, leitores=options["leitores"])
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+        self.stdout.write(
+            f"{options['importacoes']} importações de {options['criancas']} crianças x "
+            f"{options['semanas']} semanas em {resultado['importacoes_s']}s; "
+            f"{resultado['leituras']} leituras do ranking por {options['leitores']} threads"
+        )
+        self.stdout.write(
+            f"leitura: p50={resultado['p50_ms']}ms p95={resultado['p95_ms']}ms máx={resultado['max_ms']}ms"
+        )
+        if resultado["erros"]:
+            self.stdout.write(self.style.ERROR(f"{len(resultado['erros'])} erros de banco:"))
+            for erro in resultado["erros"][:10]:
+                self.stdout.write(f"  {erro}")
+            raise CommandError(f"{len(resultado['erros'])} erros de banco durante as importações.")
+        self.stdout.write(self.style.SUCCESS("Nenhum erro de lock."))
+        if options["p95_maximo"] and resultado["p95_ms"] is not None and resultado["p95_ms"] > options["p95_maximo"]:
+            raise CommandError(
+                f"p95 das leituras de {resultado['p95_ms']}ms, acima de {options['p95_maximo']:g}ms."
+            )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from atividades.benchmark import dados_sinteticos, exportacao, exportacao_em_lista, medir
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede tempo e pico de memória Python da exportação do ranking (/api/ranking.json e .csv, "
+        "em streaming) contra o ranking montado inteiro numa lista, com dados sintéticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--criancas", type=int, nargs="+", default=[10_000, 100_000],
+            help="Quantidades de crianças a testar (padrão: 10000 100000).",
+        )
+        parser.add_argument("--semanas", type=int, default=4)
+
+    def handle(self, *args, **options):
+        casos = {
+            "json": lambda: exportacao("json"),
+            "json gzip": lambda: exportacao("json", comprimir=True),
+            "csv": lambda: exportacao("csv"),
+            "csv gzip": lambda: exportacao("csv", comprimir=True),
+            "lista": exportacao_em_lista,
+        }
+        for n in options["criancas"]:
+            self.stdout.write(f"== {n} crianças x {options['semanas']} semanas ==")
+            with dados_sinteticos(n, semanas=options["semanas"]):
+                for nome, func in casos.items():
+                    tamanho = func()
+                    m = medir(func, repeticoes=1, memoria=True)
+                    self.stdout.write(
+                        f"  {nome:9}: {tamanho / 1024 / 1024:6.2f} MB em {m['segundos']:.3f}s, "
+                        f"{m['queries']} queries, pico {m['pico_mb']} MB"
+                    )
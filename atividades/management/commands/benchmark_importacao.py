@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from atividades.benchmark import desfazer_ao_final, gerar_planilha, importar_legado, medir
+from atividades.import_planilha import importar_planilha
+
+MODOS_RSS = {"pandas": False, "streaming": True}
+
+
+def _rss_mb():
+    """
+    Pico de RSS do processo em MB. No Linux usa VmHWM (o ru_maxrss herda o pico
+    do processo pai através do fork, o que distorce a medição do subprocesso).
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for linha in status:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a importação atual com a antiga (iterrows + get_or_create) em planilhas "
+        "geradas. Tudo roda numa transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--criancas", type=int, nargs="+", default=[100, 500])
+        parser.add_argument("--semanas", type=int, default=20)
+        parser.add_argument(
+            "--legado", action="store_true", help="Mede também a importação antiga."
+        )
+        parser.add_argument(
+            "--memoria", action="store_true",
+            help="Mede o pico de RSS dos caminhos pandas e streaming (cada um num processo novo).",
+        )
+        # Uso interno: executa uma importação isolada e imprime o RSS em JSON
+        parser.add_argument("--medir-rss", nargs=2, metavar=("MODO", "ARQUIVO"), help="(interno)")
+
+    def handle(self, *args, **options):
+        if options["medir_rss"]:
+            return self._medir_rss(*options["medir_rss"])
+
+        implementacoes = {"atual": importar_planilha}
+        if options["legado"]:
+            implementacoes["legado"] = importar_legado
+
+        for n in options["criancas"]:
+            conteudo = gerar_planilha(n, semanas=options["semanas"])
+            self.stdout.write(f"== {n} crianças x {options['semanas']} semanas ==")
+            for nome, importar in implementacoes.items():
+                with desfazer_ao_final():
+                    # 1ª importação cria crianças/semanas/atividades; as seguintes só reimportam
+                    primeira = medir(lambda: importar(io.BytesIO(conteudo)), repeticoes=1)
+                    reimportacao = medir(lambda: importar(io.BytesIO(conteudo)))
+                self.stdout.write(
+                    f"  {nome:6} 1ª importação: {primeira['queries']:6} queries "
+                    f"{primeira['segundos']:.3f}s | reimportação: "
+                    f"{reimportacao['queries']:6} queries {reimportacao['segundos']:.3f}s"
+                )
+            if options["memoria"]:
+                self._comparar_rss(conteudo)
+
+    def _comparar_rss(self, conteudo):
+        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+            tmp.write(conteudo)
+        try:
+            for modo in MODOS_RSS:
+                saida = subprocess.run(
+                    [sys.executable, os.path.join(settings.BASE_DIR, "manage.py"),
+                     "benchmark_importacao", "--medir-rss", modo, tmp.name],
+                    capture_output=True, text=True, check=True,
+                )
+                r = json.loads(saida.stdout.strip().splitlines()[-1])
+                self.stdout.write(
+                    f"  RSS {modo:9}: pico {r['pico_mb']:.1f} MB "
+                    f"(+{r['acrescimo_mb']:.1f} MB na importação, {r['segundos']:.3f}s)"
+                )
+        finally:
+            os.unlink(tmp.name)
+
+    def _medir_rss(self, modo, caminho):
+        # Com DEBUG=True o Django guarda o SQL de cada query, o que mascara a medição
+        settings.DEBUG = False
+        antes = _rss_mb()
+        with open(caminho, "rb") as f, desfazer_ao_final():
+            inicio = time.perf_counter()
+            importar_planilha(File(f, name=caminho), streaming=MODOS_RSS[modo])
+            segundos = time.perf_counter() - inicio
+        pico = _rss_mb()
+        self.stdout.write(json.dumps({
+            "pico_mb": pico, "acrescimo_mb": pico - antes, "segundos": segundos,
+        }))
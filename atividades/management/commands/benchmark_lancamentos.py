@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from atividades.benchmark import dados_sinteticos, lancamentos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a vazão da API de lançamentos em lote (entradas/s, latência e queries por envio) "
+        "com dados sintéticos gerados numa transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--criancas", type=int, nargs="+", default=[1_000, 10_000],
+            help="Quantidades de crianças a testar (padrão: 1000 10000).",
+        )
+        parser.add_argument("--semanas", type=int, default=4)
+        parser.add_argument(
+            "--por-envio", type=int, nargs="+", default=[50, 200, 500],
+            help="Tamanhos de lote a testar (padrão: 50 200 500).",
+        )
+        parser.add_argument("--envios", type=int, default=20, help="Envios por tamanho de lote.")
+
+    def handle(self, *args, **options):
+        for n in options["criancas"]:
+            self.stdout.write(f"== {n} crianças x {options['semanas']} semanas ==")
+            with dados_sinteticos(n, semanas=options["semanas"]):
+                for por_envio in options["por_envio"]:
+                    m = lancamentos(por_envio, options["envios"])
+                    self.stdout.write(
+                        f"  {por_envio:4} por envio: {m['entradas_por_s']} entradas/s, "
+                        f"p50={m['p50_ms']}ms p95={m['p95_ms']}ms, {m['queries_por_envio']} queries"
+                    )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from atividades.benchmark import dados_sinteticos, medir, ranking_legado
+from atividades.models import Crianca
+from atividades.ranking import montar_quadros, montar_ranking
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede nº de queries e tempo do ranking com dados sintéticos "
+        "(gerados numa transação que é desfeita ao final)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--criancas", type=int, nargs="+", default=[10_000, 100_000],
+            help="Quantidades de crianças a testar (padrão: 10000 100000).",
+        )
+        parser.add_argument("--semanas", type=int, default=4)
+        parser.add_argument(
+            "--legado", action="store_true",
+            help="Mede também a implementação antiga (JOIN + duas passadas) para comparação.",
+        )
+
+    def handle(self, *args, **options):
+        casos = {
+            "geral": lambda: Crianca.objects.all(),
+            "ate4": lambda: Crianca.objects.filter(idade__lte=4),
+            "5mais": lambda: Crianca.objects.filter(idade__gte=5),
+        }
+        for n in options["criancas"]:
+            self.stdout.write(f"== {n} crianças x {options['semanas']} semanas ==")
+            with dados_sinteticos(n, semanas=options["semanas"]):
+                for nome, qs in casos.items():
+                    m = medir(montar_ranking, qs())
+                    self.stdout.write(
+                        f"  {nome:6} motor : {m['queries']} queries, {m['segundos']:.4f}s"
+                    )
+                    if options["legado"]:
+                        m = medir(ranking_legado, qs(), repeticoes=1)
+                        self.stdout.write(
+                            f"  {nome:6} legado: {m['queries']} queries, {m['segundos']:.4f}s"
+                        )
+                # Geral + faixas + turmas de uma vez (o que as telas realmente leem do cache)
+                m = medir(montar_quadros)
+                self.stdout.write(
+                    f"  todos os quadros: {m['queries']} queries, {m['segundos']:.4f}s"
+                )
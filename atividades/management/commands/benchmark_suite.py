@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from atividades.benchmark import comparar, executar_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede ranking, telas, admin, importação e lançamentos com dados sintéticos (numa transação "
+        "desfeita ao final). Grava a medição como linha de base em JSON e/ou compara com uma "
+        "linha de base anterior, falhando se algum caminho piorou além da tolerância."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--criancas", type=int, default=1000)
+        parser.add_argument("--semanas", type=int, default=8)
+        parser.add_argument("--linhas-planilha", type=int, default=500)
+        parser.add_argument("--por-envio", type=int, default=200, help="Entradas no lote de lançamentos.")
+        parser.add_argument("--repeticoes", type=int, default=3)
+        parser.add_argument("--sem-memoria", action="store_true", help="Não mede o pico de memória (mais rápido).")
+        parser.add_argument("--salvar", metavar="ARQUIVO", help="Grava a medição neste JSON.")
+        parser.add_argument("--comparar", metavar="ARQUIVO", help="Compara com a linha de base deste JSON.")
+        parser.add_argument(
+            "--tolerancia", type=float, default=20.0,
+            help="Piora máxima aceita, em %% do tempo/memória da linha de base (padrão: 20).",
+        )
+
+    def handle(self, *args, **options):
+        parametros = {
+            campo: options[campo]
+            for campo in ("criancas", "semanas", "linhas_planilha", "por_envio", "repeticoes")
+        }
+        base = None
+        if options["comparar"]:
+            try:
+                with open(options["comparar"], encoding="utf-8") as arquivo:
+                    base = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler a linha de base: {e}")
+            if base.get("parametros") != parametros:
+                raise CommandError(
+                    f"A linha de base foi medida com outros parâmetros: {base.get('parametros')}."
+                )
+
+        medicao = executar_suite(memoria=not options["sem_memoria"], **parametros)
+        for nome, m in medicao["resultados"].items():
+            memoria = f" {m['pico_mb']:8.2f} MB" if "pico_mb" in m else ""
+            self.stdout.write(f"  {nome:24} {m['queries']:6} queries {m['segundos']:9.4f}s{memoria}")
+
+        if options["salvar"]:
+            with open(options["salvar"], "w", encoding="utf-8") as arquivo:
+                json.dump(medicao, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Linha de base gravada em {options['salvar']}.")
+
+        if base is not None:
+            regressoes = comparar(base, medicao, tolerancia=options["tolerancia"] / 100)
+            for regressao in regressoes:
+                self.stdout.write(self.style.ERROR(f"  {regressao}"))
+            if regressoes:
+                raise CommandError(f"{len(regressoes)} regressão(ões) acima de {options['tolerancia']:g}%.")
+            self.stdout.write(self.style.SUCCESS("Sem regressões em relação à linha de base."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from atividades.cache_ranking import estatisticas, zerar_estatisticas
+from atividades.models import VersaoDados
+
+
+class Command(BaseCommand):
+    help = "Mostra acertos/falhas do cache do ranking e a versão atual dos dados."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--zerar", action="store_true", help="Zera os contadores de acerto/falha.")
+        parser.add_argument(
+            "--invalidar", action="store_true",
+            help="Incrementa a versão dos dados, forçando o ranking a ser recalculado.",
+        )
+
+    def handle(self, *args, **options):
+        if options["invalidar"]:
+            VersaoDados.objects.incrementar()
+        if options["zerar"]:
+            zerar_estatisticas()
+
+        stats = estatisticas()
+        self.stdout.write(str(VersaoDados.objects.atual()))
+        self.stdout.write(
+            f"Acertos: {stats['hits']}  Falhas: {stats['misses']}  "
+            f"Taxa de acerto: {stats['taxa_acerto']:.1%}"
+        )
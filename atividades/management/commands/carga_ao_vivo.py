@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from atividades.models import PlacarCrianca, VersaoDados
+
+
+def _alterar_placar():
+    """Soma 1 ponto no placar do primeiro colocado (gera um diff real)."""
+    placar = PlacarCrianca.objects.order_by("-total").first()
+    if placar is None:
+        raise CommandError("Não há crianças cadastradas para disparar uma alteração.")
+    PlacarCrianca.objects.filter(pk=placar.pk).update(total=F("total") + 1)
+    VersaoDados.objects.incrementar()
+    return placar.pk
+
+
+def _restaurar_placar(crianca_id):
+    PlacarCrianca.objects.recalcular([crianca_id], historico=False)
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga do ranking ao vivo: abre N conexões SSE simultâneas, "
+        "dispara uma alteração no placar e mede quanto cada tela leva para receber o diff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000/ranking/eventos/")
+        parser.add_argument("--clientes", type=int, default=300)
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument(
+            "--disparar", action="store_true",
+            help=(
+                "Altera o placar do 1º colocado neste banco (o mesmo do servidor) para gerar "
+                "um diff e depois o restaura a partir dos Resultados."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(self._executar(options))
+
+    async def _executar(self, options):
+        url = urlsplit(options["url"])
+        host, porta = url.hostname, url.port or 80
+        caminho = url.path or "/"
+        n = options["clientes"]
+
+        conectados = asyncio.Semaphore(0)
+        latencias = []
+        erros = []
+        estado = {"disparo": None}
+
+        async def cliente():
+            try:
+                reader, writer = await asyncio.open_connection(host, porta)
+            except OSError as e:
+                erros.append(str(e))
+                conectados.release()
+                return
+            writer.write(
+                f"GET {caminho} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode()
+            )
+            await writer.drain()
+            try:
+                while True:
+                    linha = await reader.readline()
+                    if not linha:
+                        erros.append("conexão encerrada pelo servidor")
+                        conectados.release()
+                        break
+                    if linha.startswith(b"event: versao"):
+                        conectados.release()
+                    elif linha.startswith(b"event: diff") and estado["disparo"]:
+                        latencias.append(time.perf_counter() - estado["disparo"])
+                        break
+            finally:
+                writer.close()
+
+        inicio = time.perf_counter()
+        tarefas = [asyncio.create_task(cliente()) for _ in range(n)]
+        for _ in range(n):
+            await asyncio.wait_for(conectados.acquire(), timeout=options["timeout"])
+        tempo_conexao = time.perf_counter() - inicio
+        self.stdout.write(
+            f"{n - len(erros)}/{n} telas conectadas em {tempo_conexao:.2f}s ({len(erros)} erros)"
+        )
+
+        if not options["disparar"]:
+            for tarefa in tarefas:
+                tarefa.cancel()
+            return
+
+        estado["disparo"] = time.perf_counter()
+        crianca_id = await sync_to_async(_alterar_placar)()
+        try:
+            await asyncio.wait_for(asyncio.gather(*tarefas), timeout=options["timeout"])
+        except asyncio.TimeoutError:
+            for tarefa in tarefas:
+                tarefa.cancel()
+        finally:
+            await sync_to_async(_restaurar_placar)(crianca_id)
+
+        if not latencias:
+            raise CommandError("Nenhuma tela recebeu o diff dentro do timeout.")
+        latencias.sort()
+        p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))]
+        self.stdout.write(
+            f"diff recebido por {len(latencias)}/{n} telas: "
+            f"p50={statistics.median(latencias) * 1000:.0f}ms "
+            f"p95={p95 * 1000:.0f}ms max={latencias[-1] * 1000:.0f}ms"
+        )
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from atividades.benchmark import carga_http, servidor_gunicorn
+from gincana.servidor import CPUS, PERFIS
+
+
+def _configuracao(texto):
+    """"4x2" -> (4 workers, 2 threads)."""
+    try:
+        workers, threads = (int(parte) for parte in texto.lower().split("x"))
+    except ValueError:
+        raise CommandError(f"Configuração inválida: {texto!r} (use WORKERSxTHREADS, ex.: 4x2).")
+    if workers < 1 or threads < 1:
+        raise CommandError(f"Configuração inválida: {texto!r}.")
+    return workers, threads
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga HTTP: sobe o gunicorn (gincana/servidor.py) com cada configuração de "
+        "workers x threads e mede requests/s e latência com N clientes simultâneos, sobre os "
+        "dados do banco atual. Com --url, mede um servidor já rodando."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--configuracoes", nargs="+", default=None,
+            help=f"WORKERSxTHREADS a comparar (padrão: 1x1, {CPUS}x1 e o perfil, {2 * CPUS + 1}x4).",
+        )
+        parser.add_argument("--perfil", choices=list(PERFIS), default="ranking")
+        parser.add_argument(
+            "--caminhos", nargs="+", default=["/ranking/", "/ranking/geral.json", "/api/ranking.json?por_pagina=100"],
+            help="Caminhos pedidos em rodízio por cada cliente.",
+        )
+        parser.add_argument("--clientes", type=int, nargs="+", default=[1, 8, 32])
+        parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de carga por medição.")
+        parser.add_argument("--url", default=None, help="Servidor já rodando (ex.: http://127.0.0.1:8787).")
+
+    def handle(self, *args, **options):
+        if options["url"]:
+            self.stdout.write(f"== {options['url']} ==")
+            self._medir(options["url"], options)
+            return
+
+        perfil = PERFIS[options["perfil"]]
+        padrao = ["1x1", f"{CPUS}x1", f"{perfil['workers']}x{perfil['threads']}"]
+        configuracoes = list(dict.fromkeys(
+            _configuracao(texto) for texto in (options["configuracoes"] or padrao)
+        ))
+        for workers, threads in configuracoes:
+            self.stdout.write(f"== {workers} workers x {threads} threads (perfil {options['perfil']}) ==")
+            try:
+                with servidor_gunicorn(workers, threads, perfil=options["perfil"]) as base:
+                    self._medir(base, options)
+            except RuntimeError as e:
+                raise CommandError(str(e))
+
+    def _medir(self, base, options):
+        for clientes in options["clientes"]:
+            m = carga_http(base, options["caminhos"], clientes=clientes, duracao=options["duracao"])
+            self.stdout.write(
+                f"  {clientes:4} clientes: {m['requests_por_s']} req/s, "
+                f"p50={m['p50_ms']}ms p95={m['p95_ms']}ms, {len(m['erros'])} erros"
+            )
+            for erro in sorted(set(m["erros"]))[:5]:
+                self.stdout.write(self.style.WARNING(f"    {erro}"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from atividades.models import HistoricoRanking, Temporada, VersaoDados
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera (ou corrige) as fotos semanais do ranking a partir do placar. "
+        "Use depois de atualizar uma base antiga ou de mexer no placar à mão."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde", type=int, default=None,
+            help="Só regrava as semanas de número maior ou igual a este (padrão: todas).",
+        )
+        parser.add_argument(
+            "--temporada", default=None,
+            help="Slug da temporada (padrão: todas as não arquivadas; com --desde, a ativa).",
+        )
+
+    def handle(self, *args, **options):
+        temporada = None
+        if options["temporada"]:
+            temporada = Temporada.objects.filter(slug=options["temporada"]).values_list("id", flat=True).first()
+            if temporada is None:
+                raise CommandError(f"Temporada inexistente: {options['temporada']}.")
+        elif options["desde"] is not None:
+            temporada = Temporada.objects.atual().pk
+        with transaction.atomic():
+            alteracoes = HistoricoRanking.objects.atualizar(temporada, desde=options["desde"])
+            if any(alteracoes.values()):
+                VersaoDados.objects.incrementar()
+        self.stdout.write(self.style.SUCCESS(
+            f"Histórico: {alteracoes['inseridas']} fotos inseridas, "
+            f"{alteracoes['atualizadas']} atualizadas, {alteracoes['removidas']} removidas."
+        ))
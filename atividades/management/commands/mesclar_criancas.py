@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Min
+
+from atividades.models import Crianca
+from atividades.nomes import mesclar, sugerir
+
+
+class Command(BaseCommand):
+    help = (
+        "Junta crianças duplicadas: os Resultados das origens passam para o destino (em lote) "
+        "e as origens são apagadas. --sugestoes lista os nomes parecidos para decidir."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("destino", type=int, nargs="?", help="Id da criança que fica.")
+        parser.add_argument("origens", type=int, nargs="*", help="Ids das crianças duplicadas.")
+        parser.add_argument(
+            "--sugestoes", action="store_true",
+            help="Lista pares de crianças com nomes parecidos, sem mesclar nada.",
+        )
+        parser.add_argument(
+            "--minimo", type=float, default=None,
+            help="Similaridade mínima das sugestões, de 0 a 1 (padrão: NOMES_SIMILARIDADE_MINIMA).",
+        )
+        parser.add_argument(
+            "--mesclar-iguais", action="store_true",
+            help="Mescla automaticamente as crianças com o mesmo nome normalizado na de menor id.",
+        )
+
+    def handle(self, *args, **options):
+        if options["sugestoes"]:
+            self._sugestoes(options["minimo"])
+        elif options["mesclar_iguais"]:
+            self._mesclar_iguais()
+        elif options["destino"] is not None and options["origens"]:
+            self._mesclar(options["destino"], options["origens"])
+        else:
+            raise CommandError("Informe o destino e as origens, --sugestoes ou --mesclar-iguais.")
+
+    def _mesclar(self, destino, origens):
+        try:
+            feito = mesclar(destino, origens)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{feito['removidas']} criança(s) mesclada(s) em #{destino}: {feito['movidos']} resultados "
+            f"movidos, {feito['somados']} somados a resultados existentes."
+        ))
+
+    def _sugestoes(self, minimo):
+        vistos = set()
+        total = 0
+        for sugestao in sugerir(minimo=minimo):
+            for parecido in sugestao["parecidos"]:
+                par = frozenset((sugestao["id"], parecido["id"]))
+                if par in vistos:
+                    continue
+                vistos.add(par)
+                total += 1
+                self.stdout.write(
+                    f"{parecido['similaridade']:.2f}  #{sugestao['id']} {sugestao['nome']}  ~  "
+                    f"#{parecido['id']} {parecido['nome']}"
+                )
+        self.stdout.write(f"{total} par(es) de nomes parecidos.")
+
+    def _mesclar_iguais(self):
+        # Só dentro da temporada ativa: o mesmo nome em outra temporada é outro registro de propósito
+        criancas = Crianca.objects.filter(temporada__ativa=True)
+        grupos = (
+            criancas.values("nome_normalizado")
+            .annotate(quantas=Count("id"), menor=Min("id"))
+            .filter(quantas__gt=1)
+            .order_by("nome_normalizado")
+        )
+        for grupo in grupos:
+            origens = list(
+                criancas.filter(nome_normalizado=grupo["nome_normalizado"])
+                .exclude(pk=grupo["menor"]).values_list("id", flat=True)
+            )
+            self._mesclar(grupo["menor"], origens)
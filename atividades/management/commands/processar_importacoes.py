@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from atividades.fila_importacao import processar_pendentes
+
+
+class Command(BaseCommand):
+    help = (
+        "Executor da fila de importações para IMPORTACAO_EM_SEGUNDO_PLANO=processo: "
+        "consulta a fila periodicamente e roda os jobs pendentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre consultas à fila.")
+        parser.add_argument("--uma-vez", action="store_true", help="Processa o que estiver pendente e sai.")
+
+    def handle(self, *args, **options):
+        while True:
+            executados = processar_pendentes()
+            if executados:
+                self.stdout.write(f"{executados} importação(ões) processada(s).")
+            close_old_connections()
+            if options["uma_vez"]:
+                return
+            time.sleep(options["intervalo"])
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from atividades.publicacao import publicar
+
+
+class Command(BaseCommand):
+    help = (
+        "Grava os quadros do ranking (HTML e JSON) em PUBLICACAO_DIR para o nginx servir. "
+        "Normalmente roda sozinho a cada mudança nos dados; use no deploy ou para refazer os arquivos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--destino", help="Diretório de saída (padrão: PUBLICACAO_DIR).")
+        parser.add_argument(
+            "--forcar", action="store_true",
+            help="Regrava mesmo que a versão atual dos dados já esteja publicada.",
+        )
+
+    def handle(self, *args, **options):
+        destino = options["destino"] or settings.PUBLICACAO_DIR
+        if not destino:
+            raise CommandError("Defina PUBLICACAO_DIR ou informe --destino.")
+        versao = publicar(destino, forcar=options["forcar"])
+        if versao is None:
+            self.stdout.write(f"Ranking já publicado em {destino} (versão atual dos dados).")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Ranking publicado em {destino} (versão {versao})."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from atividades.models import PlacarCrianca
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o placar (totais por criança e por semana) a partir dos Resultados."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas compara o placar gravado com os Resultados, sem gravar nada.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["verificar"]:
+            PlacarCrianca.objects.reconstruir()
+            self.stdout.write(self.style.SUCCESS("Placar reconstruído."))
+
+        erros = PlacarCrianca.objects.divergencias()
+        for crianca_id, semana_id, esperado, gravado in erros[:20]:
+            onde = f"semana {semana_id}" if semana_id else "total"
+            self.stdout.write(
+                f"Criança {crianca_id} ({onde}): esperado {esperado}, gravado {gravado}"
+            )
+        if erros:
+            raise CommandError(f"{len(erros)} divergência(s) entre placar e Resultados.")
+        self.stdout.write(self.style.SUCCESS("Placar confere com os Resultados."))
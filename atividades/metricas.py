@@ -0,0 +1,158 @@
+"""
+Métricas por request e log de queries lentas, leves o bastante para ficarem
+ligadas em produção (METRICAS_ATIVAS).
+
+MetricasMiddleware mede o tempo de cada request e, com um execute_wrapper na
+conexão, quantas queries ela fez e quanto tempo passou no banco. Queries acima
+de METRICAS_QUERY_LENTA_MS são logadas com o SQL. Por nome de rota (o "admin"
+inteiro conta como uma rota só) ficam as últimas METRICAS_JANELA durações, de
+onde saem p50/p95/p99, e contadores acumulados; /metricas/ publica tudo no
+formato texto do Prometheus.
+
+Os números são do processo que atende o scrape: com vários workers do gunicorn
+cada um tem a sua janela. Em views assíncronas (SSE, servidor ASGI) as queries
+rodam em outra thread e só o tempo total é medido.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+QUANTIS = (0.5, 0.95, 0.99)
+
+
+def _ativas():
+    return getattr(settings, "METRICAS_ATIVAS", True)
+
+
+def _rota(request):
+    """Nome da rota da request ("admin" para todo o admin), para agrupar as medições."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "sem_rota"
+    if "admin" in match.namespaces:
+        return "admin"
+    return match.url_name or match.view_name
+
+
+class MedidorQueries:
+    """execute_wrapper que soma queries e tempo de banco e loga as lentas."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.limite = getattr(settings, "METRICAS_QUERY_LENTA_MS", 200) / 1000
+        self.total = 0
+        self.segundos = 0.0
+        self.lentas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.total += 1
+            self.segundos += duracao
+            if duracao >= self.limite:
+                self.lentas += 1
+                logger.warning(
+                    "Query lenta (%.0f ms) em %s: %s | params=%r", duracao * 1000, self.caminho, sql, params
+                )
+
+
+class Registro:
+    """Medições por rota, em memória (por processo), protegidas por uma trava."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        tamanho = getattr(settings, "METRICAS_JANELA", 1000)
+        with self._trava:
+            self.duracoes = defaultdict(lambda: deque(maxlen=tamanho))
+            self.requests = defaultdict(int)
+            self.segundos = defaultdict(float)
+            self.queries = defaultdict(int)
+            self.segundos_db = defaultdict(float)
+            self.queries_lentas = defaultdict(int)
+
+    def registrar(self, rota, segundos, medidor=None):
+        with self._trava:
+            self.duracoes[rota].append(segundos)
+            self.requests[rota] += 1
+            self.segundos[rota] += segundos
+            if medidor is not None:
+                self.queries[rota] += medidor.total
+                self.segundos_db[rota] += medidor.segundos
+                self.queries_lentas[rota] += medidor.lentas
+
+    def quantis(self, rota):
+        """{quantil: segundos} da janela da rota (vizinho mais próximo)."""
+        with self._trava:
+            ordenadas = sorted(self.duracoes[rota])
+        if not ordenadas:
+            return {}
+        return {q: ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * q))] for q in QUANTIS}
+
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        rotas = sorted(self.requests)
+        linhas = [
+            "# HELP gincana_request_duracao_segundos Duração das requests por rota "
+            "(quantis das últimas METRICAS_JANELA requests deste processo).",
+            "# TYPE gincana_request_duracao_segundos summary",
+        ]
+        for rota in rotas:
+            for quantil, valor in self.quantis(rota).items():
+                linhas.append(f'gincana_request_duracao_segundos{{rota="{rota}",quantile="{quantil}"}} {valor:.6f}')
+            linhas.append(f'gincana_request_duracao_segundos_sum{{rota="{rota}"}} {self.segundos[rota]:.6f}')
+            linhas.append(f'gincana_request_duracao_segundos_count{{rota="{rota}"}} {self.requests[rota]}')
+        for nome, ajuda, valores, formato in (
+            ("gincana_db_queries_total", "Queries feitas pelas requests da rota.", self.queries, "d"),
+            ("gincana_db_duracao_segundos_total", "Tempo no banco das requests da rota.", self.segundos_db, ".6f"),
+            ("gincana_db_queries_lentas_total", "Queries acima de METRICAS_QUERY_LENTA_MS.", self.queries_lentas, "d"),
+        ):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+            linhas += [f'{nome}{{rota="{rota}"}} {valores[rota]:{formato}}' for rota in rotas]
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        if not _ativas():
+            return self.get_response(request)
+        medidor = MedidorQueries(request.path)
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(medidor):
+            response = self.get_response(request)
+        registro.registrar(_rota(request), time.perf_counter() - inicio, medidor)
+        return response
+
+    async def __acall__(self, request):
+        if not _ativas():
+            return await self.get_response(request)
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        registro.registrar(_rota(request), time.perf_counter() - inicio)
+        return response
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-18 11:49
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum, FloatField, ExpressionWrapper
+
+
+def preencher_placar(apps, schema_editor):
+    Crianca = apps.get_model("atividades", "Crianca")
+    Resultado = apps.get_model("atividades", "Resultado")
+    PlacarCrianca = apps.get_model("atividades", "PlacarCrianca")
+    PlacarSemanal = apps.get_model("atividades", "PlacarSemanal")
+
+    semanais = (
+        Resultado.objects.values("crianca_id", "semana_id")
+        .annotate(total=Sum(ExpressionWrapper(
+            F("quantidade") * F("atividade__pontos"), output_field=FloatField()
+        )))
+        .order_by()
+    )
+    totais = defaultdict(float)
+    novos = []
+    for linha in semanais:
+        totais[linha["crianca_id"]] += linha["total"] or 0.0
+        novos.append(PlacarSemanal(
+            crianca_id=linha["crianca_id"], semana_id=linha["semana_id"], total=linha["total"] or 0.0
+        ))
+    PlacarSemanal.objects.bulk_create(novos, batch_size=500)
+    PlacarCrianca.objects.bulk_create(
+        [PlacarCrianca(crianca_id=i, total=totais.get(i, 0.0))
+         for i in Crianca.objects.values_list("id", flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atividades', '0002_crianca_idade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlacarCrianca',
+            fields=[
+                ('crianca', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='placar', serialize=False, to='atividades.crianca')),
+                ('total', models.FloatField(default=0.0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-total'], name='placar_total_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlacarSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.FloatField(default=0.0)),
+                ('crianca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='placares_semanais', to='atividades.crianca')),
+                ('semana', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='placares', to='atividades.semana')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['semana', '-total'], name='placar_semana_total_idx')],
+                'constraints': [models.UniqueConstraint(fields=('crianca', 'semana'), name='placar_semanal_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_placar, migrations.RunPython.noop),
+    ]
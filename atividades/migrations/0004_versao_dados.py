@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 11:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def criar_versao(apps, schema_editor):
+    apps.get_model("atividades", "VersaoDados").objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atividades', '0003_placar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoDados',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('versao', models.PositiveBigIntegerField(default=1)),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(criar_versao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 12:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atividades', '0004_versao_dados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivo', models.FileField(blank=True, upload_to='importacoes/')),
+                ('nome_arquivo', models.CharField(max_length=255)),
+                ('semanas', models.JSONField(default=list, help_text='Números das semanas presentes no arquivo.')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('erro', 'Erro')], db_index=True, default='pendente', max_length=12)),
+                ('linhas_lidas', models.PositiveIntegerField(default=0)),
+                ('resultados_gravados', models.PositiveIntegerField(default=0)),
+                ('celulas_invalidas', models.PositiveIntegerField(default=0)),
+                ('erro', models.TextField(blank=True)),
+                ('resumo', models.JSONField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'importação',
+                'verbose_name_plural': 'importações',
+                'ordering': ['-criado_em'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TravaSemanaImportacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semana_numero', models.IntegerField(unique=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='travas', to='atividades.importacaojob')),
+            ],
+        ),
+    ]
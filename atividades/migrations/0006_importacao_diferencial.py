@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atividades', '0005_importacao_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importacaojob',
+            name='diferencial',
+            field=models.BooleanField(default=False, help_text='Grava só as células que mudaram em relação ao banco.'),
+        ),
+    ]
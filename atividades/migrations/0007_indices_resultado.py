@@ -0,0 +1,116 @@
+# Generated by Django 5.2 on 2026-10-18 12:12
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum, FloatField, ExpressionWrapper
+
+
+def unificar_duplicados(apps, schema_editor):
+    """
+    Prepara os dados para as novas restrições: semanas com o mesmo número viram
+    uma só (a de menor id) e Resultados repetidos de (criança, semana, atividade)
+    viram uma linha com as quantidades somadas. Os totais não mudam; o placar
+    das crianças afetadas é refeito.
+    """
+    Semana = apps.get_model("atividades", "Semana")
+    Resultado = apps.get_model("atividades", "Resultado")
+    PlacarCrianca = apps.get_model("atividades", "PlacarCrianca")
+    PlacarSemanal = apps.get_model("atividades", "PlacarSemanal")
+
+    manter = {}
+    for semana_id, numero in Semana.objects.order_by("id").values_list("id", "numero"):
+        manter.setdefault(numero, semana_id)
+    duplicadas = {}
+    for semana_id, numero in Semana.objects.values_list("id", "numero"):
+        if manter[numero] != semana_id:
+            duplicadas[semana_id] = manter[numero]
+    for origem, destino in duplicadas.items():
+        Resultado.objects.filter(semana_id=origem).update(semana_id=destino)
+
+    linhas = defaultdict(list)
+    for resultado_id, chave, quantidade in (
+        (r[0], r[1:4], r[4]) for r in Resultado.objects.order_by("id").values_list(
+            "id", "crianca_id", "semana_id", "atividade_id", "quantidade"
+        )
+    ):
+        linhas[chave].append((resultado_id, quantidade))
+    afetadas = set()
+    for chave, itens in linhas.items():
+        if len(itens) > 1:
+            afetadas.add(chave[0])
+            Resultado.objects.filter(id=itens[0][0]).update(quantidade=sum(q for _, q in itens))
+            Resultado.objects.filter(id__in=[i for i, _ in itens[1:]]).delete()
+
+    afetadas.update(
+        PlacarSemanal.objects.filter(semana_id__in=list(duplicadas)).values_list("crianca_id", flat=True)
+    )
+    Semana.objects.filter(id__in=list(duplicadas)).delete()
+    if not afetadas:
+        return
+
+    afetadas = list(afetadas)
+    PlacarSemanal.objects.filter(crianca_id__in=afetadas).delete()
+    totais = defaultdict(float)
+    novos = []
+    for linha in (
+        Resultado.objects.filter(crianca_id__in=afetadas)
+        .values("crianca_id", "semana_id")
+        .annotate(total=Sum(ExpressionWrapper(
+            F("quantidade") * F("atividade__pontos"), output_field=FloatField()
+        )))
+        .order_by()
+    ):
+        totais[linha["crianca_id"]] += linha["total"] or 0.0
+        novos.append(PlacarSemanal(
+            crianca_id=linha["crianca_id"], semana_id=linha["semana_id"], total=linha["total"] or 0.0
+        ))
+    PlacarSemanal.objects.bulk_create(novos, batch_size=500)
+    for crianca_id in afetadas:
+        PlacarCrianca.objects.update_or_create(
+            crianca_id=crianca_id, defaults={"total": totais.get(crianca_id, 0.0)}
+        )
+
+
+class Migration(migrations.Migration):
+    # No PostgreSQL, ALTER TABLE não pode rodar na mesma transação que acabou de
+    # atualizar linhas com FKs deferidas: a unificação roda (e commita) à parte,
+    # numa transação só dela (uma falha no meio não deixa metade unificada)
+    atomic = False
+
+    dependencies = [
+        ('atividades', '0006_importacao_diferencial'),
+    ]
+
+    operations = [
+        migrations.RunPython(unificar_duplicados, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name='atividade',
+            name='pontos',
+            field=models.FloatField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='resultado',
+            name='crianca',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='atividades.crianca'),
+        ),
+        migrations.AlterField(
+            model_name='resultado',
+            name='semana',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='atividades.semana'),
+        ),
+        migrations.AlterField(
+            model_name='semana',
+            name='numero',
+            field=models.IntegerField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='resultado',
+            index=models.Index(fields=['semana', 'crianca'], name='resultado_semana_crianca_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resultado',
+            constraint=models.UniqueConstraint(fields=('crianca', 'semana', 'atividade'), name='resultado_unico'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 12:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atividades', '0007_indices_resultado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_semana', models.FloatField(default=0.0)),
+                ('acumulado', models.FloatField(default=0.0)),
+                ('posicao', models.PositiveIntegerField()),
+                ('variacao', models.IntegerField(blank=True, null=True)),
+                ('crianca', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='historico', to='atividades.crianca')),
+                ('semana', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='historico', to='atividades.semana')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['semana', 'posicao'], name='historico_semana_posicao_idx'), models.Index(fields=['semana', '-variacao'], name='historico_semana_variacao_idx'), models.Index(fields=['semana', '-total_semana'], name='historico_semana_total_idx')],
+                'constraints': [models.UniqueConstraint(fields=('crianca', 'semana'), name='historico_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 12:57
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalizar(nome):
+    # Cópia de models.normalizar_nome no momento desta migração
+    sem_acentos = "".join(c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def preencher_nome_normalizado(apps, schema_editor):
+    Crianca = apps.get_model("atividades", "Crianca")
+    criancas = list(Crianca.objects.only("id", "nome"))
+    for crianca in criancas:
+        crianca.nome_normalizado = _normalizar(crianca.nome)
+    Crianca.objects.bulk_update(criancas, ["nome_normalizado"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atividades', '0008_historico_ranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crianca',
+            name='nome_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(preencher_nome_normalizado, migrations.RunPython.noop),
+    ]
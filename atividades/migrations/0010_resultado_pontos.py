@@ -0,0 +1,156 @@
+# Generated by Django 5.2 on 2026-10-18 15:40
+
+import math
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+TAMANHO_LOTE = 500
+
+
+def _nota_antiga(nome, pontos):
+    """Atividade "Nota X" criada pela importação antiga (uma por nota distinta)."""
+    if not nome.startswith("Nota "):
+        return False
+    try:
+        return float(nome[len("Nota "):]) == pontos
+    except ValueError:
+        return False
+
+
+def _totais(Resultado):
+    return dict(
+        Resultado.objects.values("crianca_id").annotate(total=Sum("pontos")).order_by()
+        .values_list("crianca_id", "total")
+    )
+
+
+def _conferir(antes, depois):
+    diferentes = [
+        crianca_id for crianca_id in antes.keys() | depois.keys()
+        if not math.isclose(antes.get(crianca_id) or 0.0, depois.get(crianca_id) or 0.0, abs_tol=1e-9)
+    ]
+    if diferentes:
+        raise RuntimeError(
+            f"Os totais de {len(diferentes)} criança(s) mudariam (ids {sorted(diferentes)[:10]}); nada foi alterado."
+        )
+
+
+def unificar_notas(apps, schema_editor):
+    """
+    Preenche Resultado.pontos (quantidade x pontos da atividade) e junta as
+    atividades "Nota X" numa atividade "Nota" de pontuação livre: uma linha por
+    (criança, semana) com as quantidades e os pontos somados. Confere que o
+    total de cada criança é o mesmo antes e depois.
+    """
+    Atividade = apps.get_model("atividades", "Atividade")
+    Resultado = apps.get_model("atividades", "Resultado")
+
+    atividades = list(Atividade.objects.values_list("id", "nome", "pontos"))
+    for atividade_id, _, pontos in atividades:
+        Resultado.objects.filter(atividade_id=atividade_id).update(pontos=F("quantidade") * pontos)
+
+    notas = [atividade_id for atividade_id, nome, pontos in atividades if _nota_antiga(nome, pontos)]
+    if not notas:
+        return
+    antes = _totais(Resultado)
+
+    nota = Atividade.objects.create(nome="Nota", pontos=1, pontuacao_livre=True)
+    somas = defaultdict(lambda: [0, 0.0])
+    for inicio in range(0, len(notas), TAMANHO_LOTE):
+        for crianca_id, semana_id, quantidade, pontos in (
+            Resultado.objects.filter(atividade_id__in=notas[inicio:inicio + TAMANHO_LOTE])
+            .values_list("crianca_id", "semana_id", "quantidade", "pontos").iterator(chunk_size=2000)
+        ):
+            soma = somas[(crianca_id, semana_id)]
+            soma[0] += quantidade
+            soma[1] += pontos
+    Resultado.objects.bulk_create(
+        [
+            Resultado(crianca_id=c, semana_id=s, atividade_id=nota.pk, quantidade=q, pontos=p)
+            for (c, s), (q, p) in somas.items()
+        ],
+        batch_size=TAMANHO_LOTE,
+    )
+    for inicio in range(0, len(notas), TAMANHO_LOTE):
+        lote = notas[inicio:inicio + TAMANHO_LOTE]
+        Resultado.objects.filter(atividade_id__in=lote).delete()
+        Atividade.objects.filter(id__in=lote).delete()
+
+    _conferir(antes, _totais(Resultado))
+
+
+def separar_notas(apps, schema_editor):
+    """
+    Volta cada Resultado de pontuação livre para uma atividade "Nota X" com
+    quantidade 1 (as quantidades originais por nota não são recuperáveis; os
+    totais são).
+    """
+    Atividade = apps.get_model("atividades", "Atividade")
+    Resultado = apps.get_model("atividades", "Resultado")
+
+    livres = list(Atividade.objects.filter(pontuacao_livre=True).values_list("id", flat=True))
+    if not livres:
+        return
+    antes = _totais(Resultado)
+
+    linhas = list(
+        Resultado.objects.filter(atividade_id__in=livres).values_list("crianca_id", "semana_id", "pontos")
+    )
+    por_pontos = {}
+    for atividade_id, pontos in (
+        Atividade.objects.filter(pontuacao_livre=False, nome__startswith="Nota ").order_by("id")
+        .values_list("id", "pontos")
+    ):
+        por_pontos.setdefault(pontos, atividade_id)
+    for pontos in {p for _, _, p in linhas} - por_pontos.keys():
+        por_pontos[pontos] = Atividade.objects.create(nome=f"Nota {pontos:g}", pontos=pontos).pk
+
+    Resultado.objects.filter(atividade_id__in=livres).delete()
+    somas = defaultdict(lambda: [0, 0.0])
+    for crianca_id, semana_id, pontos in linhas:
+        soma = somas[(crianca_id, semana_id, por_pontos[pontos])]
+        soma[0] += 1
+        soma[1] += pontos
+    existentes = {
+        (r.crianca_id, r.semana_id, r.atividade_id): r
+        for r in Resultado.objects.filter(atividade_id__in=set(por_pontos.values()))
+    }
+    novos = []
+    for (c, s, a), (q, p) in somas.items():
+        if (c, s, a) in existentes:
+            Resultado.objects.filter(pk=existentes[(c, s, a)].pk).update(
+                quantidade=F("quantidade") + q, pontos=F("pontos") + p
+            )
+        else:
+            novos.append(Resultado(crianca_id=c, semana_id=s, atividade_id=a, quantidade=q, pontos=p))
+    Resultado.objects.bulk_create(novos, batch_size=TAMANHO_LOTE)
+    Atividade.objects.filter(id__in=livres).delete()
+
+    _conferir(antes, _totais(Resultado))
+
+
+class Migration(migrations.Migration):
+    # Como na 0007: no PostgreSQL o ALTER TABLE da volta não pode rodar na mesma
+    # transação que mexeu em linhas com FKs deferidas; a parte de dados roda à
+    # parte, na sua própria transação (se _conferir falhar, nada fica gravado)
+    atomic = False
+
+    dependencies = [
+        ("atividades", "0009_crianca_nome_normalizado"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="atividade",
+            name="pontuacao_livre",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="resultado",
+            name="pontos",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(unificar_notas, separar_notas, atomic=True),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2 on 2026-10-18 18:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def criar_temporada_inicial(apps, schema_editor):
+    """Tudo o que já existe vira a primeira temporada (ativa)."""
+    Temporada = apps.get_model("atividades", "Temporada")
+    Crianca = apps.get_model("atividades", "Crianca")
+    Semana = apps.get_model("atividades", "Semana")
+    ImportacaoJob = apps.get_model("atividades", "ImportacaoJob")
+    if not (Crianca.objects.exists() or Semana.objects.exists()):
+        return
+    ano = django.utils.timezone.localdate().year
+    temporada = Temporada.objects.create(nome=f"Gincana {ano}", slug=str(ano), ativa=True)
+    Crianca.objects.update(temporada=temporada)
+    Semana.objects.update(temporada=temporada)
+    ImportacaoJob.objects.update(temporada=temporada)
+
+
+class Migration(migrations.Migration):
+    # Como na 0007: no PostgreSQL o ALTER TABLE não pode rodar na mesma transação
+    # que acabou de atualizar linhas com FKs deferidas; a parte de dados roda à
+    # parte, numa transação só dela
+    atomic = False
+
+    dependencies = [
+        ("atividades", "0010_resultado_pontos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Temporada",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("nome", models.CharField(max_length=100)),
+                ("slug", models.SlugField(help_text="Usado nos endereços: /temporadas/<slug>/ranking/.", unique=True)),
+                ("ativa", models.BooleanField(default=False, help_text="A temporada em andamento (só uma por vez).")),
+                ("criada_em", models.DateTimeField(default=django.utils.timezone.now)),
+                ("arquivada_em", models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+            options={
+                "ordering": ["-criada_em"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("ativa", True)), fields=("ativa",), name="uma_temporada_ativa"
+                    ),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="crianca",
+            name="temporada",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.PROTECT, related_name="criancas",
+                to="atividades.temporada",
+            ),
+        ),
+        migrations.AddField(
+            model_name="semana",
+            name="temporada",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.PROTECT, related_name="semanas",
+                to="atividades.temporada",
+            ),
+        ),
+        migrations.AddField(
+            model_name="importacaojob",
+            name="temporada",
+            field=models.ForeignKey(
+                blank=True, help_text="Temporada que recebe os resultados (a ativa quando o arquivo foi enviado).",
+                null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="importacoes",
+                to="atividades.temporada",
+            ),
+        ),
+        migrations.RunPython(criar_temporada_inicial, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name="crianca",
+            name="temporada",
+            field=models.ForeignKey(
+                blank=True, help_text="Vazio = a temporada ativa.", on_delete=django.db.models.deletion.PROTECT,
+                related_name="criancas", to="atividades.temporada",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="semana",
+            name="temporada",
+            field=models.ForeignKey(
+                blank=True, help_text="Vazio = a temporada ativa.", on_delete=django.db.models.deletion.PROTECT,
+                related_name="semanas", to="atividades.temporada",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="semana",
+            name="numero",
+            field=models.IntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name="semana",
+            constraint=models.UniqueConstraint(fields=("temporada", "numero"), name="semana_unica_por_temporada"),
+        ),
+        migrations.CreateModel(
+            name="ResumoTemporada",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("nome", models.CharField(max_length=100)),
+                ("turma", models.CharField(blank=True, max_length=50)),
+                ("idade", models.PositiveSmallIntegerField(default=0)),
+                ("total", models.FloatField(default=0.0)),
+                ("posicao", models.PositiveIntegerField()),
+                ("semanas", models.PositiveSmallIntegerField(default=0, help_text="Semanas em que a criança pontuou.")),
+                (
+                    "temporada",
+                    models.ForeignKey(
+                        db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="resumo",
+                        to="atividades.temporada",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "resumo de temporada",
+                "verbose_name_plural": "resumos de temporada",
+                "indexes": [
+                    models.Index(fields=["temporada", "-total", "nome"], name="resumo_temporada_total_idx"),
+                ],
+            },
+        ),
+    ]
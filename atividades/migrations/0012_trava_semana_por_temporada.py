@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-18 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_temporada(apps, schema_editor):
+    """As travas em andamento passam a ser da temporada do job (ou da ativa, se o job não tiver)."""
+    Temporada = apps.get_model("atividades", "Temporada")
+    TravaSemanaImportacao = apps.get_model("atividades", "TravaSemanaImportacao")
+    ativa = Temporada.objects.filter(ativa=True).values_list("id", flat=True).first()
+    for trava in TravaSemanaImportacao.objects.select_related("job"):
+        trava.temporada_id = trava.job.temporada_id or ativa
+        if trava.temporada_id is None:
+            # Sem temporada nenhuma não há o que importar: a trava só seguraria a fila
+            trava.delete()
+        else:
+            trava.save(update_fields=["temporada"])
+
+
+class Migration(migrations.Migration):
+    # Como na 0007: o ALTER TABLE roda fora da transação que atualizou as linhas
+    atomic = False
+
+    dependencies = [
+        ("atividades", "0011_temporadas"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="travasemanaimportacao",
+            name="temporada",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.CASCADE, related_name="+", to="atividades.temporada"
+            ),
+        ),
+        migrations.RunPython(preencher_temporada, migrations.RunPython.noop, atomic=True),
+        migrations.AlterField(
+            model_name="travasemanaimportacao",
+            name="temporada",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name="+", to="atividades.temporada"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="travasemanaimportacao",
+            name="semana_numero",
+            field=models.IntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name="travasemanaimportacao",
+            constraint=models.UniqueConstraint(
+                fields=("temporada", "semana_numero"), name="trava_semana_por_temporada"
+            ),
+        ),
+    ]
@@ -1,9 +1,96 @@
-from django.db import models
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.db.models import F, Sum
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .banco import upsert_em_massa
+
+
+# Limite de ids por cláusula IN (o SQLite tem limite de variáveis por query).
+TAMANHO_LOTE_IDS = 500
+
+
+def em_lotes(ids, tamanho=TAMANHO_LOTE_IDS):
+    ids = list(ids)
+    for i in range(0, len(ids), tamanho):
+        yield ids[i:i + tamanho]
+
+
+def normalizar_nome(nome):
+    """
+    Chave de comparação de nomes: sem acentos, sem diferença de maiúsculas e
+    com os espaços colapsados ("  José  da Silva" e "jose da silva" batem).
+    """
+    sem_acentos = "".join(
+        c for c in unicodedata.normalize("NFKD", nome) if not unicodedata.combining(c)
+    )
+    return " ".join(sem_acentos.casefold().split())
+
+
+class TemporadaManager(models.Manager):
+    def atual(self):
+        """A temporada em andamento (a ativa), criada na primeira vez que for pedida."""
+        temporada = self.filter(ativa=True).first()
+        if temporada is None:
+            ano = timezone.localdate().year
+            slug, sufixo = str(ano), 1
+            while self.filter(slug=slug).exists():
+                sufixo += 1
+                slug = f"{ano}-{sufixo}"
+            temporada = self.create(nome=f"Gincana {slug}", slug=slug, ativa=True)
+        return temporada
+
+
+class Temporada(models.Model):
+    """
+    Uma edição da gincana. Crianças e semanas pertencem a uma temporada; o
+    ranking, a importação e os lançamentos trabalham na ativa. Temporadas
+    encerradas podem ser arquivadas (comando arquivar_temporada): os dados
+    saem das tabelas do dia a dia e fica só o ResumoTemporada.
+    """
+    nome = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True, help_text="Usado nos endereços: /temporadas/<slug>/ranking/.")
+    ativa = models.BooleanField(default=False, help_text="A temporada em andamento (só uma por vez).")
+    criada_em = models.DateTimeField(default=timezone.now)
+    arquivada_em = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = TemporadaManager()
+
+    class Meta:
+        ordering = ["-criada_em"]
+        constraints = [
+            models.UniqueConstraint(fields=["ativa"], condition=models.Q(ativa=True), name="uma_temporada_ativa"),
+        ]
+
+    def __str__(self):
+        return self.nome
+
+    @property
+    def arquivada(self):
+        return self.arquivada_em is not None
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.ativa:
+                Temporada.objects.filter(ativa=True).exclude(pk=self.pk).update(ativa=False)
+            super().save(*args, **kwargs)
+        # Trocar a temporada ativa troca o ranking de todas as telas
+        VersaoDados.objects.incrementar()
 
 
 class Crianca(models.Model):
+    # A mesma criança em outra temporada é outro registro (idade e turma mudam a cada ano)
+    temporada = models.ForeignKey(
+        Temporada, on_delete=models.PROTECT, related_name="criancas", blank=True,
+        help_text="Vazio = a temporada ativa.",
+    )
     nome = models.CharField(max_length=100)
+    # Mantido por save() e pela importação; é por ele que a planilha encontra a criança
+    nome_normalizado = models.CharField(max_length=100, db_index=True, editable=False, default="")
     turma = models.CharField(max_length=50, blank=True)
     idade = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(0), MaxValueValidator(12)],
@@ -13,29 +100,519 @@ class Crianca(models.Model):
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        if self.temporada_id is None:
+            self.temporada = Temporada.objects.atual()
+        self.nome_normalizado = normalizar_nome(self.nome)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "nome" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "nome_normalizado"}
+        anterior = None
+        if not self._state.adding:
+            anterior = Crianca.objects.filter(pk=self.pk).values_list("temporada_id", flat=True).first()
+        super().save(*args, **kwargs)
+        if anterior is not None and anterior != self.temporada_id:
+            # Sai das fotos semanais de uma temporada e entra nas da outra
+            for temporada_id in (anterior, self.temporada_id):
+                HistoricoRanking.objects.atualizar(temporada=temporada_id)
+        VersaoDados.objects.incrementar()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        VersaoDados.objects.incrementar()
+        # Quem estava atrás dela sobe uma posição nas fotos semanais
+        HistoricoRanking.objects.atualizar(temporada=self.temporada_id)
+        return resultado
+
 class Semana(models.Model):
+    temporada = models.ForeignKey(
+        Temporada, on_delete=models.PROTECT, related_name="semanas", blank=True,
+        help_text="Vazio = a temporada ativa.",
+    )
     numero = models.IntegerField()
     data_inicio = models.DateField()
     data_fim = models.DateField()
 
+    class Meta:
+        constraints = [
+            # Cada temporada recomeça da semana 1; o índice também serve a busca por número
+            models.UniqueConstraint(fields=["temporada", "numero"], name="semana_unica_por_temporada"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.temporada_id is None:
+            self.temporada = Temporada.objects.atual()
+        anterior = None
+        if not self._state.adding:
+            anterior = Semana.objects.filter(pk=self.pk).values_list("numero", "temporada_id").first()
+        super().save(*args, **kwargs)
+        if anterior is not None and anterior != (self.numero, self.temporada_id):
+            # As fotos seguem a ordem dos números: renumerar ou mudar de temporada
+            # muda o acumulado e a variação de todas as semanas a partir daqui
+            desde = min(anterior[0], self.numero)
+            for temporada_id in {anterior[1], self.temporada_id}:
+                HistoricoRanking.objects.atualizar(temporada=temporada_id, desde=desde)
+            VersaoDados.objects.incrementar()
+
     def __str__(self):
         return f"Semana {self.numero} ({self.data_inicio} a {self.data_fim})"
 
+    def delete(self, *args, **kwargs):
+        afetadas = list(self.resultado_set.values_list("crianca_id", flat=True).distinct())
+        resultado = super().delete(*args, **kwargs)
+        PlacarCrianca.objects.recalcular(afetadas)
+        return resultado
+
+class AtividadeManager(models.Manager):
+    def nota(self):
+        """
+        A atividade de pontuação livre onde a importação grava as notas da
+        planilha (criada na primeira vez): os pontos vêm da célula, não dela.
+        """
+        atividade = self.filter(pontuacao_livre=True).order_by("id").first()
+        if atividade is None:
+            atividade = self.create(nome="Nota", pontos=1, pontuacao_livre=True)
+        return atividade
+
+
 class Atividade(models.Model):
     nome = models.CharField(max_length=100)
-    pontos = models.FloatField()
+    pontos = models.FloatField(db_index=True)
+    # Pontuação livre: cada Resultado traz os próprios pontos (ex.: nota da planilha)
+    # e `pontos` da atividade não entra na conta
+    pontuacao_livre = models.BooleanField(default=False)
+
+    objects = AtividadeManager()
 
     def __str__(self):
+        if self.pontuacao_livre:
+            return f"{self.nome} (pontuação livre)"
         return f"{self.nome} ({self.pontos} pts)"
 
+    def save(self, *args, **kwargs):
+        anterior = None
+        if self.pk:
+            anterior = Atividade.objects.filter(pk=self.pk).values_list("pontos", "pontuacao_livre").first()
+        super().save(*args, **kwargs)
+        if anterior is not None and anterior != (self.pontos, self.pontuacao_livre) and not self.pontuacao_livre:
+            # Os pontos ficam gravados em cada Resultado: refaz os desta atividade
+            self.resultado_set.update(pontos=F("quantidade") * self.pontos)
+            PlacarCrianca.objects.recalcular(
+                self.resultado_set.values_list("crianca_id", flat=True).distinct()
+            )
+
+    def delete(self, *args, **kwargs):
+        afetadas = list(self.resultado_set.values_list("crianca_id", flat=True).distinct())
+        resultado = super().delete(*args, **kwargs)
+        PlacarCrianca.objects.recalcular(afetadas)
+        return resultado
+
 class Resultado(models.Model):
-    crianca = models.ForeignKey(Crianca, on_delete=models.CASCADE)
-    semana = models.ForeignKey(Semana, on_delete=models.CASCADE)
+    # crianca e semana dispensam o índice próprio da FK: são prefixo dos índices abaixo
+    crianca = models.ForeignKey(Crianca, on_delete=models.CASCADE, db_index=False)
+    semana = models.ForeignKey(Semana, on_delete=models.CASCADE, db_index=False)
     atividade = models.ForeignKey(Atividade, on_delete=models.CASCADE)
     quantidade = models.PositiveIntegerField(default=1)
+    # quantidade x pontos da atividade, ou a nota lançada se a atividade for de
+    # pontuação livre: o placar soma esta coluna sem JOIN com Atividade
+    pontos = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            # Uma linha por (criança, semana, atividade); repetições vão em `quantidade`.
+            # O índice serve o placar (por criança) e a importação (criança x semana).
+            models.UniqueConstraint(fields=["crianca", "semana", "atividade"], name="resultado_unico"),
+        ]
+        indexes = [models.Index(fields=["semana", "crianca"], name="resultado_semana_crianca_idx")]
 
     def pontos_totais(self):
-        return self.quantidade * self.atividade.pontos
+        return self.pontos
 
     def __str__(self):
         return f"{self.crianca} - {self.atividade} x{self.quantidade} (Semana {self.semana.numero})"
+
+    def save(self, *args, **kwargs):
+        # Se a criança do resultado mudou, o placar antigo também precisa ser refeito
+        anterior = None
+        if self.pk:
+            anterior = (
+                Resultado.objects.filter(pk=self.pk).values_list("crianca_id", flat=True).first()
+            )
+        if not self.atividade.pontuacao_livre:
+            self.pontos = self.quantidade * self.atividade.pontos
+        super().save(*args, **kwargs)
+        PlacarCrianca.objects.recalcular({self.crianca_id, anterior} - {None})
+
+    def delete(self, *args, **kwargs):
+        crianca_id = self.crianca_id
+        resultado = super().delete(*args, **kwargs)
+        PlacarCrianca.objects.recalcular([crianca_id])
+        return resultado
+
+
+class PlacarManager(models.Manager):
+    """
+    Mantém os totais desnormalizados (PlacarCrianca / PlacarSemanal).
+    Sempre recalcula a partir dos Resultados da criança, então é idempotente
+    e não depende do valor anterior gravado.
+    """
+
+    def recalcular(self, crianca_ids, historico=True):
+        """
+        Refaz o placar das crianças. Com `historico`, refaz também as fotos
+        semanais do ranking (a importação desliga e atualiza uma vez no fim).
+        """
+        ids = sorted(set(crianca_ids))
+        if ids:
+            VersaoDados.objects.incrementar()
+        temporadas = set()
+        for lote in em_lotes(ids):
+            semanais = (
+                Resultado.objects.filter(crianca_id__in=lote)
+                .values("crianca_id", "semana_id")
+                .annotate(total=Sum("pontos"))
+                .order_by()
+            )
+            totais = defaultdict(float)
+            novos_semanais = []
+            for linha in semanais:
+                totais[linha["crianca_id"]] += linha["total"] or 0.0
+                novos_semanais.append(PlacarSemanal(
+                    crianca_id=linha["crianca_id"],
+                    semana_id=linha["semana_id"],
+                    total=linha["total"] or 0.0,
+                ))
+
+            PlacarSemanal.objects.filter(crianca_id__in=lote).delete()
+            PlacarSemanal.objects.bulk_create(novos_semanais)
+
+            # Crianças apagadas no meio do caminho já perderam o placar em cascata
+            existentes = dict(Crianca.objects.filter(id__in=lote).values_list("id", "temporada_id"))
+            temporadas.update(existentes.values())
+            self.bulk_create(
+                [PlacarCrianca(crianca_id=i, total=totais.get(i, 0.0)) for i in existentes],
+                update_conflicts=True,
+                unique_fields=["crianca"],
+                update_fields=["total"],
+            )
+        if historico:
+            for temporada_id in sorted(temporadas):
+                HistoricoRanking.objects.atualizar(temporada=temporada_id)
+
+    def reconstruir(self):
+        """Apaga e recalcula o placar (e o histórico) de todas as crianças."""
+        PlacarSemanal.objects.all().delete()
+        self.all().delete()
+        self.recalcular(Crianca.objects.values_list("id", flat=True))
+
+    def divergencias(self, tolerancia=1e-6):
+        """
+        Compara o placar gravado com a soma direta dos Resultados.
+        Retorna lista de (crianca_id, semana_id ou None, esperado, gravado).
+        """
+        esperado_total = defaultdict(float)
+        esperado_semana = {}
+        for linha in (
+            Resultado.objects.values("crianca_id", "semana_id")
+            .annotate(total=Sum("pontos"))
+            .order_by()
+        ):
+            chave = (linha["crianca_id"], linha["semana_id"])
+            esperado_semana[chave] = linha["total"] or 0.0
+            esperado_total[linha["crianca_id"]] += linha["total"] or 0.0
+
+        gravado_total = dict(self.values_list("crianca_id", "total"))
+        gravado_semana = {
+            (c, s): t for c, s, t in PlacarSemanal.objects.values_list("crianca_id", "semana_id", "total")
+        }
+
+        erros = []
+        for crianca_id in Crianca.objects.values_list("id", flat=True):
+            esperado = esperado_total.get(crianca_id, 0.0)
+            gravado = gravado_total.get(crianca_id)
+            if gravado is None or abs(esperado - gravado) > tolerancia:
+                erros.append((crianca_id, None, esperado, gravado))
+        for chave in esperado_semana.keys() | gravado_semana.keys():
+            esperado = esperado_semana.get(chave)
+            gravado = gravado_semana.get(chave)
+            if esperado is None or gravado is None or abs(esperado - gravado) > tolerancia:
+                erros.append((chave[0], chave[1], esperado, gravado))
+        return erros
+
+
+class PlacarCrianca(models.Model):
+    """Total acumulado de pontos da criança (mantido por PlacarManager)."""
+    crianca = models.OneToOneField(
+        Crianca, on_delete=models.CASCADE, primary_key=True, related_name="placar"
+    )
+    total = models.FloatField(default=0.0)
+
+    objects = PlacarManager()
+
+    class Meta:
+        indexes = [models.Index(fields=["-total"], name="placar_total_idx")]
+
+    def __str__(self):
+        return f"{self.crianca} - {self.total} pts"
+
+
+class PlacarSemanal(models.Model):
+    """Total de pontos da criança em uma semana (mantido por PlacarManager)."""
+    crianca = models.ForeignKey(Crianca, on_delete=models.CASCADE, related_name="placares_semanais")
+    semana = models.ForeignKey(Semana, on_delete=models.CASCADE, related_name="placares")
+    total = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["crianca", "semana"], name="placar_semanal_unico"),
+        ]
+        indexes = [models.Index(fields=["semana", "-total"], name="placar_semana_total_idx")]
+
+    def __str__(self):
+        return f"{self.crianca} - Semana {self.semana_id}: {self.total} pts"
+
+
+class HistoricoManager(models.Manager):
+    """
+    Mantém as fotos semanais do ranking (HistoricoRanking) a partir do
+    PlacarSemanal: para cada semana, em ordem de número, o acumulado de cada
+    criança até ali, a posição nesse acumulado e quantas posições subiu.
+    Cada temporada tem o seu acumulado, calculado só com as suas semanas.
+    """
+
+    def calcular(self, temporada):
+        """{(semana_id, crianca_id): (total_semana, acumulado, posicao, variacao)} das semanas da temporada."""
+        semanas = list(Semana.objects.filter(temporada_id=temporada).order_by("numero").values_list("id", flat=True))
+        criancas = list(Crianca.objects.filter(temporada_id=temporada).values_list("id", flat=True))
+        totais = defaultdict(dict)
+        for crianca_id, semana_id, total in PlacarSemanal.objects.filter(semana_id__in=semanas).values_list(
+            "crianca_id", "semana_id", "total"
+        ):
+            totais[semana_id][crianca_id] = total
+
+        acumulado = dict.fromkeys(criancas, 0.0)
+        posicao_anterior = {}
+        fotos = {}
+        for semana_id in semanas:
+            da_semana = totais.get(semana_id, {})
+            for crianca_id, total in da_semana.items():
+                # Pontos de uma criança que mudou de temporada ficam fora das fotos daqui
+                if crianca_id in acumulado:
+                    acumulado[crianca_id] += total
+            # Mesma regra do ranking: empatados dividem a posição e a seguinte pula (1, 1, 3)
+            posicao, ultimo = 0, None
+            for contador, crianca_id in enumerate(sorted(criancas, key=acumulado.__getitem__, reverse=True), 1):
+                if acumulado[crianca_id] != ultimo:
+                    posicao, ultimo = contador, acumulado[crianca_id]
+                anterior = posicao_anterior.get(crianca_id)
+                fotos[(semana_id, crianca_id)] = (
+                    da_semana.get(crianca_id, 0.0),
+                    acumulado[crianca_id],
+                    posicao,
+                    None if anterior is None else anterior - posicao,
+                )
+                posicao_anterior[crianca_id] = posicao
+        return fotos
+
+    def atualizar(self, temporada=None, desde=None):
+        """
+        Recalcula as fotos da temporada (id; None = todas as não arquivadas) e
+        grava só o que mudou, nas semanas de número >= `desde` (todas, se None).
+        Retorna {"inseridas", "atualizadas", "removidas"}.
+        """
+        if temporada is None:
+            contagem = Counter()
+            for temporada_id in Temporada.objects.filter(arquivada_em__isnull=True).values_list("id", flat=True):
+                contagem.update(self.atualizar(temporada_id, desde))
+            return {chave: contagem[chave] for chave in ("inseridas", "atualizadas", "removidas")}
+
+        fotos = self.calcular(temporada)
+        semanas = Semana.objects.filter(temporada_id=temporada)
+        if desde is not None:
+            semanas = semanas.filter(numero__gte=desde)
+        semanas_ids = set(semanas.values_list("id", flat=True))
+
+        existentes = {
+            (semana_id, crianca_id): (foto_id, valores)
+            for foto_id, semana_id, crianca_id, *valores in self.filter(semana_id__in=semanas_ids).values_list(
+                "id", "semana_id", "crianca_id", *CAMPOS_HISTORICO
+            )
+        }
+        inserir, atualizar = [], []
+        for (semana_id, crianca_id), valores in fotos.items():
+            if semana_id not in semanas_ids:
+                continue
+            campos = dict(zip(CAMPOS_HISTORICO, valores))
+            atual = existentes.pop((semana_id, crianca_id), None)
+            if atual is None:
+                inserir.append(HistoricoRanking(semana_id=semana_id, crianca_id=crianca_id, **campos))
+            elif tuple(atual[1]) != valores:
+                atualizar.append(HistoricoRanking(semana_id=semana_id, crianca_id=crianca_id, **campos))
+        remover = [foto_id for foto_id, _ in existentes.values()]
+
+        # Uma mudança no topo desloca a posição de muita gente: bulk_update (CASE WHEN
+        # por linha) ficava lento; o upsert pela chave única grava tudo de uma vez
+        upsert_em_massa(
+            HistoricoRanking, inserir + atualizar,
+            unique_fields=["crianca", "semana"], update_fields=CAMPOS_HISTORICO,
+        )
+        for lote in em_lotes(remover):
+            self.filter(id__in=lote).delete()
+        return {"inseridas": len(inserir), "atualizadas": len(atualizar), "removidas": len(remover)}
+
+
+CAMPOS_HISTORICO = ["total_semana", "acumulado", "posicao", "variacao"]
+
+
+class HistoricoRanking(models.Model):
+    """
+    Foto do ranking ao fim de cada semana (mantida por HistoricoManager), para
+    responder "ranking na semana N" e "quem mais subiu" sem reagregar Resultados.
+    """
+    # Sem índice próprio nas FKs: são prefixo dos índices abaixo
+    semana = models.ForeignKey(Semana, on_delete=models.CASCADE, related_name="historico", db_index=False)
+    crianca = models.ForeignKey(Crianca, on_delete=models.CASCADE, related_name="historico", db_index=False)
+    total_semana = models.FloatField(default=0.0)
+    acumulado = models.FloatField(default=0.0)
+    posicao = models.PositiveIntegerField()
+    # Posições ganhas desde a semana anterior (negativo = caiu); vazio na 1ª semana
+    variacao = models.IntegerField(null=True, blank=True)
+
+    objects = HistoricoManager()
+
+    class Meta:
+        constraints = [
+            # Também serve a evolução de uma criança semana a semana
+            models.UniqueConstraint(fields=["crianca", "semana"], name="historico_unico"),
+        ]
+        indexes = [
+            models.Index(fields=["semana", "posicao"], name="historico_semana_posicao_idx"),
+            models.Index(fields=["semana", "-variacao"], name="historico_semana_variacao_idx"),
+            models.Index(fields=["semana", "-total_semana"], name="historico_semana_total_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.crianca} - Semana {self.semana_id}: {self.posicao}º ({self.acumulado} pts)"
+
+
+class ResumoTemporada(models.Model):
+    """
+    O que sobra de uma temporada arquivada: a classificação final de cada
+    criança, sem os Resultados, semanas e placares (ver temporadas.arquivar).
+    """
+    temporada = models.ForeignKey(Temporada, on_delete=models.CASCADE, related_name="resumo", db_index=False)
+    nome = models.CharField(max_length=100)
+    turma = models.CharField(max_length=50, blank=True)
+    idade = models.PositiveSmallIntegerField(default=0)
+    total = models.FloatField(default=0.0)
+    posicao = models.PositiveIntegerField()
+    semanas = models.PositiveSmallIntegerField(default=0, help_text="Semanas em que a criança pontuou.")
+
+    class Meta:
+        verbose_name = "resumo de temporada"
+        verbose_name_plural = "resumos de temporada"
+        indexes = [models.Index(fields=["temporada", "-total", "nome"], name="resumo_temporada_total_idx")]
+
+    def __str__(self):
+        return f"{self.temporada} - {self.posicao}º {self.nome} ({self.total} pts)"
+
+
+# Enviado depois do commit de cada VersaoDados.incrementar() (ex.: publicação estática do ranking)
+dados_alterados = Signal()
+
+
+class VersaoDadosManager(models.Manager):
+    def atual(self):
+        """Retorna a linha única de versão (criando-a se ainda não existir)."""
+        versao, _ = self.get_or_create(pk=1)
+        return versao
+
+    def incrementar(self):
+        """Marca que os dados do ranking mudaram (update atômico no banco)."""
+        atualizadas = self.filter(pk=1).update(versao=F("versao") + 1, atualizado_em=timezone.now())
+        if not atualizadas:
+            self.get_or_create(pk=1)
+        transaction.on_commit(lambda: dados_alterados.send(sender=VersaoDados))
+
+
+class VersaoDados(models.Model):
+    """
+    Contador único incrementado a cada alteração que afeta o ranking
+    (importação, edições no admin). Serve de chave para o cache do ranking.
+    """
+    versao = models.PositiveBigIntegerField(default=1)
+    atualizado_em = models.DateTimeField(default=timezone.now)
+
+    objects = VersaoDadosManager()
+
+    def __str__(self):
+        return f"Versão {self.versao} ({self.atualizado_em:%d/%m/%Y %H:%M:%S})"
+
+
+class ImportacaoJob(models.Model):
+    """
+    Importação de planilha executada em segundo plano (ver fila_importacao).
+    Também serve de histórico das importações.
+    """
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDA = "concluida"
+    ERRO = "erro"
+    STATUS_CHOICES = [
+        (PENDENTE, "Pendente"),
+        (EXECUTANDO, "Executando"),
+        (CONCLUIDA, "Concluída"),
+        (ERRO, "Erro"),
+    ]
+
+    arquivo = models.FileField(upload_to="importacoes/", blank=True)
+    temporada = models.ForeignKey(
+        Temporada, on_delete=models.SET_NULL, null=True, blank=True, related_name="importacoes",
+        help_text="Temporada que recebe os resultados (a ativa quando o arquivo foi enviado).",
+    )
+    nome_arquivo = models.CharField(max_length=255)
+    semanas = models.JSONField(default=list, help_text="Números das semanas presentes no arquivo.")
+    diferencial = models.BooleanField(
+        default=False, help_text="Grava só as células que mudaram em relação ao banco."
+    )
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=PENDENTE, db_index=True)
+    linhas_lidas = models.PositiveIntegerField(default=0)
+    resultados_gravados = models.PositiveIntegerField(default=0)
+    celulas_invalidas = models.PositiveIntegerField(default=0)
+    erro = models.TextField(blank=True)
+    resumo = models.JSONField(null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-criado_em"]
+        verbose_name = "importação"
+        verbose_name_plural = "importações"
+
+    def __str__(self):
+        return f"Importação #{self.pk} ({self.nome_arquivo}) - {self.get_status_display()}"
+
+    @property
+    def finalizado(self):
+        return self.status in (self.CONCLUIDA, self.ERRO)
+
+
+class TravaSemanaImportacao(models.Model):
+    """
+    Semana reservada por uma importação em execução. A unicidade de
+    (temporada, número da semana) impede, em qualquer processo, duas
+    importações simultâneas com semanas em comum na mesma temporada.
+    """
+    temporada = models.ForeignKey(Temporada, on_delete=models.CASCADE, related_name="+")
+    semana_numero = models.IntegerField()
+    job = models.ForeignKey(ImportacaoJob, on_delete=models.CASCADE, related_name="travas")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["temporada", "semana_numero"], name="trava_semana_por_temporada"),
+        ]
+
+    def __str__(self):
+        return f"Semana {self.semana_numero} reservada pela importação #{self.job_id}"
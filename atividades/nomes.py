@@ -0,0 +1,170 @@
+"""
+Nomes parecidos e mesclagem de crianças duplicadas.
+
+A importação já encontra a criança pelo nome normalizado (sem acentos, caixa
+ou espaços a mais: models.normalizar_nome). O que sobra são erros de
+digitação ("Ana Clara" x "Ana Cllara"), sugeridos aqui por similaridade de
+trigramas (coeficiente de Dice) sobre um índice em memória: cada trigrama
+aponta para as crianças que o têm, e só as que dividem um dos trigramas mais
+raros do nome consultado chegam a ser comparadas. Quem decide mesclar é uma
+pessoa (comando mesclar_criancas).
+"""
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .banco import upsert_em_massa
+from .models import Crianca, Resultado, PlacarCrianca, HistoricoRanking, VersaoDados, em_lotes
+
+
+def _minimo_padrao():
+    return getattr(settings, "NOMES_SIMILARIDADE_MINIMA", 0.7)
+
+
+def trigramas(chave):
+    """Trigramas do nome normalizado, com bordas marcadas ("  ana " -> "  a", " an", ...)."""
+    texto = f"  {chave} "
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+class IndiceNomes:
+    """Índice invertido trigrama -> ids de criança, montado uma vez por consulta em lote."""
+
+    def __init__(self, criancas=()):
+        self.nomes = {}
+        self.chaves = {}
+        self.trigramas = {}
+        self.por_trigrama = defaultdict(set)
+        for crianca_id, nome, chave in criancas:
+            self.adicionar(crianca_id, nome, chave)
+
+    @classmethod
+    def do_banco(cls, temporada=None):
+        """Índice das crianças da temporada (id; None = a ativa)."""
+        qs = Crianca.objects.filter(temporada__ativa=True) if temporada is None else Crianca.objects.filter(
+            temporada_id=temporada
+        )
+        return cls(qs.values_list("id", "nome", "nome_normalizado").iterator(chunk_size=2000))
+
+    def adicionar(self, crianca_id, nome, chave):
+        self.nomes[crianca_id] = nome
+        self.chaves[crianca_id] = chave
+        self.trigramas[crianca_id] = trigramas(chave)
+        for trigrama in self.trigramas[crianca_id]:
+            self.por_trigrama[trigrama].add(crianca_id)
+
+    def semelhantes(self, chave, minimo=None, ignorar=(), limite=5):
+        """
+        [(similaridade, id, nome)] das crianças com Dice >= `minimo`, da mais
+        parecida para a menos, sem as de `ignorar`.
+        """
+        minimo = _minimo_padrao() if minimo is None else minimo
+        consulta = trigramas(chave)
+        # Dice >= t exige ao menos t*|A|/(2-t) trigramas em comum; quem não tem
+        # nenhum dos |A| - necessarios + 1 mais raros não pode chegar lá.
+        necessarios = max(1, math.ceil(minimo * len(consulta) / (2 - minimo)))
+        raros = sorted(consulta, key=lambda t: len(self.por_trigrama.get(t, ())))
+        candidatos = set()
+        for trigrama in raros[:len(consulta) - necessarios + 1]:
+            candidatos.update(self.por_trigrama.get(trigrama, ()))
+
+        achados = []
+        for crianca_id in candidatos - set(ignorar):
+            outros = self.trigramas[crianca_id]
+            valor = 2 * len(consulta & outros) / (len(consulta) + len(outros))
+            if valor >= minimo:
+                achados.append((round(valor, 3), crianca_id, self.nomes[crianca_id]))
+        achados.sort(key=lambda achado: (-achado[0], achado[1]))
+        return achados[:limite]
+
+
+def sugerir(crianca_ids=None, minimo=None, limite=5, temporada=None):
+    """
+    Para cada criança de `crianca_ids` (todas, se None) com nomes parecidos na
+    mesma temporada (id; None = a ativa):
+    [{"id", "nome", "parecidos": [{"id", "nome", "similaridade"}]}].
+    """
+    indice = IndiceNomes.do_banco(temporada)
+    sugestoes = []
+    for crianca_id in sorted(indice.nomes if crianca_ids is None else crianca_ids):
+        if crianca_id not in indice.nomes:
+            continue
+        parecidos = indice.semelhantes(indice.chaves[crianca_id], minimo, ignorar={crianca_id}, limite=limite)
+        if parecidos:
+            sugestoes.append({
+                "id": crianca_id,
+                "nome": indice.nomes[crianca_id],
+                "parecidos": [{"id": i, "nome": nome, "similaridade": valor} for valor, i, nome in parecidos],
+            })
+    return sugestoes
+
+
+@transaction.atomic
+def mesclar(destino_id, origem_ids):
+    """
+    Passa os Resultados das crianças `origem_ids` (da mesma temporada) para
+    `destino_id` e apaga as origens. Onde mais de uma tem a mesma (semana,
+    atividade), quantidades e pontos são somados numa linha só. Turma e idade
+    vazias no destino são preenchidas com as da primeira origem que as tiver.
+    Retorna {"movidos", "somados", "removidas"}. Levanta ValueError.
+    """
+    origem_ids = sorted(set(origem_ids) - {destino_id})
+    if not origem_ids:
+        raise ValueError("Informe ao menos uma criança diferente do destino para mesclar.")
+    destino = Crianca.objects.select_for_update().filter(pk=destino_id).first()
+    origens = list(Crianca.objects.filter(pk__in=origem_ids).order_by("pk"))
+    faltando = sorted(set(origem_ids) - {c.pk for c in origens}) + ([] if destino else [destino_id])
+    if faltando:
+        raise ValueError(f"Criança(s) inexistente(s): {', '.join(map(str, faltando))}.")
+    outras = [c.pk for c in origens if c.temporada_id != destino.temporada_id]
+    if outras:
+        raise ValueError(f"Criança(s) de outra temporada: {', '.join(map(str, outras))}.")
+
+    do_destino = {
+        (semana_id, atividade_id): (quantidade, pontos)
+        for semana_id, atividade_id, quantidade, pontos in Resultado.objects.filter(crianca_id=destino_id)
+        .values_list("semana_id", "atividade_id", "quantidade", "pontos")
+    }
+    por_chave = defaultdict(list)
+    for lote in em_lotes(origem_ids):
+        for resultado_id, semana_id, atividade_id, quantidade, pontos in Resultado.objects.filter(
+            crianca_id__in=lote
+        ).values_list("id", "semana_id", "atividade_id", "quantidade", "pontos"):
+            por_chave[(semana_id, atividade_id)].append((resultado_id, quantidade, pontos))
+
+    # Chave só numa origem: a linha muda de dono (UPDATE). Em conflito, soma no
+    # destino; as linhas das origens vão embora junto com elas (CASCADE).
+    mover, somar = [], []
+    for (semana_id, atividade_id), linhas in por_chave.items():
+        if len(linhas) == 1 and (semana_id, atividade_id) not in do_destino:
+            mover.append(linhas[0][0])
+        else:
+            quantidade, pontos = do_destino.get((semana_id, atividade_id), (0, 0.0))
+            somar.append(Resultado(
+                crianca_id=destino_id, semana_id=semana_id, atividade_id=atividade_id,
+                quantidade=quantidade + sum(q for _, q, _ in linhas),
+                pontos=pontos + sum(p for _, _, p in linhas),
+            ))
+    for lote in em_lotes(mover):
+        Resultado.objects.filter(id__in=lote).update(crianca_id=destino_id)
+    upsert_em_massa(
+        Resultado, somar, unique_fields=["crianca", "semana", "atividade"],
+        update_fields=["quantidade", "pontos"],
+    )
+
+    completar = {}
+    if not destino.turma:
+        completar["turma"] = next((c.turma for c in origens if c.turma), "")
+    if not destino.idade:
+        completar["idade"] = next((c.idade for c in origens if c.idade), 0)
+    if completar:
+        Crianca.objects.filter(pk=destino_id).update(**completar)
+
+    # delete() em massa não passa por Crianca.delete: placar e histórico são refeitos uma vez só
+    Crianca.objects.filter(pk__in=origem_ids).delete()
+    PlacarCrianca.objects.recalcular([destino_id], historico=False)
+    HistoricoRanking.objects.atualizar(destino.temporada_id)
+    VersaoDados.objects.incrementar()
+    return {"movidos": len(mover), "somados": len(somar), "removidas": len(origens)}
@@ -0,0 +1,150 @@
+"""
+Publicação do ranking em arquivos estáticos, servidos pelo nginx sem passar
+pelo Django.
+
+A cada mudança nos dados (VersaoDados.incrementar, depois do commit) os quadros
+(geral, faixas e turmas) são renderizados com o mesmo ranking.html das views e
+gravados em PUBLICACAO_DIR no caminho da própria URL, mais um .json por quadro:
+
+    ranking/index.html          /ranking/
+    ranking/ate4/index.html     /ranking/ate4/  (e /ranking/ate-4/, endereço antigo)
+    ranking/ate4.json           /ranking/ate4.json
+    ranking/versao.json         versão publicada e quadros existentes
+
+Cada arquivo é gravado num temporário e trocado com os.replace, então o nginx
+nunca lê um arquivo pela metade. Sem PUBLICACAO_DIR nada é publicado; as views
+dinâmicas continuam respondendo tudo (e o que o nginx não achar no disco).
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache_ranking import chave_versao, quadros_em_cache
+from .models import VersaoDados
+
+logger = logging.getLogger(__name__)
+
+# Endereços a mais de alguns quadros, além de /ranking/<chave>/
+ROTAS_EXTRAS = {"geral": ["ranking"], "ate4": ["ranking_ate4"], "5mais": ["ranking_5mais"]}
+
+_evento = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def _destino():
+    return getattr(settings, "PUBLICACAO_DIR", "")
+
+
+def dados_quadro(faixa, quadro, versao):
+    """Conteúdo do .json de um quadro (o mesmo da view ranking_json)."""
+    return {"faixa": faixa, "nome": quadro["nome"], "versao": versao, "ranking": quadro["ranking"]}
+
+
+def _arquivos_html(faixa):
+    urls = [reverse("ranking_faixa", args=[faixa])]
+    urls += [reverse(nome) for nome in ROTAS_EXTRAS.get(faixa, [])]
+    return [Path(url.strip("/")) / "index.html" for url in urls]
+
+
+def _arquivo_json(faixa):
+    return Path(reverse("ranking_json", args=[faixa]).lstrip("/"))
+
+
+def _gravar(caminho, conteudo):
+    """Grava `conteudo` em `caminho` de forma atômica (temporário + os.replace)."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=caminho.parent, prefix=".publicando-")
+    try:
+        with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+        os.chmod(temporario, 0o644)  # mkstemp cria com 0600; o nginx roda com outro usuário
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+def _ler_indice(caminho):
+    try:
+        return json.loads(caminho.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def publicar(destino=None, forcar=False):
+    """
+    Renderiza todos os quadros da versão atual dos dados em `destino`
+    (PUBLICACAO_DIR) e apaga os de quadros que deixaram de existir.
+    Retorna a chave da versão publicada, ou None se ela já estava publicada.
+    """
+    raiz = Path(destino or _destino())
+    versao = VersaoDados.objects.atual()
+    chave = chave_versao(versao)
+    indice = raiz / "ranking" / "versao.json"
+    anterior = _ler_indice(indice)
+    if not forcar and anterior.get("versao") == chave:
+        return None
+
+    quadros = quadros_em_cache(versao)
+    for faixa, quadro in quadros.items():
+        html = render_to_string("ranking.html", {
+            "ranking": quadro["ranking"], "faixa": quadro["nome"], "ao_vivo": None,
+        })
+        for arquivo in _arquivos_html(faixa):
+            _gravar(raiz / arquivo, html)
+        _gravar(raiz / _arquivo_json(faixa), json.dumps(dados_quadro(faixa, quadro, chave), ensure_ascii=False))
+
+    # Turma que sumiu: sem o arquivo, o nginx repassa ao Django, que responde 404
+    for faixa in set(anterior.get("quadros", [])) - set(quadros):
+        for arquivo in _arquivos_html(faixa) + [_arquivo_json(faixa)]:
+            (raiz / arquivo).unlink(missing_ok=True)
+
+    _gravar(indice, json.dumps({
+        "versao": chave, "quadros": list(quadros), "publicado_em": timezone.now().isoformat(),
+    }))
+    return chave
+
+
+def agendar_publicacao(**kwargs):
+    """
+    Receiver de dados_alterados: publica de novo se PUBLICACAO_DIR estiver
+    definido, numa thread própria ("thread", padrão) ou na hora ("nao").
+    Várias mudanças seguidas viram uma publicação só da versão mais recente.
+    """
+    if not _destino():
+        return
+    if getattr(settings, "PUBLICACAO_EM_SEGUNDO_PLANO", "thread") == "nao":
+        publicar()
+        return
+    _garantir_thread()
+    _evento.set()
+
+
+def _garantir_thread():
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop_thread, name="publicacao", daemon=True)
+            _thread.start()
+
+
+def _loop_thread():
+    while True:
+        _evento.wait()
+        _evento.clear()
+        try:
+            publicar()
+        except Exception:
+            logger.exception("Falha ao publicar o ranking estático")
+        finally:
+            close_old_connections()
@@ -0,0 +1,161 @@
+"""
+Motor de ranking compartilhado pelas telas de ranking.
+
+Busca apenas tuplas (id, nome, idade, total) e atribui posição e medalha em
+uma única passada sobre as linhas já ordenadas por total decrescente.
+
+Os quadros por faixa etária (setting RANKING_FAIXAS) e por turma saem da mesma
+query e da mesma passada (montar_quadros): cada linha alimenta o Classificador
+de cada quadro a que pertence.
+
+Sem um QS explícito, o ranking é o da temporada ativa (filtro por JOIN na
+própria query: o custo não cresce com as temporadas passadas).
+"""
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .models import Crianca
+
+MEDALHAS = ("ouro", "prata", "bronze")
+
+CAMPOS_RANKING = ("id", "nome", "idade", "total")
+
+PREFIXO_TURMA = "turma-"
+
+
+def linhas_ranking(qs=None, campos=CAMPOS_RANKING, total=None):
+    """
+    Tuplas (id, nome, idade, total, ...) ordenadas por total decrescente e nome.
+    O total vem do placar desnormalizado (crianças sem placar contam como 0),
+    ou da expressão `total` (ex.: o placar de uma semana só).
+    """
+    if qs is None:
+        qs = Crianca.objects.filter(temporada__ativa=True)
+    return (
+        qs.annotate(total=Coalesce(total if total is not None else F("placar__total"), Value(0.0)))
+        .order_by("-total", "nome")
+        .values_list(*campos)
+    )
+
+
+class Classificador:
+    """
+    Classifica linhas já ordenadas, uma por vez.
+
+    - posição: empates dividem a posição e a seguinte pula (1, 1, 3).
+    - medalha: pelos 3 maiores totais distintos (> 0), em ranking denso,
+      ou seja, todos os empatados no 1º total levam ouro, e assim por diante.
+    """
+
+    def __init__(self):
+        self.contador = 0
+        self.posicao = 0
+        self.ultimo_total = None
+        self.totais_distintos = 0
+
+    def classificar(self, linha):
+        crianca_id, nome, idade, total = linha
+        self.contador += 1
+        if total != self.ultimo_total:
+            self.posicao = self.contador
+            self.ultimo_total = total
+            if total > 0:
+                self.totais_distintos += 1
+
+        medalha = None
+        if total > 0 and self.totais_distintos <= len(MEDALHAS):
+            medalha = MEDALHAS[self.totais_distintos - 1]
+
+        return {
+            "id": crianca_id,
+            "posicao": self.posicao,
+            "nome": nome,  # o template já usa |upper quando renderiza
+            "idade": idade,
+            "total": total,
+            "medalha": medalha,
+        }
+
+
+def iterar_ranking(linhas):
+    """Gera os itens do ranking sob demanda (não materializa a lista)."""
+    classificador = Classificador()
+    for linha in linhas:
+        yield classificador.classificar(linha)
+
+
+def montar_ranking(qs=None):
+    """
+    Lista de itens (id, posicao, nome, idade, total, medalha) a partir de um QS
+    de Crianca. Executa exatamente uma query.
+    """
+    return list(iterar_ranking(linhas_ranking(qs)))
+
+
+def faixas_configuradas():
+    """
+    {chave: {"nome", "idade_min", "idade_max"}} do setting RANKING_FAIXAS
+    (limites inclusivos; um limite ausente deixa a faixa aberta).
+    """
+    return getattr(settings, "RANKING_FAIXAS", {})
+
+
+def na_faixa(faixa, idade):
+    minimo, maximo = faixa.get("idade_min"), faixa.get("idade_max")
+    return (minimo is None or idade >= minimo) and (maximo is None or idade <= maximo)
+
+
+def chave_turma(turma):
+    return PREFIXO_TURMA + slugify(turma)
+
+
+def montar_quadros(qs=None, linhas=None):
+    """
+    Todos os quadros de uma vez: "geral", cada faixa de RANKING_FAIXAS e, com
+    RANKING_POR_TURMA, cada turma ("turma-<slug>"). Uma query e uma passada:
+    montar todos custa bem menos que montar cada quadro separadamente.
+    `linhas` substitui a query: tuplas (id, nome, idade, total, turma) já
+    ordenadas (ex.: o resumo de uma temporada arquivada).
+    Retorna {chave: {"nome": rótulo ou None, "ranking": [itens]}}.
+    """
+    faixas = faixas_configuradas()
+    por_turma = getattr(settings, "RANKING_POR_TURMA", True)
+
+    quadros = {"geral": {"nome": None, "ranking": []}}
+    quadros.update({chave: {"nome": faixa["nome"], "ranking": []} for chave, faixa in faixas.items()})
+
+    def destino(chave):
+        # (append da lista, classificar) do quadro, para o laço não refazer as buscas
+        return quadros[chave]["ranking"].append, Classificador().classificar
+
+    destinos = {chave: destino(chave) for chave in quadros}
+    # Destinos de cada idade/turma calculados uma vez só, não a cada linha
+    por_idade = {}
+    por_turma_nome = {}
+    if linhas is None:
+        linhas = linhas_ranking(qs, CAMPOS_RANKING + ("turma",))
+    for linha in linhas:
+        idade, turma = linha[2], linha[4]
+        alvos = por_idade.get(idade)
+        if alvos is None:
+            alvos = por_idade[idade] = (destinos["geral"],) + tuple(
+                destinos[chave] for chave, faixa in faixas.items() if na_faixa(faixa, idade)
+            )
+        if por_turma and turma:
+            alvo = por_turma_nome.get(turma)
+            if alvo is None:
+                chave = chave_turma(turma)
+                if chave not in destinos:  # "Turma A" e "turma a" caem no mesmo quadro
+                    quadros[chave] = {"nome": f"Turma {turma}", "ranking": []}
+                    destinos[chave] = destino(chave)
+                alvo = por_turma_nome[turma] = destinos[chave]
+            alvos += (alvo,)
+        dados = linha[:4]
+        for adicionar, classificar in alvos:
+            adicionar(classificar(dados))
+
+    # Turmas em ordem alfabética, depois do geral e das faixas
+    fixos = 1 + len(faixas)
+    ordem = list(quadros)[:fixos] + sorted(list(quadros)[fixos:], key=lambda chave: quadros[chave]["nome"])
+    return {chave: quadros[chave] for chave in ordem}
@@ -0,0 +1,85 @@
+"""
+Temporadas (edições da gincana): ranking de uma temporada e arquivamento.
+
+O dia a dia só olha a temporada ativa: ranking, importação e lançamentos
+filtram por ela (índice da FK temporada em Crianca e Semana). Uma temporada
+encerrada continua consultável em /temporadas/<slug>/ enquanto não for
+arquivada; arquivar guarda a classificação final em ResumoTemporada (uma linha
+por criança) e apaga Resultados, placares, histórico, crianças e semanas dela,
+para as tabelas quentes terem só a temporada em andamento.
+"""
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import (
+    Crianca, Semana, Resultado, PlacarCrianca, PlacarSemanal, HistoricoRanking, ResumoTemporada, Temporada,
+    VersaoDados,
+)
+from .ranking import CAMPOS_RANKING, Classificador, linhas_ranking, montar_quadros
+
+LOTE_RESUMO = 2000
+
+
+def linhas_resumo(temporada):
+    """Tuplas (id, nome, idade, total, turma) do resumo de uma temporada arquivada, em ordem de ranking."""
+    return (
+        ResumoTemporada.objects.filter(temporada=temporada)
+        .order_by("-total", "nome")
+        .values_list(*CAMPOS_RANKING, "turma")
+    )
+
+
+def montar_quadros_temporada(temporada):
+    """Quadros (como montar_quadros) de qualquer temporada, arquivada ou não."""
+    if temporada.arquivada:
+        return montar_quadros(linhas=linhas_resumo(temporada))
+    return montar_quadros(Crianca.objects.filter(temporada=temporada))
+
+
+@transaction.atomic
+def arquivar(temporada):
+    """
+    Guarda a classificação final da temporada em ResumoTemporada e tira os
+    dados dela das tabelas do dia a dia. A temporada ativa não pode ser
+    arquivada. Retorna {"criancas", "resultados", "semanas"} (linhas removidas).
+    Levanta ValueError.
+    """
+    temporada = Temporada.objects.select_for_update().get(pk=temporada.pk)
+    if temporada.ativa:
+        raise ValueError(f"{temporada} é a temporada ativa; ative outra antes de arquivar.")
+    if temporada.arquivada:
+        raise ValueError(f"{temporada} já foi arquivada.")
+
+    semanas_pontuadas = dict(
+        PlacarSemanal.objects.filter(crianca__temporada=temporada, total__gt=0)
+        .values("crianca_id").annotate(semanas=Count("id")).order_by()
+        .values_list("crianca_id", "semanas")
+    )
+    classificador = Classificador()
+    resumo = []
+    for crianca_id, nome, idade, total, turma in linhas_ranking(
+        Crianca.objects.filter(temporada=temporada), CAMPOS_RANKING + ("turma",)
+    ).iterator(chunk_size=LOTE_RESUMO):
+        item = classificador.classificar((crianca_id, nome, idade, total))
+        resumo.append(ResumoTemporada(
+            temporada=temporada, nome=nome, turma=turma, idade=idade, total=total,
+            posicao=item["posicao"], semanas=semanas_pontuadas.get(crianca_id, 0),
+        ))
+        if len(resumo) == LOTE_RESUMO:
+            ResumoTemporada.objects.bulk_create(resumo)
+            resumo = []
+    ResumoTemporada.objects.bulk_create(resumo)
+
+    # Primeiro as tabelas filhas, com DELETE por subquery (sem carregar as linhas)
+    resultados = Resultado.objects.filter(semana__temporada=temporada).delete()[0]
+    resultados += Resultado.objects.filter(crianca__temporada=temporada).delete()[0]
+    HistoricoRanking.objects.filter(semana__temporada=temporada).delete()
+    PlacarSemanal.objects.filter(crianca__temporada=temporada).delete()
+    PlacarCrianca.objects.filter(crianca__temporada=temporada).delete()
+    criancas = Crianca.objects.filter(temporada=temporada).delete()[1].get(Crianca._meta.label, 0)
+    semanas = Semana.objects.filter(temporada=temporada).delete()[1].get(Semana._meta.label, 0)
+
+    Temporada.objects.filter(pk=temporada.pk).update(arquivada_em=timezone.now())
+    VersaoDados.objects.incrementar()
+    return {"criancas": criancas, "resultados": resultados, "semanas": semanas}
@@ -1,3 +1,1116 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import json
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+import pandas as pd
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import caches
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, FloatField, Sum
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from gincana.servidor import CPUS, perfil
+
+from .banco import pragmas_atuais, upsert_em_massa
+from .benchmark import ContadorQueries, carga_http, comparar, concorrencia, executar_suite, gerar_planilha
+from .import_planilha import importar_planilha
+from . import fila_importacao
+from .models import (
+    Crianca, Semana, Atividade, Resultado, PlacarCrianca, PlacarSemanal, ImportacaoJob, HistoricoRanking,
+    ResumoTemporada, Temporada, TravaSemanaImportacao, VersaoDados,
+)
+from .ranking import iterar_ranking, montar_quadros, montar_ranking
+from .cache_ranking import estatisticas
+from .metricas import registro
+from .ao_vivo import diff_ranking
+from .publicacao import publicar
+from .nomes import IndiceNomes
+from .temporadas import arquivar
+
+
+def planilha_xlsx(linhas, semanas=(1, 2), nome="planilha.xlsx"):
+    """Monta um .xlsx em memória no formato esperado pela importação."""
+    colunas = ["Nome"] + [f"{n}ªSemana" for n in semanas]
+    df = pd.DataFrame(linhas, columns=colunas)
+    bio = io.BytesIO()
+    df.to_excel(bio, index=False)
+    return SimpleUploadedFile(nome, bio.getvalue())
+
+
+class PlacarTests(TestCase):
+    def setUp(self):
+        self.ana = Crianca.objects.create(nome="Ana", idade=4)
+        self.bia = Crianca.objects.create(nome="Bia", idade=6)
+        self.semana = Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+        self.atividade = Atividade.objects.create(nome="Versículo", pontos=2.5)
+
+    def total(self, crianca):
+        return PlacarCrianca.objects.get(crianca=crianca).total
+
+    def test_save_e_delete_de_resultado_atualizam_placar(self):
+        r = Resultado.objects.create(
+            crianca=self.ana, semana=self.semana, atividade=self.atividade, quantidade=2
+        )
+        self.assertEqual(self.total(self.ana), 5.0)
+        self.assertEqual(PlacarSemanal.objects.get(crianca=self.ana, semana=self.semana).total, 5.0)
+
+        r.crianca = self.bia
+        r.save()
+        self.assertEqual(self.total(self.ana), 0.0)
+        self.assertEqual(self.total(self.bia), 5.0)
+
+        r.delete()
+        self.assertEqual(self.total(self.bia), 0.0)
+        self.assertFalse(PlacarSemanal.objects.exists())
+
+    def test_mudar_pontos_da_atividade_atualiza_placar(self):
+        Resultado.objects.create(crianca=self.ana, semana=self.semana, atividade=self.atividade)
+        self.atividade.pontos = 10
+        self.atividade.save()
+        self.assertEqual(self.total(self.ana), 10.0)
+
+    def test_importacao_atualiza_placar_e_comando_verifica(self):
+        importar_planilha(planilha_xlsx([["Ana", "1,5", 3], ["Bia", None, "2"]]))
+        self.assertEqual(self.total(self.ana), 4.5)
+        self.assertEqual(self.total(self.bia), 2.0)
+        call_command("recalcular_placar", "--verificar", stdout=io.StringIO())
+
+        PlacarCrianca.objects.filter(crianca=self.ana).update(total=0)
+        with self.assertRaises(CommandError):
+            call_command("recalcular_placar", "--verificar", stdout=io.StringIO())
+        call_command("recalcular_placar", stdout=io.StringIO())
+        self.assertEqual(self.total(self.ana), 4.5)
+
+
+class ImportacaoTests(TestCase):
+    def test_converte_decimais_br_e_ignora_vazios(self):
+        planilha = planilha_xlsx(
+            [["Ana", "1,5", "-"], ["Bia", "abc", 0], ["  Caio ", 2, "10"], [None, 5, 5]]
+        )
+        resumo = importar_planilha(planilha)
+        self.assertEqual(resumo["criancas_criadas_ou_encontradas"], 3)
+        self.assertEqual(resumo["resultados_criados"], 3)
+        totais = dict(PlacarCrianca.objects.values_list("crianca__nome", "total"))
+        self.assertEqual(totais, {"Ana": 1.5, "Bia": 0.0, "Caio": 12.0})
+        # Nenhuma atividade por nota: todas vão para a "Nota", com os pontos no Resultado
+        self.assertEqual(list(Atividade.objects.values_list("nome", "pontuacao_livre")), [("Nota", True)])
+        self.assertEqual(
+            sorted(Resultado.objects.values_list("crianca__nome", "semana__numero", "quantidade", "pontos")),
+            [("Ana", 1, 1, 1.5), ("Caio", 1, 1, 2.0), ("Caio", 2, 1, 10.0)],
+        )
+
+    def test_reimportacao_substitui_resultados_das_semanas_do_arquivo(self):
+        importar_planilha(planilha_xlsx([["Ana", 1, 2]]))
+        importar_planilha(planilha_xlsx([["Ana", 3]], semanas=(2,)))
+        self.assertEqual(
+            sorted(Resultado.objects.values_list("semana__numero", "pontos")),
+            [(1, 1.0), (2, 3.0)],
+        )
+
+    @override_settings(IMPORTACAO_LOTE_LINHAS=2)
+    def test_streaming_xlsx_em_lotes_equivale_ao_pandas(self):
+        linhas = [["Ana", "1,5", 2], ["Bia", None, "3"], ["Caio", 4, "-"], ["Ana", 1, None]]
+        importar_planilha(planilha_xlsx(linhas), streaming=False)
+        esperado = sorted(Resultado.objects.values_list("crianca__nome", "semana__numero", "pontos"))
+
+        resumo = importar_planilha(planilha_xlsx(linhas), streaming=True)
+        self.assertEqual(resumo["modo"], "streaming")
+        self.assertEqual(resumo["criancas_criadas_ou_encontradas"], 3)
+        self.assertEqual(
+            sorted(Resultado.objects.values_list("crianca__nome", "semana__numero", "pontos")),
+            esperado,
+        )
+
+    def test_importa_csv_com_ponto_e_virgula(self):
+        conteudo = "Nome;1ªSemana;2ª Semana;TOTAL\nAna;1,5;2;3,5\nBia;;4\n".encode("utf-8-sig")
+        resumo = importar_planilha(SimpleUploadedFile("notas.csv", conteudo))
+        self.assertEqual(resumo["resultados_criados"], 3)
+        self.assertEqual(
+            dict(PlacarCrianca.objects.values_list("crianca__nome", "total")), {"Ana": 3.5, "Bia": 4.0}
+        )
+
+    def test_numero_de_queries_nao_cresce_com_as_linhas(self):
+        def queries(n, semanas):
+            linhas = [[f"Criança {i}"] + [(i + s) % 7 + 1 for s in semanas] for i in range(n)]
+            with CaptureQueriesContext(connection) as ctx:
+                importar_planilha(planilha_xlsx(linhas, semanas=semanas))
+            return len(ctx.captured_queries)
+
+        # A atividade "Nota" já existe: as duas importações fazem o mesmo trabalho
+        Atividade.objects.nota()
+        poucas = queries(10, (1, 2))
+        muitas = queries(200, (3, 4))
+        # Só o nº de lotes dos bulk_create/bulk_update cresce (centenas de linhas por query)
+        self.assertLessEqual(muitas, poucas + 10)
+
+    @override_settings(IMPORTACAO_LOTE_LINHAS=2)
+    def test_resumo_traz_tempo_e_queries_por_etapa(self):
+        linhas = [["Ana", "1,5", 2], ["Bia", "x", "3"], ["Caio", 4, None]]
+        contador = ContadorQueries()
+        with connection.execute_wrapper(contador):
+            resumo = importar_planilha(planilha_xlsx(linhas), streaming=True)
+        etapas = {e["etapa"]: e for e in resumo["etapas"]}
+        self.assertEqual(list(etapas), [
+            "leitura", "cabecalho", "semanas", "normalizacao", "criancas", "atividades",
+            "comparacao", "gravacao", "remocao", "placar", "historico", "semelhantes",
+        ])
+        self.assertEqual(etapas["leitura"]["linhas"], 3)
+        self.assertEqual(etapas["normalizacao"]["celulas"], 5)  # preenchidas, válidas ou não
+        self.assertEqual(etapas["gravacao"]["linhas"], 4)
+        # Toda query da importação cai em alguma etapa, fora o SAVEPOINT/RELEASE da própria transação
+        self.assertEqual(sum(e["queries"] for e in resumo["etapas"]), contador.total - 2)
+        self.assertLessEqual(sum(e["segundos"] for e in resumo["etapas"]), resumo["duracao_s"])
+
+    def test_upsert_em_massa_atualiza_pela_chave_unica(self):
+        # COPY + ON CONFLICT no PostgreSQL, bulk_create(update_conflicts) no SQLite
+        hoje = date.today()
+        ana = Crianca.objects.create(nome="Ana", idade=4)
+        s1, s2 = Semana.objects.bulk_create(
+            [Semana(numero=n, data_inicio=hoje, data_fim=hoje, temporada=ana.temporada) for n in (1, 2)]
+        )
+        nota = Atividade.objects.create(nome="Nota 2", pontos=2)
+        Resultado.objects.bulk_create([Resultado(crianca=ana, semana=s1, atividade=nota)])
+        upsert_em_massa(
+            Resultado,
+            [Resultado(crianca=ana, semana=s1, atividade=nota, quantidade=3),
+             Resultado(crianca=ana, semana=s2, atividade=nota, quantidade=1)],
+            unique_fields=["crianca", "semana", "atividade"],
+            update_fields=["quantidade"],
+        )
+        self.assertEqual(
+            sorted(Resultado.objects.values_list("semana__numero", "quantidade")), [(1, 3), (2, 1)]
+        )
+
+    def test_diferencial_sem_mudancas_nao_grava_nada(self):
+        linhas = [["Ana", 1, "2,5"], ["Bia", 3, None]]
+        importar_planilha(planilha_xlsx(linhas))
+        with CaptureQueriesContext(connection) as ctx:
+            resumo = importar_planilha(planilha_xlsx(linhas), diferencial=True)
+        escritas = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].lstrip().split(" ", 1)[0] in ("INSERT", "UPDATE", "DELETE")
+        ]
+        self.assertEqual(escritas, [])
+        self.assertEqual(
+            resumo["alteracoes"], {"inseridos": 0, "atualizados": 0, "removidos": 0, "inalterados": 3}
+        )
+
+    def test_diferencial_grava_so_as_celulas_alteradas(self):
+        importar_planilha(planilha_xlsx([["Ana", 1, 2], ["Bia", 3, 4]]))
+        resumo = importar_planilha(
+            planilha_xlsx([["Ana", 1, 5], ["Bia", None, 4], ["Caio", 6, None]]), diferencial=True
+        )
+        self.assertEqual(
+            resumo["alteracoes"], {"inseridos": 1, "atualizados": 1, "removidos": 1, "inalterados": 2}
+        )
+        self.assertEqual(
+            dict(PlacarCrianca.objects.values_list("crianca__nome", "total")),
+            {"Ana": 6.0, "Bia": 4.0, "Caio": 6.0},
+        )
+        self.assertIn({"crianca": "Ana", "semana": 2, "antes": 2.0, "depois": 5.0}, resumo["previa"])
+
+    def test_simulacao_desfaz_as_alteracoes(self):
+        importar_planilha(planilha_xlsx([["Ana", 1, 2]]))
+        resumo = importar_planilha(planilha_xlsx([["Ana", 7, 2], ["Bia", 1, 1]]), diferencial=True, simular=True)
+        self.assertEqual(resumo["alteracoes"]["atualizados"], 1)
+        self.assertEqual(resumo["alteracoes"]["inseridos"], 2)
+        self.assertFalse(Crianca.objects.filter(nome="Bia").exists())
+        self.assertEqual(dict(PlacarCrianca.objects.values_list("crianca__nome", "total")), {"Ana": 3.0})
+
+
+@skipUnless(connection.vendor == "sqlite", "planos de consulta do SQLite")
+class IndicesResultadoTests(TransactionTestCase):
+    """Planos de consulta antes (0006) e depois (0007) dos índices de Resultado."""
+
+    def planos(self, apps=django_apps):
+        """EXPLAIN de cada consulta, com os modelos de `apps` (o estado de uma migração)."""
+        Resultado, Atividade, Semana = (apps.get_model("atividades", m) for m in ("Resultado", "Atividade", "Semana"))
+        consultas = {
+            # delete/leitura da importação: (crianças x semanas do arquivo)
+            "importacao": Resultado.objects.filter(crianca_id__in=[1, 2], semana_id__in=[1, 2]),
+            # agregação do placar por criança/semana
+            "placar": Resultado.objects.filter(crianca_id__in=[1, 2])
+            .values("crianca_id", "semana_id").annotate(total=Sum("quantidade")).order_by(),
+            "atividade_por_pontos": Atividade.objects.filter(pontos__in=[1.0, 2.0]),
+            "semana_por_numero": Semana.objects.filter(numero__in=[1, 2]),
+        }
+        if any(campo.name == "temporada" for campo in Semana._meta.fields):
+            # da 0011 em diante o número só é único dentro da temporada
+            consultas["semana_por_numero"] = consultas["semana_por_numero"].filter(temporada_id=1)
+        return {nome: qs.explain() for nome, qs in consultas.items()}
+
+    def test_planos_de_consulta_e_unificacao_de_duplicados(self):
+        call_command("migrate", "atividades", "0006", verbosity=0)
+        try:
+            hoje = date.today()
+            # Os modelos de hoje têm colunas que a 0006 ainda não tem: usa os daquela época
+            antigas = MigrationExecutor(connection).loader.project_state(("atividades", "0006_importacao_diferencial")).apps
+            Semana06 = antigas.get_model("atividades", "Semana")
+            Semana06.objects.bulk_create([Semana06(numero=1, data_inicio=hoje, data_fim=hoje) for _ in range(2)])
+            ana = antigas.get_model("atividades", "Crianca").objects.create(nome="Ana", idade=4)
+            nota = antigas.get_model("atividades", "Atividade").objects.create(nome="Nota 2", pontos=2)
+            s1, s2 = Semana06.objects.order_by("id")
+            ResultadoAntigo = antigas.get_model("atividades", "Resultado")
+            ResultadoAntigo.objects.bulk_create([
+                ResultadoAntigo(crianca_id=ana.pk, semana_id=s1.pk, atividade_id=nota.pk),
+                ResultadoAntigo(crianca_id=ana.pk, semana_id=s1.pk, atividade_id=nota.pk, quantidade=2),
+                ResultadoAntigo(crianca_id=ana.pk, semana_id=s2.pk, atividade_id=nota.pk),
+            ])
+            antes = self.planos(antigas)
+        finally:
+            call_command("migrate", "atividades", verbosity=0)
+        depois = self.planos()
+
+        self.assertIn("SCAN atividades_atividade", antes["atividade_por_pontos"])
+        self.assertIn("SCAN atividades_semana", antes["semana_por_numero"])
+        self.assertIn("USE TEMP B-TREE FOR GROUP BY", antes["placar"])
+        self.assertNotIn("crianca_id=?", antes["importacao"].replace("semana_id=?", ""))
+
+        self.assertIn("(pontos=?)", depois["atividade_por_pontos"])
+        self.assertIn("numero=?", depois["semana_por_numero"])
+        self.assertNotIn("SCAN", depois["semana_por_numero"])
+        self.assertNotIn("TEMP B-TREE", depois["placar"])
+        self.assertIn("semana_id=? AND crianca_id=?", depois["importacao"])
+
+        # As duplicatas viram uma semana só e uma linha com quantidade somada
+        # (que a 0010 passa para a atividade "Nota", com os pontos na linha)
+        self.assertEqual(Semana.objects.count(), 1)
+        self.assertEqual(list(Resultado.objects.values_list("quantidade", "pontos")), [(4, 8.0)])
+        self.assertEqual(PlacarCrianca.objects.get(crianca_id=ana.pk).total, 8.0)
+        self.assertEqual(Crianca.objects.get(pk=ana.pk).nome_normalizado, "ana")
+
+
+class NotasLivresMigracaoTests(TransactionTestCase):
+    """A 0010 junta as atividades "Nota X" numa "Nota" de pontuação livre sem mudar os totais."""
+
+    def test_unifica_notas_e_preserva_totais(self):
+        call_command("migrate", "atividades", "0009", verbosity=0)
+        try:
+            antigas = MigrationExecutor(connection).loader.project_state(
+                ("atividades", "0009_crianca_nome_normalizado")
+            ).apps
+            Atividade09 = antigas.get_model("atividades", "Atividade")
+            Resultado09 = antigas.get_model("atividades", "Resultado")
+            hoje = date.today()
+            Semana09 = antigas.get_model("atividades", "Semana")
+            s1, s2 = (Semana09.objects.create(numero=n, data_inicio=hoje, data_fim=hoje) for n in (1, 2))
+            ana, bia = (
+                antigas.get_model("atividades", "Crianca").objects.create(nome=nome, idade=5) for nome in ("Ana", "Bia")
+            )
+            n15, n2, n10 = (Atividade09.objects.create(nome=f"Nota {p:g}", pontos=p) for p in (1.5, 2, 10))
+            presenca = Atividade09.objects.create(nome="Presença", pontos=3)
+            Resultado09.objects.bulk_create([
+                Resultado09(crianca_id=ana.pk, semana_id=s1.pk, atividade_id=n15.pk, quantidade=2),
+                Resultado09(crianca_id=ana.pk, semana_id=s1.pk, atividade_id=n2.pk),
+                Resultado09(crianca_id=ana.pk, semana_id=s2.pk, atividade_id=n10.pk),
+                Resultado09(crianca_id=ana.pk, semana_id=s2.pk, atividade_id=presenca.pk, quantidade=2),
+                Resultado09(crianca_id=bia.pk, semana_id=s1.pk, atividade_id=n2.pk, quantidade=3),
+            ])
+        finally:
+            call_command("migrate", "atividades", verbosity=0)
+
+        self.assertEqual(
+            sorted(Atividade.objects.values_list("nome", "pontuacao_livre")), [("Nota", True), ("Presença", False)]
+        )
+        self.assertEqual(
+            sorted(Resultado.objects.values_list(
+                "crianca__nome", "semana__numero", "atividade__nome", "quantidade", "pontos"
+            )),
+            [
+                ("Ana", 1, "Nota", 3, 5.0), ("Ana", 2, "Nota", 1, 10.0), ("Ana", 2, "Presença", 2, 6.0),
+                ("Bia", 1, "Nota", 3, 6.0),
+            ],
+        )
+        PlacarCrianca.objects.recalcular(Crianca.objects.values_list("id", flat=True))
+        self.assertEqual(dict(PlacarCrianca.objects.values_list("crianca__nome", "total")), {"Ana": 21.0, "Bia": 6.0})
+
+        # A volta refaz atividades "Nota X" (quantidade 1 por nota) com os mesmos totais
+        call_command("migrate", "atividades", "0009", verbosity=0)
+        try:
+            Resultado09 = MigrationExecutor(connection).loader.project_state(
+                ("atividades", "0009_crianca_nome_normalizado")
+            ).apps.get_model("atividades", "Resultado")
+            totais = dict(
+                Resultado09.objects.values("crianca__nome")
+                .annotate(total=Sum(F("quantidade") * F("atividade__pontos"), output_field=FloatField()))
+                .values_list("crianca__nome", "total")
+            )
+        finally:
+            call_command("migrate", "atividades", verbosity=0)
+        self.assertEqual(totais, {"Ana": 21.0, "Bia": 6.0})
+
+
+class ConcorrenciaBancoTests(TransactionTestCase):
+    @skipUnless(connection.vendor == "sqlite", "PRAGMAs só existem no SQLite")
+    def test_pragmas_aplicados_na_conexao(self):
+        pragmas = pragmas_atuais(connection)
+        self.assertEqual(pragmas["journal_mode"], "wal")
+        self.assertEqual(pragmas["synchronous"], 1)  # NORMAL
+
+    def test_importacoes_simultaneas_nao_travam_leituras_do_ranking(self):
+        # Só correção aqui; o limite de latência fica no benchmark_concorrencia (--p95-maximo)
+        base = gerar_planilha(100, semanas=4, semente=0)
+        importar_planilha(SimpleUploadedFile("base.xlsx", base))
+        planilhas = [
+            gerar_planilha(100, semanas=4, semente=i, primeira_semana=5 + 4 * i) for i in range(3)
+        ]
+        resultado = concorrencia(planilhas, leitores=4)
+        self.assertEqual(resultado["erros"], [])
+        self.assertGreater(resultado["leituras"], 0)
+        self.assertEqual(Semana.objects.count(), 16)
+        celulas = sum(
+            int(pd.read_excel(io.BytesIO(conteudo)).filter(like="Semana").notna().sum().sum())
+            for conteudo in [base] + planilhas
+        )
+        self.assertEqual(Resultado.objects.count(), celulas)
+
+
+class FilaImportacaoTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media, IMPORTACAO_EM_SEGUNDO_PLANO="processo"))
+
+    def test_semanas_em_comum_esperam_e_ordem_e_preservada(self):
+        j1 = fila_importacao.enfileirar(planilha_xlsx([["Ana", 1, 2]], semanas=(1, 2)))
+        j2 = fila_importacao.enfileirar(planilha_xlsx([["Ana", 3, 4]], semanas=(2, 3)))
+        j3 = fila_importacao.enfileirar(planilha_xlsx([["Bia", 5]], semanas=(4,)))
+        self.assertEqual(j1.semanas, [1, 2])
+
+        self.assertEqual(fila_importacao.reservar_proximo(), j1)
+        self.assertEqual(fila_importacao.reservar_proximo(), j3)  # j2 espera a semana 2
+        self.assertIsNone(fila_importacao.reservar_proximo())
+
+        fila_importacao.executar(j1)
+        self.assertEqual(fila_importacao.reservar_proximo(), j2)
+        fila_importacao.executar(j2)
+        fila_importacao.executar(j3)
+
+        j1.refresh_from_db()
+        self.assertEqual(j1.status, ImportacaoJob.CONCLUIDA)
+        self.assertEqual((j1.linhas_lidas, j1.resultados_gravados), (1, 2))
+        self.assertEqual(
+            sorted(Resultado.objects.values_list("semana__numero", "pontos")),
+            [(1, 1.0), (2, 3.0), (3, 4.0), (4, 5.0)],
+        )
+
+    def test_travas_sao_por_temporada(self):
+        anterior = Temporada.objects.create(nome="Gincana 2025", slug="2025", ativa=True)
+        j1 = fila_importacao.enfileirar(planilha_xlsx([["Ana", 1, 2]], semanas=(1, 2)))
+        Temporada.objects.create(nome="Gincana 2026", slug="2026", ativa=True)
+        j2 = fila_importacao.enfileirar(planilha_xlsx([["Bia", 3, 4]], semanas=(1, 2)))
+        j3 = fila_importacao.enfileirar(planilha_xlsx([["Caio", 5]], semanas=(2,)))
+        self.assertEqual(j1.temporada, anterior)
+
+        # A semana 1 de 2025 e a de 2026 são semanas diferentes: j2 não espera j1
+        self.assertEqual(fila_importacao.reservar_proximo(), j1)
+        self.assertEqual(fila_importacao.reservar_proximo(), j2)
+        self.assertIsNone(fila_importacao.reservar_proximo())  # j3 espera a semana 2 de 2026
+        fila_importacao.executar(j1)
+        self.assertIsNone(fila_importacao.reservar_proximo())
+        fila_importacao.executar(j2)
+        self.assertEqual(fila_importacao.reservar_proximo(), j3)
+        fila_importacao.executar(j3)
+
+        self.assertEqual(
+            sorted(Resultado.objects.values_list("crianca__temporada__slug", "crianca__nome", "semana__numero")),
+            [("2025", "Ana", 1), ("2025", "Ana", 2), ("2026", "Bia", 1), ("2026", "Bia", 2), ("2026", "Caio", 2)],
+        )
+
+    def test_importacao_longa_com_batimento_nao_e_abandonada(self):
+        fila_importacao._cache().clear()
+        job = fila_importacao.enfileirar(planilha_xlsx([["Ana", 1]], semanas=(1,)))
+        velho = timezone.now() - timedelta(hours=1)
+        ImportacaoJob.objects.filter(pk=job.pk).update(atualizado_em=velho)
+        # Reservar renova atualizado_em: ter esperado na fila não é abandono
+        self.assertEqual(fila_importacao.reservar_proximo(), job)
+        fila_importacao.liberar_abandonados()
+        self.assertEqual(ImportacaoJob.objects.get(pk=job.pk).status, ImportacaoJob.EXECUTANDO)
+
+        # Rodando há mais que o timeout, mas com batimento recente: continua com as semanas
+        ImportacaoJob.objects.filter(pk=job.pk).update(atualizado_em=velho)
+        fila_importacao.registrar_batimento(job)
+        fila_importacao.liberar_abandonados()
+        self.assertEqual(ImportacaoJob.objects.get(pk=job.pk).status, ImportacaoJob.EXECUTANDO)
+        self.assertTrue(TravaSemanaImportacao.objects.filter(job=job).exists())
+
+        # Sem batimento (processo morto), é liberado
+        fila_importacao._cache().clear()
+        fila_importacao.liberar_abandonados()
+        self.assertEqual(ImportacaoJob.objects.get(pk=job.pk).status, ImportacaoJob.ERRO)
+        self.assertFalse(TravaSemanaImportacao.objects.filter(job=job).exists())
+
+    def test_upload_cria_job_e_progresso_em_json(self):
+        with override_settings(IMPORTACAO_EM_SEGUNDO_PLANO="nao"), \
+                self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post("/importar/", {"arquivo": planilha_xlsx([["Ana", "x", 2]])})
+        job = ImportacaoJob.objects.get()
+        self.assertRedirects(resp, f"/importar/{job.pk}/")
+        dados = self.client.get(f"/importar/{job.pk}/progresso/").json()
+        self.assertEqual(dados["status"], ImportacaoJob.CONCLUIDA)
+        self.assertEqual((dados["resultados_gravados"], dados["celulas_invalidas"]), (1, 1))
+        self.assertContains(self.client.get(f"/importar/{job.pk}/"), "<td>gravacao</td>", html=True)
+
+    def test_arquivo_sem_semanas_nao_entra_na_fila(self):
+        resp = self.client.post("/importar/", {"arquivo": planilha_xlsx([["Ana"]], semanas=())})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(ImportacaoJob.objects.exists())
+
+    def test_simulacao_mostra_previa_sem_enfileirar(self):
+        resp = self.client.post(
+            "/importar/", {"arquivo": planilha_xlsx([["Ana", 1, 2]]), "diferencial": "on", "simular": "on"}
+        )
+        self.assertContains(resp, "Prévia da importação")
+        self.assertEqual(resp.context["simulacao"]["alteracoes"]["inseridos"], 2)
+        self.assertFalse(ImportacaoJob.objects.exists())
+        self.assertFalse(Resultado.objects.exists())
+
+
+class ClassificadorTests(TestCase):
+    def test_posicao_com_empate_e_medalhas_por_total_distinto(self):
+        linhas = [(1, "A", 4, 10.0), (2, "B", 5, 10.0), (3, "C", 6, 8.0),
+                  (4, "D", 7, 5.0), (5, "E", 8, 1.0), (6, "F", 9, 0.0)]
+        itens = list(iterar_ranking(linhas))
+        self.assertEqual([i["posicao"] for i in itens], [1, 1, 3, 4, 5, 6])
+        self.assertEqual(
+            [i["medalha"] for i in itens], ["ouro", "ouro", "prata", "bronze", None, None]
+        )
+
+    def test_sem_pontos_nao_ha_medalha(self):
+        itens = list(iterar_ranking([(1, "A", 4, 0.0), (2, "B", 5, 0.0)]))
+        self.assertEqual([i["medalha"] for i in itens], [None, None])
+
+
+class RankingViewTests(TestCase):
+    def test_ranking_usa_placar(self):
+        semana = Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+        atividade = Atividade.objects.create(nome="Presença", pontos=3)
+        ana = Crianca.objects.create(nome="Ana", idade=4)
+        Crianca.objects.create(nome="Bia", idade=6)
+        Resultado.objects.create(crianca=ana, semana=semana, atividade=atividade)
+
+        resp = self.client.get("/ranking/")
+        self.assertEqual([i["nome"] for i in resp.context["ranking"]], ["Ana", "Bia"])
+        self.assertEqual(resp.context["ranking"][0]["medalha"], "ouro")
+
+        resp = self.client.get("/ranking/5-mais/")
+        self.assertEqual([(i["nome"], i["total"]) for i in resp.context["ranking"]], [("Bia", 0.0)])
+
+    @override_settings(RANKING_FAIXAS={
+        "ate4": {"nome": "Até 4 anos", "idade_max": 4},
+        "3a6": {"nome": "3 a 6 anos", "idade_min": 3, "idade_max": 6},
+    })
+    def test_quadros_saem_de_uma_query_e_batem_com_o_filtro(self):
+        semana = Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+        for i, (idade, turma, pontos) in enumerate(
+            [(2, "Sementinhas", 5), (4, "Sementinhas", 5), (5, "Exploradores", 8), (7, "", 1), (6, "Exploradores", 0)]
+        ):
+            crianca = Crianca.objects.create(nome=f"C{i}", idade=idade, turma=turma)
+            if pontos:
+                atividade, _ = Atividade.objects.get_or_create(nome=f"Nota {pontos}", pontos=pontos)
+                Resultado.objects.create(crianca=crianca, semana=semana, atividade=atividade)
+
+        with self.assertNumQueries(1):
+            quadros = montar_quadros()
+        self.assertEqual(
+            list(quadros), ["geral", "ate4", "3a6", "turma-exploradores", "turma-sementinhas"]
+        )
+        self.assertEqual(quadros["3a6"]["ranking"], montar_ranking(Crianca.objects.filter(idade__range=(3, 6))))
+        self.assertEqual(
+            quadros["turma-exploradores"]["ranking"],
+            montar_ranking(Crianca.objects.filter(turma="Exploradores")),
+        )
+
+        resp = self.client.get("/ranking/turma-sementinhas/")
+        self.assertEqual(resp.context["faixa"], "Turma Sementinhas")
+        self.assertEqual([i["posicao"] for i in resp.context["ranking"]], [1, 1])
+        self.assertEqual(self.client.get("/ranking/3a6/").context["faixa"], "3 a 6 anos")
+        self.assertEqual(self.client.get("/ranking/nao-existe/").status_code, 404)
+        self.assertContains(self.client.get("/"), 'href="/ranking/turma-exploradores/"')
+
+
+class CacheRankingTests(TestCase):
+    def setUp(self):
+        caches["ranking"].clear()
+
+    def test_cache_acerta_ate_os_dados_mudarem(self):
+        ana = Crianca.objects.create(nome="Ana", idade=4)
+        with self.assertNumQueries(2):
+            self.client.get("/ranking/")
+        with self.assertNumQueries(1):  # só a leitura da versão
+            resp = self.client.get("/ranking/")
+        self.assertEqual(resp.context["ranking"][0]["total"], 0.0)
+
+        semana = Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+        atividade = Atividade.objects.create(nome="Presença", pontos=3)
+        Resultado.objects.create(crianca=ana, semana=semana, atividade=atividade)
+        resp = self.client.get("/ranking/")
+        self.assertEqual(resp.context["ranking"][0]["total"], 3.0)
+        self.assertEqual(estatisticas()["hits"], 1)
+        self.assertEqual(estatisticas()["misses"], 2)
+
+
+class RankingCondicionalTests(TestCase):
+    def test_responde_304_sem_calcular_ranking(self):
+        Crianca.objects.create(nome="Ana", idade=4)
+        for url in ("/ranking/", "/ranking/ate-4/", "/ranking/5-mais/"):
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn("Last-Modified", resp)
+            with self.assertNumQueries(1):
+                resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp["ETag"])
+            self.assertEqual(resp.status_code, 304)
+
+    def test_etag_muda_quando_dados_mudam(self):
+        etag = self.client.get("/ranking/")["ETag"]
+        Crianca.objects.create(nome="Ana", idade=4)
+        resp = self.client.get("/ranking/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
+
+class HistoricoRankingTests(TestCase):
+    def setUp(self):
+        caches["ranking"].clear()
+        importar_planilha(planilha_xlsx([["Ana", 5, None], ["Bia", 3, 4], ["Caio", 3, 0]]))
+
+    def fotos(self, numero):
+        return {
+            nome: (acumulado, posicao, variacao)
+            for nome, acumulado, posicao, variacao in HistoricoRanking.objects.filter(
+                semana__numero=numero
+            ).values_list("crianca__nome", "acumulado", "posicao", "variacao")
+        }
+
+    def test_fotos_semanais_com_posicao_e_variacao(self):
+        self.assertEqual(self.fotos(1), {"Ana": (5.0, 1, None), "Bia": (3.0, 2, None), "Caio": (3.0, 2, None)})
+        self.assertEqual(self.fotos(2), {"Ana": (5.0, 2, -1), "Bia": (7.0, 1, 1), "Caio": (3.0, 3, -1)})
+
+        # Reimportar a mesma planilha não regrava o histórico
+        with CaptureQueriesContext(connection) as ctx:
+            importar_planilha(planilha_xlsx([["Ana", 5, None], ["Bia", 3, 4], ["Caio", 3, 0]]), diferencial=True)
+        self.assertFalse([q for q in ctx.captured_queries if "historicoranking" in q["sql"].lower()
+                          and q["sql"].lstrip().startswith(("INSERT", "UPDATE", "DELETE"))])
+
+        # Alterar a semana 1 muda as fotos das semanas seguintes também
+        importar_planilha(planilha_xlsx([["Caio", 9]], semanas=(1,)))
+        self.assertEqual(self.fotos(2)["Caio"], (9.0, 1, 0))
+
+    def test_endpoints_de_historico(self):
+        resp = self.client.get("/ranking/historico/2/?limite=2")
+        self.assertEqual(
+            [(i["nome"], i["posicao"], i["variacao"]) for i in resp.json()["ranking"]],
+            [("Bia", 1, 1), ("Ana", 2, -1)],
+        )
+        with self.assertNumQueries(5):  # versão, semana e uma consulta por lista, sem agregação
+            destaques = self.client.get("/ranking/historico/2/destaques/").json()
+        self.assertEqual([i["nome"] for i in destaques["subiram"]], ["Bia"])
+        self.assertEqual([i["nome"] for i in destaques["cairam"]], ["Ana", "Caio"])
+        self.assertEqual([i["nome"] for i in destaques["pontuaram"]], ["Bia"])
+        self.assertEqual(self.client.get("/ranking/historico/9/").status_code, 404)
+
+        bia = Crianca.objects.get(nome="Bia")
+        evolucao = self.client.get(f"/ranking/historico/crianca/{bia.pk}/").json()
+        self.assertEqual([(s["semana"], s["posicao"]) for s in evolucao["semanas"]], [(1, 2), (2, 1)])
+
+    def test_exclusao_em_massa_no_admin_refaz_as_posicoes(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "senha"))
+        ana = Crianca.objects.get(nome="Ana")
+        resp = self.client.post("/admin/atividades/crianca/", {
+            "action": "delete_selected", "_selected_action": [ana.pk], "post": "yes",
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(self.fotos(1), {"Bia": (3.0, 1, None), "Caio": (3.0, 1, None)})
+        self.assertEqual(self.fotos(2), {"Bia": (7.0, 1, 0), "Caio": (3.0, 2, -1)})
+
+    def test_renumerar_semana_refaz_as_fotos_e_a_etag(self):
+        antes = self.client.get("/ranking/historico/2/")
+        semana1 = Semana.objects.get(numero=1)
+        semana1.numero = 3
+        semana1.save()
+
+        # A semana 2 passa a ser a primeira: o acumulado é só dela e não há variação
+        self.assertEqual(self.fotos(2), {"Ana": (0.0, 2, None), "Bia": (4.0, 1, None), "Caio": (0.0, 2, None)})
+        self.assertEqual(self.fotos(3), {"Ana": (5.0, 2, 0), "Bia": (7.0, 1, 0), "Caio": (3.0, 3, -1)})
+        resp = self.client.get("/ranking/historico/2/", HTTP_IF_NONE_MATCH=antes["ETag"])
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], antes["ETag"])
+        self.assertEqual(
+            [(i["nome"], i["posicao"], i["variacao"]) for i in resp.json()["ranking"]],
+            [("Bia", 1, None), ("Ana", 2, None), ("Caio", 2, None)],
+        )
+
+    def test_comando_gera_historico_de_dados_antigos(self):
+        HistoricoRanking.objects.all().delete()
+        saida = io.StringIO()
+        call_command("historico_ranking", stdout=saida)
+        self.assertIn("6 fotos inseridas", saida.getvalue())
+        self.assertEqual(self.fotos(2)["Bia"], (7.0, 1, 1))
+
+
+class LancamentosTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "senha"))
+        self.ana = Crianca.objects.create(nome="Ana", idade=4)
+        self.bia = Crianca.objects.create(nome="Bia", idade=6)
+        for numero in (1, 2):
+            Semana.objects.create(numero=numero, data_inicio=date.today(), data_fim=date.today())
+        self.versiculo = Atividade.objects.create(nome="Versículo", pontos=2)
+        self.presenca = Atividade.objects.create(nome="Presença", pontos=1)
+
+    def enviar(self, entradas, client=None):
+        return (client or self.client).post(
+            "/api/lancamentos/", {"entradas": entradas}, content_type="application/json"
+        )
+
+    def entrada(self, crianca, semana, atividade, quantidade):
+        return {"crianca": crianca.pk, "semana": semana, "atividade": atividade.pk, "quantidade": quantidade}
+
+    def test_lote_grava_substitui_e_devolve_totais(self):
+        resp = self.enviar([
+            self.entrada(self.ana, 1, self.versiculo, 2),
+            self.entrada(self.ana, 2, self.presenca, 1),
+            self.entrada(self.bia, 1, self.presenca, 3),
+        ])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["totais"], [
+            {"id": self.ana.pk, "nome": "Ana", "total": 5.0},
+            {"id": self.bia.pk, "nome": "Bia", "total": 3.0},
+        ])
+
+        # Reenviar substitui a quantidade (não soma) e 0 apaga
+        resp = self.enviar([self.entrada(self.ana, 1, self.versiculo, 1), self.entrada(self.ana, 2, self.presenca, 0)])
+        self.assertEqual(resp.json(), {
+            "gravados": 1, "removidos": 1, "totais": [{"id": self.ana.pk, "nome": "Ana", "total": 2.0}],
+        })
+        self.assertEqual(Resultado.objects.filter(crianca=self.ana).count(), 1)
+        self.assertEqual(HistoricoRanking.objects.get(crianca=self.ana, semana__numero=2).acumulado, 2.0)
+        call_command("recalcular_placar", "--verificar", stdout=io.StringIO())
+
+    def test_lote_invalido_nao_grava_nada(self):
+        resp = self.enviar([
+            self.entrada(self.ana, 1, self.versiculo, 2),
+            {"crianca": 999, "semana": 9, "atividade": self.presenca.pk, "quantidade": 1},
+            self.entrada(self.ana, 1, self.versiculo, 3),
+        ])
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([e["indice"] for e in resp.json()["erros"]], [1, 2])
+        self.assertEqual(
+            resp.json()["erros"][0]["erro"],
+            "Criança 999 não existe na temporada atual; semana 9 não existe na temporada atual.",
+        )
+        self.assertEqual(self.enviar([{"crianca": self.ana.pk, "quantidade": True}]).status_code, 400)
+        self.assertEqual(self.client.post("/api/lancamentos/", "{", content_type="application/json").status_code, 400)
+        self.assertFalse(Resultado.objects.exists())
+
+        anonimo = self.client_class()
+        self.assertEqual(self.enviar([self.entrada(self.ana, 1, self.versiculo, 1)], anonimo).status_code, 403)
+
+    def test_queries_nao_crescem_com_o_tamanho_do_lote(self):
+        temporada = Temporada.objects.atual()
+        criancas = Crianca.objects.bulk_create(
+            [Crianca(nome=f"C{i}", idade=5, temporada=temporada) for i in range(100)]
+        )
+
+        def queries(n):
+            entradas = [self.entrada(c, 1, self.versiculo, n) for c in criancas[:n]]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.enviar(entradas).status_code, 200)
+            return len(ctx.captured_queries)
+
+        poucas = queries(5)
+        self.assertEqual(queries(100), poucas)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_suite_mede_todos_os_caminhos_e_compara_com_a_linha_de_base(self):
+        medicao = executar_suite(criancas=30, semanas=2, linhas_planilha=10, por_envio=5, repeticoes=1)
+        self.assertIn("tela.ranking_turma", medicao["resultados"])
+        self.assertTrue(all(
+            {"segundos", "queries", "pico_mb"} <= set(m) for m in medicao["resultados"].values()
+        ))
+        self.assertFalse(Crianca.objects.exists())  # tudo desfeito ao final
+        self.assertEqual(comparar(medicao, medicao), [])
+
+        pior = json.loads(json.dumps(medicao))
+        pior["resultados"]["tela.ranking"]["queries"] += 1
+        pior["resultados"]["importacao.nova"]["segundos"] = medicao["resultados"]["importacao.nova"]["segundos"] * 2 + 1
+        regressoes = comparar(medicao, pior, tolerancia=0.2)
+        self.assertEqual(len(regressoes), 2)
+        self.assertTrue(regressoes[0].startswith("tela.ranking:"))
+
+
+class ServidorTests(LiveServerTestCase):
+    def test_perfis_do_gunicorn_e_carga_http(self):
+        ranking = perfil("ranking", {})
+        self.assertEqual((ranking["workers"], ranking["threads"]), (2 * CPUS + 1, 4))
+        self.assertEqual(perfil(ambiente={"GUNICORN_PERFIL": "ranking", "GUNICORN_WORKERS": "2"})["workers"], 2)
+        # Com a fila na thread do worker, reciclar o worker mataria a importação
+        self.assertEqual(perfil("importacao", {})["max_requests"], 0)
+        self.assertGreater(perfil("importacao", {"IMPORTACAO_EM_SEGUNDO_PLANO": "processo"})["max_requests"], 0)
+        self.assertEqual(perfil("ao_vivo", {})["worker_class"], "uvicorn.workers.UvicornWorker")
+        with self.assertRaises(ValueError):
+            perfil("outro", {})
+
+        m = carga_http(self.live_server_url, ["/ranking/", "/ranking/nao-existe/"], clientes=2, duracao=0.3)
+        self.assertGreater(m["requests"], 0)
+        self.assertTrue(m["erros"])
+        self.assertTrue(all(erro.endswith("HTTP 404") for erro in m["erros"]))
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        registro.zerar()
+
+    def test_quantis_por_rota_no_formato_prometheus(self):
+        for _ in range(3):
+            self.client.get("/ranking/")
+        self.client.get("/ranking/ate-4/")
+        self.client.get("/admin/login/")
+        self.assertEqual(registro.requests["ranking"], 3)
+        self.assertGreater(registro.queries["ranking"], 0)
+
+        # Sem token, fechado para quem não é da equipe
+        self.assertEqual(self.client.get("/metricas/").status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metricas/").status_code, 200)
+        self.client.force_login(User.objects.create_user("equipe", is_staff=True))
+        resp = self.client.get("/metricas/")
+        self.client.logout()
+        self.assertTrue(resp["Content-Type"].startswith("text/plain; version=0.0.4"))
+        texto = resp.content.decode()
+        self.assertIn('gincana_request_duracao_segundos{rota="ranking",quantile="0.99"}', texto)
+        self.assertIn('gincana_request_duracao_segundos_count{rota="ranking"} 3', texto)
+        self.assertIn('gincana_request_duracao_segundos_count{rota="ranking_ate4"} 1', texto)
+        self.assertIn('gincana_db_queries_total{rota="admin"}', texto)
+
+        with override_settings(METRICAS_TOKEN="segredo"):
+            self.assertEqual(self.client.get("/metricas/").status_code, 403)
+            resp = self.client.get("/metricas/", HTTP_AUTHORIZATION="Bearer segredo")
+            self.assertEqual(resp.status_code, 200)
+
+    @override_settings(METRICAS_QUERY_LENTA_MS=0)
+    def test_query_lenta_e_logada_com_o_sql(self):
+        with self.assertLogs("atividades.metricas", "WARNING") as logs:
+            self.client.get("/ranking/")
+        self.assertIn("em /ranking/: SELECT", logs.output[0])
+        self.assertEqual(registro.queries_lentas["ranking"], registro.queries["ranking"])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "senha"))
+        self.atividade = Atividade.objects.create(nome="Presença", pontos=2)
+
+    def criar(self, n_semanas, n_criancas=1):
+        temporada = Temporada.objects.atual()
+        semanas = Semana.objects.bulk_create([
+            Semana(numero=n, data_inicio=date.today(), data_fim=date.today(), temporada=temporada)
+            for n in range(Semana.objects.count() + 1, Semana.objects.count() + n_semanas + 1)
+        ])
+        criancas = Crianca.objects.bulk_create([
+            Crianca(nome=f"C{i}", idade=5, temporada=temporada) for i in range(n_criancas)
+        ])
+        Resultado.objects.bulk_create([
+            Resultado(crianca=c, semana=s, atividade=self.atividade, quantidade=3, pontos=6.0)
+            for c in criancas for s in semanas
+        ])
+        return criancas[0]
+
+    def contar(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries), resp
+
+    def test_lista_de_resultados_nao_faz_uma_query_por_linha(self):
+        self.criar(2, n_criancas=5)
+        poucas, _ = self.contar("/admin/atividades/resultado/")
+        self.criar(10, n_criancas=10)
+        muitas, resp = self.contar("/admin/atividades/resultado/")
+        self.assertEqual(len(resp.context["cl"].result_list), 100)
+        self.assertEqual(muitas, poucas)
+        self.assertEqual({r.pontos for r in resp.context["cl"].result_list}, {6.0})
+
+    def test_inline_de_resultados_e_paginado(self):
+        crianca = self.criar(30)
+        url = f"/admin/atividades/crianca/{crianca.pk}/change/"
+        self.client.get(url)
+        poucas, resp = self.contar(url)
+        self.assertContains(resp, "Página 1 de 2 (30 resultados)")
+        Resultado.objects.bulk_create([
+            Resultado(crianca=crianca, semana=s, atividade=Atividade.objects.create(nome=f"A{s.numero}", pontos=1))
+            for s in Semana.objects.all()
+        ])
+        muitas, resp = self.contar(url + "?pagina_resultados=2")
+        self.assertEqual(muitas, poucas)  # a mesma quantidade de linhas na página, as mesmas queries
+        self.assertContains(resp, "Página 2 de 3 (60 resultados)")
+        self.assertEqual(len(resp.context["inline_admin_formsets"][0].formset.initial_forms), 25)
+        self.assertEqual(self.client.get("/admin/atividades/crianca/add/").status_code, 200)
+        resp = self.client.get(f"/admin/atividades/atividade/{self.atividade.pk}/change/")
+        self.assertContains(resp, f"?atividade__id__exact={self.atividade.pk}")
+
+
+    def test_excluir_criancas_em_massa_invalida_o_ranking(self):
+        caches["ranking"].clear()
+        semana = Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+        ana, bia = (Crianca.objects.create(nome=nome, idade=5) for nome in ("Ana", "Bia"))
+        Resultado.objects.create(crianca=ana, semana=semana, atividade=self.atividade, quantidade=2)
+        self.assertEqual([i["nome"] for i in self.client.get("/ranking/").context["ranking"]], ["Ana", "Bia"])
+        versao = VersaoDados.objects.atual().versao
+
+        resp = self.client.post("/admin/atividades/crianca/", {
+            "action": "delete_selected", "_selected_action": [ana.pk], "post": "yes",
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(Crianca.objects.filter(pk=ana.pk).exists())
+        self.assertGreater(VersaoDados.objects.atual().versao, versao)
+        self.assertEqual([i["nome"] for i in self.client.get("/ranking/").context["ranking"]], ["Bia"])
+
+
+class AoVivoTests(TestCase):
+    def test_diff_envia_apenas_mudancas(self):
+        antes = list(iterar_ranking([(1, "A", 4, 10.0), (2, "B", 5, 8.0), (3, "C", 6, 1.0)]))
+        depois = list(iterar_ranking([(2, "B", 5, 12.0), (1, "A", 4, 10.0), (4, "D", 7, 1.0)]))
+        diff = diff_ranking(antes, depois)
+        self.assertEqual([i["id"] for i in diff["alterados"]], [2, 1, 4])
+        self.assertEqual(diff["removidos"], [3])
+        self.assertEqual(diff_ranking(depois, depois), {"alterados": [], "removidos": []})
+
+    def test_pagina_ao_vivo_inclui_stream(self):
+        resp = self.client.get("/ranking/ate-4/?ao_vivo=1")
+        self.assertEqual(resp.context["ao_vivo"]["url"], "/ranking/eventos/ate4/")
+        self.assertContains(resp, "EventSource")
+        self.assertNotContains(self.client.get("/ranking/ate-4/"), "EventSource")
+
+
+class PublicacaoTests(TestCase):
+    def setUp(self):
+        self.destino = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.destino)
+        self.enterContext(override_settings(PUBLICACAO_DIR=self.destino, PUBLICACAO_EM_SEGUNDO_PLANO="nao"))
+        caches["ranking"].clear()
+
+    def ler(self, caminho):
+        with open(f"{self.destino}/{caminho}", encoding="utf-8") as arquivo:
+            return arquivo.read()
+
+    def test_publica_html_e_json_de_todos_os_quadros(self):
+        Crianca.objects.create(nome="Ana", idade=4, turma="Sementinhas")
+        Crianca.objects.create(nome="Bia", idade=6)
+        versao = publicar()
+
+        self.assertIn("ANA", self.ler("ranking/index.html"))
+        self.assertEqual(self.ler("ranking/ate4/index.html"), self.ler("ranking/ate-4/index.html"))
+        self.assertNotIn("BIA", self.ler("ranking/ate4/index.html"))
+        self.assertIn("BIA", self.ler("ranking/5-mais/index.html"))
+        dados = json.loads(self.ler("ranking/turma-sementinhas.json"))
+        self.assertEqual(dados["versao"], versao)
+        self.assertEqual(dados, self.client.get("/ranking/turma-sementinhas.json").json())
+        self.assertEqual(self.client.get("/ranking/nao-existe.json").status_code, 404)
+
+        with self.assertNumQueries(1):  # versão já publicada: só lê a versão
+            self.assertIsNone(publicar())
+        self.assertFalse([n for n in os.listdir(f"{self.destino}/ranking") if n.startswith(".")])
+
+    def test_mudanca_nos_dados_republica_e_apaga_quadro_que_sumiu(self):
+        ana = Crianca.objects.create(nome="Ana", idade=4, turma="Sementinhas")
+        publicar()
+        with self.captureOnCommitCallbacks(execute=True):
+            ana.turma = ""
+            ana.save()
+            Crianca.objects.create(nome="Caio", idade=5)
+        self.assertIn("CAIO", self.ler("ranking/index.html"))
+        self.assertEqual(json.loads(self.ler("ranking/versao.json"))["quadros"], ["geral", "ate4", "5mais"])
+        self.assertFalse(os.path.exists(f"{self.destino}/ranking/turma-sementinhas/index.html"))
+        self.assertFalse(os.path.exists(f"{self.destino}/ranking/turma-sementinhas.json"))
+
+    def test_comando_exige_destino(self):
+        with override_settings(PUBLICACAO_DIR=""), self.assertRaises(CommandError):
+            call_command("publicar_ranking")
+        saida = io.StringIO()
+        call_command("publicar_ranking", "--forcar", stdout=saida)
+        self.assertIn("Ranking publicado", saida.getvalue())
+
+
+class ExportacaoTests(TestCase):
+    def setUp(self):
+        s1 = Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+        s2 = Semana.objects.create(numero=2, data_inicio=date.today(), data_fim=date.today())
+        atividade = Atividade.objects.create(nome="Presença", pontos=3)
+        for i, (idade, turma, semanas) in enumerate(
+            [(3, "Sementinhas", [s1, s2]), (4, "Sementinhas", [s2]), (6, "Exploradores", [s1]), (8, "", []),
+             (5, "Exploradores", [s1, s2])]
+        ):
+            crianca = Crianca.objects.create(nome=f"C{i}", idade=idade, turma=turma)
+            for semana in semanas:
+                Resultado.objects.create(crianca=crianca, semana=semana, atividade=atividade)
+
+    def exportar(self, formato="json", **params):
+        resp = self.client.get(f"/api/ranking.{formato}", params)
+        self.assertTrue(resp.streaming)
+        conteudo = b"".join(resp.streaming_content).decode()
+        return json.loads(conteudo) if formato == "json" else list(csv.reader(io.StringIO(conteudo)))
+
+    def test_json_igual_ao_motor_do_ranking(self):
+        dados = self.exportar()
+        self.assertEqual(dados["itens"], montar_ranking())
+        self.assertIsNone(dados["proxima"])
+        self.assertEqual(
+            self.exportar(faixa="ate4")["itens"], montar_ranking(Crianca.objects.filter(idade__lte=4))
+        )
+        turma = self.exportar(faixa="turma-exploradores")
+        self.assertEqual(turma["nome"], "Turma Exploradores")
+        self.assertEqual([i["nome"] for i in turma["itens"]], ["C4", "C2"])
+
+    def test_filtro_de_semana_usa_so_os_pontos_dela(self):
+        itens = self.exportar(semana=1, faixa="ate4")["itens"]
+        self.assertEqual([(i["nome"], i["total"], i["posicao"]) for i in itens], [("C0", 3.0, 1), ("C1", 0.0, 2)])
+        self.assertEqual(self.client.get("/api/ranking.json", {"semana": 9}).status_code, 404)
+
+    def test_paginacao_mantem_posicoes_e_aponta_a_proxima(self):
+        completo = montar_ranking()
+        pagina = self.exportar(pagina=2, por_pagina=2)
+        self.assertEqual(pagina["itens"], completo[2:4])
+        self.assertEqual(self.client.get(pagina["proxima"]).status_code, 200)
+        ultima = self.exportar(pagina=3, por_pagina=2)
+        self.assertEqual(ultima["itens"], completo[4:])
+        self.assertIsNone(ultima["proxima"])
+        self.assertEqual(self.client.get("/api/ranking.json", {"por_pagina": 0}).status_code, 400)
+        self.assertEqual(self.client.get("/api/ranking.json", {"faixa": "nada"}).status_code, 404)
+
+    def test_csv_e_gzip(self):
+        linhas = self.exportar("csv", faixa="5mais")
+        self.assertEqual(linhas[0], ["posicao", "id", "nome", "idade", "total", "medalha"])
+        self.assertEqual([linha[2] for linha in linhas[1:]], ["C4", "C2", "C3"])
+        self.assertEqual(linhas[-1][5], "")
+
+        resp = self.client.get("/api/ranking.csv", {"faixa": "5mais"}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        conteudo = gzip.decompress(b"".join(resp.streaming_content)).decode()
+        self.assertEqual(list(csv.reader(io.StringIO(conteudo))), linhas)
+
+
+class NomesTests(TestCase):
+    def setUp(self):
+        self.semana = Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+
+    def test_importacao_encontra_pelo_nome_normalizado_e_sugere_parecidos(self):
+        jose = Crianca.objects.create(nome="José da Silva", idade=6, turma="Exploradores")
+        self.assertEqual(jose.nome_normalizado, "jose da silva")
+        resumo = importar_planilha(planilha_xlsx(
+            [["  JOSE   DA SILVA ", 2], ["Ana Clara", 1], ["Ana Cllara", 3]], semanas=(1,)
+        ))
+        self.assertEqual(Crianca.objects.filter(nome_normalizado="jose da silva").count(), 1)
+        self.assertEqual(PlacarCrianca.objects.get(crianca=jose).total, 2.0)
+        self.assertEqual(
+            [(s["nome"], [p["nome"] for p in s["parecidos"]]) for s in resumo["semelhantes"]],
+            [("Ana Clara", ["Ana Cllara"]), ("Ana Cllara", ["Ana Clara"])],
+        )
+        self.assertIn("semelhantes", [etapa["etapa"] for etapa in resumo["etapas"]])
+
+    def test_indice_so_compara_candidatos_e_respeita_o_minimo(self):
+        indice = IndiceNomes([(1, "Maria Eduarda", "maria eduarda"), (2, "Mariana", "mariana"), (3, "Pedro", "pedro")])
+        self.assertEqual([i for _, i, _ in indice.semelhantes("maria edurda", 0.7)], [1])
+        self.assertEqual(indice.semelhantes("joao", 0.5), [])
+
+    def test_mesclar_move_e_soma_resultados(self):
+        nota1 = Atividade.objects.create(nome="Nota 1", pontos=1)
+        nota2 = Atividade.objects.create(nome="Nota 2", pontos=2)
+        semana2 = Semana.objects.create(numero=2, data_inicio=date.today(), data_fim=date.today())
+        ana = Crianca.objects.create(nome="Ana", idade=0)
+        dup = Crianca.objects.create(nome="Anna", idade=5, turma="Sementinhas")
+        Resultado.objects.create(crianca=ana, semana=self.semana, atividade=nota1, quantidade=2)
+        Resultado.objects.create(crianca=dup, semana=self.semana, atividade=nota1, quantidade=1)
+        Resultado.objects.create(crianca=dup, semana=semana2, atividade=nota2)
+
+        saida = io.StringIO()
+        call_command("mesclar_criancas", str(ana.pk), str(dup.pk), stdout=saida)
+        self.assertIn("1 resultados movidos, 1 somados", saida.getvalue())
+        self.assertFalse(Crianca.objects.filter(pk=dup.pk).exists())
+        self.assertEqual(
+            sorted(Resultado.objects.values_list("crianca_id", "semana__numero", "quantidade")),
+            [(ana.pk, 1, 3), (ana.pk, 2, 1)],
+        )
+        ana.refresh_from_db()
+        self.assertEqual((ana.idade, ana.turma, ana.placar.total), (5, "Sementinhas", 5.0))
+        self.assertEqual(HistoricoRanking.objects.filter(crianca=ana).count(), 2)
+        with self.assertRaises(CommandError):
+            call_command("mesclar_criancas", str(ana.pk), "999", stdout=io.StringIO())
+
+
+class TemporadaTests(TestCase):
+    def setUp(self):
+        caches["ranking"].clear()
+        hoje = date.today()
+        self.atividade = Atividade.objects.create(nome="Presença", pontos=3)
+        self.antiga = Temporada.objects.create(nome="Gincana 2025", slug="2025", ativa=True)
+        semana = Semana.objects.create(numero=1, data_inicio=hoje, data_fim=hoje)
+        for nome, quantidade in (("Ana", 2), ("Bia", 1)):
+            crianca = Crianca.objects.create(nome=nome, idade=5)
+            Resultado.objects.create(crianca=crianca, semana=semana, atividade=self.atividade, quantidade=quantidade)
+        # Ativar a nova desativa a antiga
+        self.nova = Temporada.objects.create(nome="Gincana 2026", slug="2026", ativa=True)
+        self.antiga.refresh_from_db()
+
+    def test_ranking_e_importacao_ficam_na_temporada_ativa(self):
+        self.assertFalse(self.antiga.ativa)
+        self.assertEqual(Temporada.objects.atual(), self.nova)
+        importar_planilha(planilha_xlsx([["Ana", 1]], semanas=(1,)))
+        self.assertEqual(Semana.objects.filter(numero=1).count(), 2)
+        self.assertEqual(
+            sorted(Crianca.objects.values_list("temporada__slug", "nome")),
+            [("2025", "Ana"), ("2025", "Bia"), ("2026", "Ana")],
+        )
+
+        resp = self.client.get("/ranking/")
+        self.assertEqual([(i["nome"], i["total"]) for i in resp.context["ranking"]], [("Ana", 1.0)])
+        resp = self.client.get("/temporadas/2025/ranking/")
+        self.assertEqual(resp.context["temporada"], self.antiga)
+        self.assertEqual([(i["nome"], i["total"]) for i in resp.context["ranking"]], [("Ana", 6.0), ("Bia", 3.0)])
+        self.assertEqual(self.client.get("/temporadas/nao-existe/ranking/").status_code, 404)
+
+    def test_mudar_crianca_de_temporada_refaz_as_fotos(self):
+        Semana.objects.create(numero=1, data_inicio=date.today(), data_fim=date.today())
+        bia = Crianca.objects.get(nome="Bia")
+        bia.temporada = self.nova
+        bia.save()
+        self.assertEqual(
+            sorted(HistoricoRanking.objects.values_list("semana__temporada__slug", "crianca__nome", "posicao")),
+            [("2025", "Ana", 1), ("2026", "Bia", 1)],
+        )
+
+    def test_arquivar_guarda_o_resumo_e_limpa_as_tabelas(self):
+        with self.assertRaises(ValueError):
+            arquivar(self.nova)
+
+        saida = io.StringIO()
+        call_command("arquivar_temporada", "--encerradas", stdout=saida)
+        self.assertIn("2 crianças, 1 semanas e 2 resultados arquivados", saida.getvalue())
+        self.assertEqual(
+            list(ResumoTemporada.objects.order_by("posicao").values_list("nome", "total", "posicao", "semanas")),
+            [("Ana", 6.0, 1, 1), ("Bia", 3.0, 2, 1)],
+        )
+        self.assertFalse(Crianca.objects.exists())
+        self.assertFalse(Semana.objects.exists())
+        self.assertFalse(Resultado.objects.exists() or PlacarCrianca.objects.exists())
+        self.assertFalse(HistoricoRanking.objects.exists())
+
+        # O ranking da temporada arquivada sai do resumo
+        resp = self.client.get("/temporadas/2025/ranking/")
+        self.assertEqual([(i["nome"], i["posicao"]) for i in resp.context["ranking"]], [("Ana", 1), ("Bia", 2)])
+        with self.assertRaises(CommandError):
+            call_command("arquivar_temporada", "2025", stdout=io.StringIO())
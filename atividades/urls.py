@@ -1,10 +1,44 @@
-from django.urls import path
-from .views import ranking_view, upload_planilha_view, ranking_por_faixa_ate4, ranking_por_faixa_5mais
+from django.urls import include, path
+from .views import (
+    ranking_quadro, upload_planilha_view, ranking_eventos,
+    importacao_status_view, importacao_progresso_view,
+    historico_semana_view, historico_destaques_view, historico_crianca_view, lancamentos_view,
+    metricas_view, ranking_json, ranking_exportar, ranking_escolha,
+)
+
+# As mesmas telas de ranking para uma temporada específica (encerrada ou arquivada)
+rotas_temporada = [
+    path("", ranking_escolha, name="temporada"),
+    path("ranking/", ranking_quadro, name="temporada_ranking"),
+    path("ranking/historico/<int:numero>/", historico_semana_view, name="temporada_historico"),
+    path("ranking/historico/<int:numero>/destaques/", historico_destaques_view, name="temporada_destaques"),
+    path("ranking/<slug:faixa>/", ranking_quadro, name="temporada_ranking_faixa"),
+    path("ranking/<slug:faixa>.json", ranking_json, name="temporada_ranking_json"),
+    path("api/ranking.json", ranking_exportar, {"formato": "json"}, name="temporada_exportar_json"),
+    path("api/ranking.csv", ranking_exportar, {"formato": "csv"}, name="temporada_exportar_csv"),
+]
 
 urlpatterns = [
-    path('ranking/', ranking_view, name='ranking'),
+    path('ranking/', ranking_quadro, name='ranking'),
     path("importar/", upload_planilha_view, name="importar_planilha"),
-    path("ranking/ate-4/", ranking_por_faixa_ate4, name="ranking_ate4"),
-    path("ranking/5-mais/",ranking_por_faixa_5mais, name="ranking_5mais"),
+    path("importar/<int:job_id>/", importacao_status_view, name="importacao_status"),
+    path("importar/<int:job_id>/progresso/", importacao_progresso_view, name="importacao_progresso"),
+    path("api/lancamentos/", lancamentos_view, name="lancamentos"),
+    path("api/ranking.json", ranking_exportar, {"formato": "json"}, name="ranking_exportar_json"),
+    path("api/ranking.csv", ranking_exportar, {"formato": "csv"}, name="ranking_exportar_csv"),
+    path("metricas/", metricas_view, name="metricas"),
+    # Endereços antigos das faixas etárias
+    path("ranking/ate-4/", ranking_quadro, {"faixa": "ate4"}, name="ranking_ate4"),
+    path("ranking/5-mais/", ranking_quadro, {"faixa": "5mais"}, name="ranking_5mais"),
+    path("ranking/eventos/", ranking_eventos, name="ranking_eventos"),
+    path("ranking/eventos/<slug:faixa>/", ranking_eventos, name="ranking_eventos_faixa"),
+    path("ranking/historico/<int:numero>/", historico_semana_view, name="ranking_historico"),
+    path("ranking/historico/<int:numero>/destaques/", historico_destaques_view, name="ranking_destaques"),
+    path(
+        "ranking/historico/crianca/<int:crianca_id>/", historico_crianca_view, name="ranking_historico_crianca"
+    ),
+    path("ranking/<slug:faixa>/", ranking_quadro, name="ranking_faixa"),
+    path("ranking/<slug:faixa>.json", ranking_json, name="ranking_json"),
+    path("temporadas/<slug:temporada>/", include(rotas_temporada)),
 
 ]
@@ -1,156 +1,316 @@
-from django.shortcuts import render
-from .models import Crianca, Resultado
-from django.db.models import Sum, F, FloatField, ExpressionWrapper, Value
-from django.db.models.functions import Coalesce
-from django.db.models import FloatField
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+from .models import Crianca, ImportacaoJob, Semana, Temporada, VersaoDados
+from .cache_ranking import quadros_em_cache, chave_versao
+from .ao_vivo import transmissor
 
 
 from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
-from django.db import transaction
 from .forms import UploadPlanilhaForm
+from .fila_importacao import enfileirar, progresso_do_job
 from .import_planilha import importar_planilha
+from .lancamentos import LoteInvalido, lancar
+from .metricas import registro
+from .publicacao import dados_quadro
+from . import exportacao
 
 @require_http_methods(["GET", "POST"])
 def upload_planilha_view(request):
+    simulacao = None
     if request.method == "POST":
         form = UploadPlanilhaForm(request.POST, request.FILES)
         if form.is_valid():
             arq = form.cleaned_data["arquivo"]
+            diferencial = form.cleaned_data["diferencial"]
             try:
-                with transaction.atomic():
-                    resumo = importar_planilha(arq)
-                messages.success(
-                    request,
-                    f"Importação concluída: "
-                    f"{resumo['criancas_criadas_ou_encontradas']} crianças, "
-                    f"Semanas {', '.join(map(str, resumo['semanas_processadas']))}, "
-                    f"{resumo['resultados_criados']} resultados."
-                )
-                # Redireciona para o ranking (ajuste o nome da url)
-                return redirect(reverse("ranking"))
-            except Exception as e:
+                if form.cleaned_data["simular"]:
+                    # Prévia: roda na própria request e desfaz tudo no fim
+                    simulacao = importar_planilha(arq, diferencial=diferencial, simular=True)
+                else:
+                    job = enfileirar(arq, diferencial=diferencial)
+            except ValueError as e:
                 messages.error(request, f"Erro na importação: {e}")
+            else:
+                if simulacao is None:
+                    # A importação roda em segundo plano; a tela de status acompanha o progresso
+                    return redirect(reverse("importacao_status", args=[job.pk]))
     else:
         form = UploadPlanilhaForm()
-    return render(request, "upload_planilha.html", {"form": form})
+    return render(request, "upload_planilha.html", {"form": form, "simulacao": simulacao})
 
 
+def importacao_status_view(request, job_id):
+    job = get_object_or_404(ImportacaoJob, pk=job_id)
+    return render(request, "importacao_status.html", {"job": job, "progresso": progresso_do_job(job)})
 
-def ranking_view(request):
 
-    ranking_qs = Crianca.objects.annotate(
-        total=Coalesce(Sum(
-            ExpressionWrapper(
-                F('resultado__quantidade') * F('resultado__atividade__pontos'),
-                output_field=FloatField()
-            )
-        ), Value(0.0))
-    ).order_by('-total', 'nome')
+def importacao_progresso_view(request, job_id):
+    job = get_object_or_404(ImportacaoJob, pk=job_id)
+    return JsonResponse(progresso_do_job(job))
 
-    # Descobrir os 3 maiores totais distintos
-    totais_distintos = sorted(
-        {item.total for item in ranking_qs if item.total > 0},
-        reverse=True
-    )[:3]
 
-    ranking = []
-    last_pontuacao = None
-    posicao = 0
+@require_http_methods(["POST"])
+def lancamentos_view(request):
+    """
+    Lançamento de pontos em lote (JSON). Corpo: {"entradas": [...]} (ver
+    atividades.lancamentos); responde com os totais atualizados das crianças.
+    """
+    if not request.user.has_perm("atividades.add_resultado"):
+        return JsonResponse({"erro": "Sem permissão para lançar pontos."}, status=403)
+    try:
+        dados = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"erro": "JSON inválido."}, status=400)
+    try:
+        resumo = lancar(dados.get("entradas") if isinstance(dados, dict) else None)
+    except LoteInvalido as e:
+        return JsonResponse({"erro": str(e), "erros": e.erros}, status=400)
+    return JsonResponse(resumo)
 
-    for i, item in enumerate(ranking_qs, start=1):
-        if item.total != last_pontuacao:
-            posicao = i
-            last_pontuacao = item.total
 
-        if item.total == totais_distintos[0]:
-            medalha = 'ouro'
-        elif len(totais_distintos) > 1 and item.total == totais_distintos[1]:
-            medalha = 'prata'
-        elif len(totais_distintos) > 2 and item.total == totais_distintos[2]:
-            medalha = 'bronze'
-        else:
-            medalha = None
+def metricas_view(request):
+    """
+    Métricas deste processo no formato do Prometheus. Com METRICAS_TOKEN, exige
+    "Authorization: Bearer <token>"; sem ele, só para a equipe logada (ou com DEBUG).
+    """
+    token = getattr(settings, "METRICAS_TOKEN", "")
+    if token:
+        liberado = request.headers.get("Authorization") == f"Bearer {token}"
+    else:
+        liberado = settings.DEBUG or request.user.is_staff
+    if not liberado:
+        return HttpResponse("Acesso negado.\n", status=403, content_type="text/plain; charset=utf-8")
+    return HttpResponse(registro.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
-        ranking.append({
-            'posicao': posicao,
-            'nome': item.nome.upper(),
-            'total': item.total,
-            'medalha': medalha,
-        })
 
-    return render(request, 'ranking.html', {'ranking': ranking})
+def _versao_dados(request):
+    """Lê a versão dos dados uma única vez por request (ETag, Last-Modified e cache)."""
+    if not hasattr(request, "_versao_dados"):
+        request._versao_dados = VersaoDados.objects.atual()
+    return request._versao_dados
 
 
+def _etag_ranking(request, *args, **kwargs):
+    return chave_versao(_versao_dados(request))
 
-def ranking_escolha(request):
+
+def _ultima_alteracao_ranking(request, *args, **kwargs):
+    return _versao_dados(request).atualizado_em
+
+
+def ranking_condicional(view):
     """
-    Renderiza a tela com os dois botões:
-    - Até 4 anos
-    - 5 anos ou mais
+    Responde 304 quando o cliente já tem a versão atual (If-None-Match /
+    If-Modified-Since), antes de qualquer query de ranking. max-age=0 faz
+    navegador e proxy sempre revalidarem em vez de exibir dados velhos.
     """
-    return render(request, "ranking_escolha.html")
+    view = condition(etag_func=_etag_ranking, last_modified_func=_ultima_alteracao_ranking)(view)
+    return cache_control(max_age=0, must_revalidate=True)(view)
 
 
-def _build_ranking(qs):
+def _temporada(slug):
+    """Temporada da URL (/temporadas/<slug>/...; 404 se não existir) ou None para a ativa."""
+    if slug is None:
+        return None
+    return get_object_or_404(Temporada, slug=slug)
+
+
+def _semana(numero, temporada):
+    if temporada is None:
+        return get_object_or_404(Semana, numero=numero, temporada__ativa=True)
+    return get_object_or_404(Semana, numero=numero, temporada=temporada)
+
+
+def _modo_ao_vivo(request, faixa, temporada=None):
+    """Com ?ao_vivo=1 a página assina o stream SSE e aplica as mudanças no lugar (só na temporada ativa)."""
+    if request.GET.get("ao_vivo") != "1" or (temporada is not None and not temporada.ativa):
+        return None
+    return {
+        "url": reverse("ranking_eventos_faixa", args=[faixa]),
+        "versao": chave_versao(_versao_dados(request)),
+    }
+
+
+@ranking_condicional
+def ranking_quadro(request, faixa="geral", temporada=None):
     """
-    Monta a lista de ranking (posicao, nome, total, medalha) a partir de um QS de Crianca.
+    Ranking geral, de uma faixa etária (RANKING_FAIXAS) ou de uma turma, da
+    temporada ativa ou da temporada da URL.
+    Todos os quadros são montados juntos e ficam numa só entrada do cache.
     """
-    qs = qs.annotate(
-        total=Coalesce(
-            Sum(
-                ExpressionWrapper(
-                    F("resultado__quantidade") * F("resultado__atividade__pontos"),
-                    output_field=FloatField()
-                )
-            ),
-            Value(0.0)
+    temporada = _temporada(temporada)
+    quadros = quadros_em_cache(_versao_dados(request), temporada)
+    if faixa not in quadros:
+        raise Http404("Faixa de ranking inexistente.")
+    return render(request, "ranking.html", {
+        "ranking": quadros[faixa]["ranking"],
+        "faixa": quadros[faixa]["nome"],
+        "temporada": temporada,
+        "ao_vivo": _modo_ao_vivo(request, faixa, temporada),
+    })
+
+
+@ranking_condicional
+def ranking_json(request, faixa, temporada=None):
+    """Um quadro em JSON (o mesmo conteúdo do arquivo publicado em ranking/<faixa>.json)."""
+    versao = _versao_dados(request)
+    quadros = quadros_em_cache(versao, _temporada(temporada))
+    if faixa not in quadros:
+        raise Http404("Faixa de ranking inexistente.")
+    return JsonResponse(
+        dados_quadro(faixa, quadros[faixa], chave_versao(versao)), json_dumps_params={"ensure_ascii": False}
+    )
+
+
+@gzip_page
+@ranking_condicional
+def ranking_exportar(request, formato, temporada=None):
+    """
+    Ranking em JSON ou CSV, em streaming. Parâmetros: faixa (geral, faixa ou
+    turma-<slug>), semana (só os pontos daquela semana), pagina e por_pagina
+    (sem pagina sai o ranking inteiro).
+    """
+    try:
+        params = exportacao.ler_parametros(request.GET)
+    except exportacao.ParametroInvalido as e:
+        return JsonResponse({"erro": str(e)}, status=400)
+    consulta = exportacao.consultar(params["faixa"], params["semana"], _temporada(temporada))
+    if consulta is None:
+        raise Http404("Faixa de ranking ou semana inexistente.")
+    nome, linhas = consulta
+
+    inicio, fim, por_pagina = 0, None, params["por_pagina"]
+    if params["pagina"]:
+        inicio = (params["pagina"] - 1) * por_pagina
+        fim = inicio + por_pagina
+
+    if formato == "csv":
+        resposta = StreamingHttpResponse(
+            exportacao.csv_em_partes(exportacao.classificar(linhas, inicio, fim)),
+            content_type="text/csv; charset=utf-8",
         )
-    ).order_by("-total", "nome")
-
-    # Top 3 totais distintos (> 0) para medalhas
-    tops = sorted({c.total for c in qs if c.total and c.total > 0}, reverse=True)[:3]
-
-    def medal_for(total):
-        if not tops:
-            return None
-        if len(tops) > 0 and total == tops[0]:
-            return "ouro"
-        if len(tops) > 1 and total == tops[1]:
-            return "prata"
-        if len(tops) > 2 and total == tops[2]:
-            return "bronze"
-        return None
+        sufixo = f"-semana-{params['semana']}" if params["semana"] is not None else ""
+        resposta["Content-Disposition"] = f'attachment; filename="ranking-{params["faixa"]}{sufixo}.csv"'
+        return resposta
+
+    proxima = None
+    if params["pagina"]:
+        fim += 1  # um item a mais só para saber se há próxima página
+        seguinte = request.GET.copy()
+        seguinte["pagina"] = params["pagina"] + 1
+        seguinte["por_pagina"] = por_pagina
+        proxima = f"{request.path}?{seguinte.urlencode()}"
+    cabecalho = {
+        "faixa": params["faixa"],
+        "nome": nome,
+        "semana": params["semana"],
+        "versao": chave_versao(_versao_dados(request)),
+        "pagina": params["pagina"],
+        "por_pagina": por_pagina,
+    }
+    return StreamingHttpResponse(
+        exportacao.json_em_partes(cabecalho, exportacao.classificar(linhas, inicio, fim), por_pagina, proxima),
+        content_type="application/json",
+    )
+
+
+CAMPOS_HISTORICO_JSON = {
+    "id": "crianca_id",
+    "nome": "crianca__nome",
+    "posicao": "posicao",
+    "acumulado": "acumulado",
+    "total_semana": "total_semana",
+    "variacao": "variacao",
+}
+
+
+def _limite(request, padrao):
+    """?limite=N (1 a 1000) ou o padrão; valores inválidos caem no padrão."""
+    try:
+        limite = int(request.GET.get("limite", padrao))
+    except (TypeError, ValueError):
+        return padrao
+    return max(1, min(limite, 1000))
 
-    ranking, last_total, posicao = [], None, 0
-    for i, c in enumerate(qs, start=1):
-        if c.total != last_total:
-            posicao = i
-            last_total = c.total
-        ranking.append({
-            "posicao": posicao,
-            "nome": c.nome,          # o template já usa |upper quando renderiza
-            "total": c.total,
-            "medalha": medal_for(c.total),
-        })
-    return ranking
-
-
-def ranking_por_faixa_ate4(request):
+
+def _fotos(qs, limite=None):
+    linhas = qs.values_list(*CAMPOS_HISTORICO_JSON.values())
+    if limite:
+        linhas = linhas[:limite]
+    return [dict(zip(CAMPOS_HISTORICO_JSON, linha)) for linha in linhas]
+
+
+@ranking_condicional
+def historico_semana_view(request, numero, temporada=None):
+    """Ranking acumulado como estava ao fim da semana `numero` (foto pré-calculada)."""
+    semana = _semana(numero, _temporada(temporada))
+    qs = semana.historico.order_by("posicao", "crianca__nome")
+    return JsonResponse({"semana": numero, "ranking": _fotos(qs, _limite(request, None))})
+
+
+@ranking_condicional
+def historico_destaques_view(request, numero, temporada=None):
+    """Quem mais subiu, quem mais caiu e quem mais pontuou na semana `numero`."""
+    semana = _semana(numero, _temporada(temporada))
+    limite = _limite(request, 10)
+    return JsonResponse({
+        "semana": numero,
+        "subiram": _fotos(semana.historico.filter(variacao__gt=0).order_by("-variacao", "posicao"), limite),
+        "cairam": _fotos(semana.historico.filter(variacao__lt=0).order_by("variacao", "posicao"), limite),
+        "pontuaram": _fotos(
+            semana.historico.filter(total_semana__gt=0).order_by("-total_semana", "posicao"), limite
+        ),
+    })
+
+
+@ranking_condicional
+def historico_crianca_view(request, crianca_id):
+    """Evolução semana a semana de uma criança."""
+    crianca = get_object_or_404(Crianca, pk=crianca_id)
+    semanas = crianca.historico.order_by("semana__numero").values_list(
+        "semana__numero", "posicao", "acumulado", "total_semana", "variacao"
+    )
+    return JsonResponse({
+        "id": crianca.pk,
+        "nome": crianca.nome,
+        "semanas": [
+            dict(zip(("semana", "posicao", "acumulado", "total_semana", "variacao"), linha))
+            for linha in semanas
+        ],
+    })
+
+
+async def ranking_eventos(request, faixa="geral"):
     """
-    Ranking apenas das crianças com idade até 4 anos (inclusive).
+    Stream SSE com as mudanças do ranking da faixa (evento 'diff').
+    Deve ser servido por ASGI; no WSGI cada tela prenderia um worker.
     """
-    qs = Crianca.objects.filter(idade__lte=4)
-    ranking = _build_ranking(qs)
-    return render(request, "ranking.html", {"ranking": ranking, "faixa": "Até 4 anos"})
+    if faixa not in await sync_to_async(quadros_em_cache)():
+        raise Http404("Faixa de ranking inexistente.")
+    resposta = StreamingHttpResponse(transmissor.eventos(faixa), content_type="text/event-stream")
+    resposta["Cache-Control"] = "no-cache"
+    resposta["X-Accel-Buffering"] = "no"  # nginx: não segurar os eventos no buffer
+    return resposta
+
 
 
-def ranking_por_faixa_5mais(request):
+def ranking_escolha(request, temporada=None):
     """
-    Ranking apenas das crianças com idade a partir de 5 anos (inclusive).
+    Tela de escolha do quadro: um botão por faixa etária configurada e por turma.
     """
-    qs = Crianca.objects.filter(idade__gte=5)
-    ranking = _build_ranking(qs)
-    return render(request, "ranking.html", {"ranking": ranking, "faixa": "5 anos ou mais"})
+    temporada = _temporada(temporada)
+    quadros = quadros_em_cache(temporada=temporada)
+    opcoes = [
+        {"chave": chave, "nome": quadro["nome"]} for chave, quadro in quadros.items() if chave != "geral"
+    ]
+    return render(request, "ranking_escolha.html", {"opcoes": opcoes, "temporada": temporada})
@@ -0,0 +1,92 @@
+"""
+Configuração do gunicorn para o dia da gincana:
+
+    gunicorn -c python:gincana.servidor gincana.wsgi:application
+
+GUNICORN_PERFIL escolhe o perfil de cada pool (um serviço no docker-compose,
+o nginx separa as rotas):
+  - "ranking" (padrão): telas, JSON e API de lançamentos; requests curtas e
+    muitas ao mesmo tempo. Workers gthread: as threads esperam o banco/cache
+    enquanto outras respondem.
+  - "importacao": upload de planilhas e admin. Poucos workers (cada
+    importação lê a planilha inteira com pandas), timeout longo e reciclagem
+    mais frequente, para devolver ao sistema a memória que o pandas deixa
+    fragmentada.
+  - "ao_vivo": o stream SSE (/ranking/eventos/) com workers do uvicorn; um
+    worker por CPU atende milhares de telas, cada uma é só uma corrotina.
+
+Todos os valores podem ser trocados por variáveis GUNICORN_* (ex.:
+GUNICORN_WORKERS=4 GUNICORN_THREADS=2), que é como o comando carga_http
+compara configurações.
+"""
+import multiprocessing
+import os
+
+CPUS = multiprocessing.cpu_count()
+
+PERFIS = {
+    "ranking": {
+        "worker_class": "gthread",
+        "workers": 2 * CPUS + 1,
+        "threads": 4,
+        "timeout": 30,
+        "max_requests": 2000,
+    },
+    "importacao": {
+        "worker_class": "gthread",
+        "workers": max(2, CPUS // 2),
+        "threads": 2,
+        "timeout": 300,
+        "max_requests": 200,
+    },
+    "ao_vivo": {
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "workers": CPUS,
+        "threads": 1,
+        # O stream manda batimentos; o timeout é só do heartbeat do worker
+        "timeout": 60,
+        "max_requests": 0,  # reciclar derrubaria as telas conectadas
+    },
+}
+
+
+def perfil(nome=None, ambiente=os.environ):
+    """Valores do perfil `nome` (padrão: GUNICORN_PERFIL), com as variáveis GUNICORN_* por cima."""
+    nome = nome or ambiente.get("GUNICORN_PERFIL", "ranking")
+    if nome not in PERFIS:
+        raise ValueError(f"GUNICORN_PERFIL inválido: {nome!r} (opções: {', '.join(PERFIS)}).")
+    valores = dict(PERFIS[nome])
+    for chave in ("workers", "threads", "timeout", "max_requests"):
+        if ambiente.get(f"GUNICORN_{chave.upper()}"):
+            valores[chave] = int(ambiente[f"GUNICORN_{chave.upper()}"])
+    if ambiente.get("GUNICORN_WORKER_CLASS"):
+        valores["worker_class"] = ambiente["GUNICORN_WORKER_CLASS"]
+    if nome == "importacao" and ambiente.get("IMPORTACAO_EM_SEGUNDO_PLANO", "thread") == "thread":
+        # A importação roda numa thread daemon do worker: reciclar no meio mataria o job
+        valores["max_requests"] = 0
+    return valores
+
+
+_valores = perfil()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = _valores["worker_class"]
+workers = _valores["workers"]
+threads = _valores["threads"]
+timeout = _valores["timeout"]
+graceful_timeout = min(timeout, 60)
+# Reciclagem: o worker sai depois de N requests (+ até 10% aleatório, para os
+# workers não reiniciarem todos juntos)
+max_requests = _valores["max_requests"]
+max_requests_jitter = max_requests // 10
+# Carrega o Django uma vez no master e os workers herdam a memória (fork).
+# Nada abre conexão com o banco ou threads durante o import da aplicação, então
+# cada worker abre as suas depois do fork.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+# Conexões keep-alive do nginx
+keepalive = 5
+accesslog = os.environ.get("GUNICORN_ACCESSLOG") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+# Temporários do worker em memória (o heartbeat grava neles a cada segundo)
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
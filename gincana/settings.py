@@ -20,12 +20,16 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-0di-6_o4os^3s-ov%)zwu!&%$5q29i$#$8#_i8c)17#9%s@a5m'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', 'django-insecure-0di-6_o4os^3s-ov%)zwu!&%$5q29i$#$8#_i8c)17#9%s@a5m'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Com DEBUG o Django guarda todas as queries de cada request em memória
+# (connection.queries); o docker-compose roda com DJANGO_DEBUG=0.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [h.strip() for h in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if h.strip()]
 
 
 # Application definition
@@ -42,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'atividades.metricas.MetricasMiddleware',  # primeiro: mede o tempo de todos os demais
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,14 +80,150 @@ WSGI_APPLICATION = 'gincana.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Banco: DB_ENGINE=sqlite (padrão, um arquivo) ou DB_ENGINE=postgres (vários workers/máquinas,
+# com o pool de conexões nativo do Django + psycopg)
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'gincana'),
+            'USER': os.environ.get('POSTGRES_USER', 'gincana'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Com pool as conexões já são reaproveitadas: CONN_MAX_AGE precisa ser 0
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+                    'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                },
+            },
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            # Conexões persistentes: evita reabrir o arquivo (e reaplicar os PRAGMAs) a cada request
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Segundos esperando o lock de escrita antes de "database is locked"
+                'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+                # Transações já começam com o lock de escrita: sem deadlock leitura->escrita em WAL
+                'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            },
+            # Testes em arquivo (não em memória) para exercitar WAL e concorrência entre threads
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# PRAGMAs aplicados a cada conexão nova (atividades.banco.configurar_sqlite).
+# WAL: leitores do ranking não esperam a importação; synchronous=NORMAL é seguro em WAL;
+# cache_size negativo = KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_KB', 64 * 1024)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_BYTES', 256 * 1024 * 1024)),
+    'temp_store': 'memory',
 }
 
 
+# Cache
+# O ranking usa um cache próprio. Com RANKING_CACHE_BACKEND=arquivo os workers do
+# gunicorn da mesma máquina compartilham as entradas sem precisar de Redis.
+
+RANKING_CACHE_BACKEND = os.environ.get("RANKING_CACHE_BACKEND", "memoria")
+RANKING_CACHE_ALIAS = "ranking"
+RANKING_CACHE_TIMEOUT = int(os.environ.get("RANKING_CACHE_TIMEOUT", 3600))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "ranking": (
+        {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("RANKING_CACHE_DIR", os.path.join(BASE_DIR, "cache", "ranking")),
+        }
+        if RANKING_CACHE_BACKEND == "arquivo"
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ranking",
+        }
+    ),
+}
+
+
+# Quadros do ranking
+# Faixas etárias (limites inclusivos; omita idade_min/idade_max para deixar a faixa aberta).
+# Todas saem de uma única query; cada chave vira /ranking/<chave>/.
+RANKING_FAIXAS = {
+    "ate4": {"nome": "Até 4 anos", "idade_max": 4},
+    "5mais": {"nome": "5 anos ou mais", "idade_min": 5},
+}
+# Um quadro por turma cadastrada, em /ranking/turma-<nome>/
+RANKING_POR_TURMA = os.environ.get("RANKING_POR_TURMA", "1") == "1"
+
+# Publicação estática: a cada mudança nos dados os quadros são gravados como
+# HTML/JSON neste diretório, servido direto pelo nginx (vazio = desligada).
+PUBLICACAO_DIR = os.environ.get("PUBLICACAO_DIR", "")
+# "thread" (publica numa thread do processo web) ou "nao" (logo após o commit, na própria request)
+PUBLICACAO_EM_SEGUNDO_PLANO = os.environ.get("PUBLICACAO_EM_SEGUNDO_PLANO", "thread")
+
+
+# Importação de planilhas
+# A partir deste tamanho o .xlsx é lido em streaming (openpyxl read_only), gravando
+# em lotes de IMPORTACAO_LOTE_LINHAS linhas; CSV é sempre lido em streaming.
+
+IMPORTACAO_STREAMING_BYTES = int(os.environ.get("IMPORTACAO_STREAMING_BYTES", 5 * 1024 * 1024))
+IMPORTACAO_LOTE_LINHAS = int(os.environ.get("IMPORTACAO_LOTE_LINHAS", 1000))
+
+# Quem executa as importações enviadas: "thread" (thread no próprio processo web),
+# "processo" (comando processar_importacoes rodando à parte) ou "nao" (na própria request).
+IMPORTACAO_EM_SEGUNDO_PLANO = os.environ.get("IMPORTACAO_EM_SEGUNDO_PLANO", "thread")
+# Sugere, no resumo da importação, mesclar crianças novas com nomes parecidos
+# (similaridade de trigramas >= NOMES_SIMILARIDADE_MINIMA, de 0 a 1)
+IMPORTACAO_SUGERIR_SEMELHANTES = os.environ.get("IMPORTACAO_SUGERIR_SEMELHANTES", "1") == "1"
+NOMES_SIMILARIDADE_MINIMA = float(os.environ.get("NOMES_SIMILARIDADE_MINIMA", 0.7))
+# Job "executando" sem atualização nem batimento (fila_importacao) há mais que isso (s)
+# é dado como abandonado; o batimento fica no cache, que precisa ser compartilhado entre processos
+IMPORTACAO_JOB_TIMEOUT = int(os.environ.get("IMPORTACAO_JOB_TIMEOUT", 1800))
+
+# Métricas por request (/metricas/, formato Prometheus) e log de queries lentas
+METRICAS_ATIVAS = os.environ.get("METRICAS_ATIVAS", "1") == "1"
+METRICAS_JANELA = int(os.environ.get("METRICAS_JANELA", 1000))  # requests por rota nos quantis
+METRICAS_QUERY_LENTA_MS = float(os.environ.get("METRICAS_QUERY_LENTA_MS", 200))
+# Se definido, /metricas/ exige "Authorization: Bearer <token>"; vazio, só a equipe logada (ou DEBUG) acessa
+METRICAS_TOKEN = os.environ.get("METRICAS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "atividades": {"handlers": ["console"], "level": os.environ.get("LOG_LEVEL", "INFO")},
+    },
+}
+
+# Máximo de entradas aceitas por envio na API de lançamentos (/api/lancamentos/)
+LANCAMENTOS_MAX_ENTRADAS = int(os.environ.get("LANCAMENTOS_MAX_ENTRADAS", 1000))
+
+# Maior por_pagina aceito na exportação do ranking (/api/ranking.json e .csv)
+EXPORTACAO_MAX_POR_PAGINA = int(os.environ.get("EXPORTACAO_MAX_POR_PAGINA", 1000))
+
+# Resultados por página nos inlines do admin (criança/atividade)
+ADMIN_RESULTADOS_POR_PAGINA = int(os.environ.get("ADMIN_RESULTADOS_POR_PAGINA", 25))
+
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", os.path.join(BASE_DIR, "media"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -16,7 +16,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from atividades.views import ranking_view, ranking_escolha
+from atividades.views import ranking_escolha
 
 admin.site.site_header = "Kids PIBVP"                       # substitui “Administração do Django”
 admin.site.index_title = "Administração da Pontuacao"       # subtítulo da home do admin